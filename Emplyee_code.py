@@ -1,21 +1,41 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, Toplevel
+from tkinter import ttk, messagebox, Toplevel, filedialog
 from tkcalendar import DateEntry
-import openpyxl  # Import openpyxl for Excel handling
 import re  # For email validation
 import os
 import cv2  # OpenCV for face detection
 import time
+from sample_store import SampleStore, check_employee_id
+from employee_registry import get_registry
+from camera_broker import CameraBroker, RingReader
+from enrollment import MIN_SAMPLES, SAMPLE_COUNT, BurstEnrollment
+from metrics import MetricsRegistry
 
 class EmployeeManagementSystem:
-    def __init__(self, root):
+    def __init__(self, root, sample_store=None, registry=None, camera=None, metrics=None, on_samples_added=None):
         self.root = root
         self.root.title("Employee Management System")
         self.root.geometry("600x550")  # Increased width to accommodate CNIC field
 
         # Initialize required attributes
         self.excel_filename = "employee_data.xlsx"
-        self.employees = {}  # Store employee data
+
+        # Employee records live in the shared indexed registry; Excel is only used for import/export
+        self.registry = registry or get_registry("employee_data.db", self.excel_filename)
+        self.employees = self.registry.employees  # Cached records keyed by Employee ID
+
+        # Face samples go to the shared packed sample store (the main window passes its own instance)
+        self.sample_store = sample_store or SampleStore("Data").open()
+        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+        # Camera frames come from the main window's broker; the device is never opened twice
+        self.camera = camera
+
+        # Registry and Excel operation timings (the main window's registry, so they show up in its metrics)
+        self.metrics = metrics or MetricsRegistry()
+
+        # Called with the employee ID after capture saves samples (the main window adds them to its model)
+        self.on_samples_added = on_samples_added
 
         # Configure grid layout for the main window
         self.root.grid_rowconfigure(0, weight=1)
@@ -32,9 +52,6 @@ class EmployeeManagementSystem:
         # Create employee list (Treeview to display employee data)
         self.create_employee_list()
 
-        # Load Excel file (create a new one if not exists)
-        self.create_or_load_excel()
-
     def create_widgets(self):
         """Creates all the input fields and buttons for employee information."""
         # Labels
@@ -87,11 +104,15 @@ class EmployeeManagementSystem:
         self.save_button = tk.Button(self.btn_frame, text="Save", command=self.save_info, width=10)
         self.delete_button = tk.Button(self.btn_frame, text="Delete", command=self.delete_info, width=10)
         self.capture_button = tk.Button(self.btn_frame, text="Capture", command=self.capture_images, width=10, state=tk.DISABLED)
+        self.import_button = tk.Button(self.btn_frame, text="Import Excel", command=self.import_excel, width=10)
+        self.export_button = tk.Button(self.btn_frame, text="Export Excel", command=self.export_excel, width=10)
 
         # Grid placement of buttons in one row
         self.save_button.grid(row=0, column=0, padx=5)
         self.delete_button.grid(row=0, column=1, padx=5)
         self.capture_button.grid(row=0, column=2, padx=5)  # Placed in the same row
+        self.import_button.grid(row=1, column=0, columnspan=2, padx=5, pady=5)
+        self.export_button.grid(row=1, column=1, columnspan=2, padx=5, pady=5)
 
         # Bind validation functions to input fields to enable the Capture button
         self.employee_name_entry.bind("<KeyRelease>", self.enable_capture_button)
@@ -113,26 +134,56 @@ class EmployeeManagementSystem:
         for col in self.tree["columns"]:
             self.tree.heading(col, text=col)
 
-        # Load employee data from the Excel file
+        # Load employee data from the registry cache
         self.load_employee_data()
 
     def load_employee_data(self):
-        """Load employee data from Excel file and populate the Treeview."""
-        if os.path.exists(self.excel_filename):
-            workbook = openpyxl.load_workbook(self.excel_filename)
-            sheet = workbook.active
-
-            # Populate the Treeview with employee data
-            for row in sheet.iter_rows(min_row=2):
-                self.tree.insert('', 'end', values=(row[0].value, row[1].value, row[2].value, row[3].value, row[7].value))
-
-    def create_or_load_excel(self):
-        """Create or load the Excel file."""
-        if not os.path.exists(self.excel_filename):
-            workbook = openpyxl.Workbook()
-            sheet = workbook.active
-            sheet.append(["Employee ID", "Name", "Department", "Job Title", "Gender", "DOB", "Phone No", "Email", "Address", "CNIC"])
-            workbook.save(self.excel_filename)
+        """Populate the Treeview from the registry cache (no disk reads)."""
+        self.tree.delete(*self.tree.get_children())
+        for record in self.registry.all():
+            self.insert_tree_row(record)
+
+    def insert_tree_row(self, record):
+        # The Employee ID doubles as the row ID, so deletes never depend on Tk's value conversion
+        self.tree.insert('', 'end', iid=record["employee_id"], values=(
+            record["employee_id"], record["name"], record["department"], record["job_title"], record["cnic"]))
+
+    def import_excel(self):
+        """Upsert employees from a workbook with the employee_data.xlsx columns."""
+        path = filedialog.askopenfilename(filetypes=[("Excel workbook", "*.xlsx")])
+        if not path:
+            return
+        with self.metrics.time("excel_import_ms", "Excel import into the registry (ms)"):
+            count = self.registry.import_excel(path)
+        self.load_employee_data()
+        messagebox.showinfo("Import Complete", f"{count} employees imported.")
+
+    def export_excel(self):
+        """Write every employee to a workbook, CSV or columnar file (streamed, see attendance_export)."""
+        from attendance_export import ExportJob
+
+        path = filedialog.asksaveasfilename(defaultextension=".xlsx", initialfile=self.excel_filename,
+                                            filetypes=[("Excel workbook", "*.xlsx"), ("CSV", "*.csv"),
+                                                       ("Columnar (payroll)", "*.npz")])
+        if not path:
+            return
+        self.export_job = ExportJob("employees", path, registry_path=self.registry.db_path).start()
+        self.export_button.config(state=tk.DISABLED)
+        self.poll_export()
+
+    def poll_export(self):
+        # The export runs on its own thread; the button shows its progress until it is done
+        job = self.export_job
+        if not job.done:
+            self.export_button.config(text=f"{job.progress:.0%}")
+            self.root.after(200, self.poll_export)
+            return
+        self.export_button.config(text="Export Excel", state=tk.NORMAL)
+        self.metrics.histogram("excel_export_ms", "Registry export to Excel (ms)").observe(job.seconds * 1000.0)
+        if job.error is not None:
+            messagebox.showerror("Export Failed", str(job.error))
+            return
+        messagebox.showinfo("Export Complete", f"{job.rows} employees exported to {os.path.basename(job.path)}.")
 
     def validate_name_input(self, char, value):
         """Validates that only alphabetic characters and spaces are entered for the employee name."""
@@ -217,48 +268,79 @@ class EmployeeManagementSystem:
             self.capture_button.config(state=tk.DISABLED)
 
     def capture_images(self):
-        """Capture images using the webcam and save them in a folder named by the employee ID."""
+        """Capture face samples using the webcam and add them to the sample store under the employee ID."""
         employee_id = self.employee_id_entry.get()
+        try:
+            check_employee_id(employee_id)
+        except ValueError as e:
+            messagebox.showwarning("Invalid Employee ID", str(e))
+            return
 
-        # Create a folder named after the employee ID to save images
-        save_path = f"employee_data/{employee_id}"
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
-
-        # Open the webcam (ID 0 by default)
-        cap = cv2.VideoCapture(0)
-
-        # Capture 10 images automatically
-        for img_count in range(10):
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # Display the captured frame in a window
-            cv2.imshow("Capturing Images", frame)
-
-            # Save the captured image
-            image_name = f"{save_path}/{employee_id}_{img_count + 1}.jpg"
-            cv2.imwrite(image_name, frame)  # Save the image
-
-            # Wait for 1 second before capturing the next image
-            cv2.waitKey(1000)
+        # Use the running camera broker (this window's, or the attendance app's in another process); only open
+        # the webcam (ID 0 by default) when nothing else owns it. A short burst is grabbed in the background
+        # and up to the SAMPLE_COUNT best sharp, well-lit and varied face crops are kept
+        self.capture_button.config(state=tk.DISABLED)
+        frames, owned = self.camera, None
+        if frames is None:
+            try:
+                frames = RingReader.attach(0)
+            except FileNotFoundError:
+                frames = owned = CameraBroker(0).start()
+        enrollment = BurstEnrollment(frames, self.face_cascade, sample_count=SAMPLE_COUNT, duration=2.0)
+        self.capture_result = None
+
+        def done(crops, qualities):
+            # Runs on the burst thread: release the frames and hand the result over; no Tk calls here
+            if owned is not None:
+                owned.stop()  # Release the webcam
+            elif frames is not self.camera:
+                frames.stop()  # Detach from the other process's ring
+            self.capture_result = (crops, qualities, enrollment.error)
+
+        enrollment.start(done)
+        self.poll_capture(employee_id)
+
+    def poll_capture(self, employee_id):
+        # Tk may only be used from this thread, so the UI checks for the burst's result instead of being called
+        if self.capture_result is None:
+            self.root.after(100, self.poll_capture, employee_id)
+            return
+        self.finish_capture(employee_id, *self.capture_result)
 
-        # Release the webcam and close all OpenCV windows
-        cap.release()
-        cv2.destroyAllWindows()
+    def finish_capture(self, employee_id, crops, qualities, error=None):
+        self.capture_button.config(state=tk.NORMAL)
+        if error is not None:
+            messagebox.showerror("Capture Failed", f"The face capture failed: {error}")
+            return
 
-        # Inform the user that the capture is complete
-        messagebox.showinfo("Capture Complete", "10 images have been captured and saved.")
+        # Save all crops with one write to the sample store
+        if crops:
+            self.sample_store.append_many(employee_id, crops, qualities, normalized=True)
+            if self.on_samples_added is not None:
+                self.on_samples_added(employee_id)
+
+        # Tell the user how many usable samples the burst kept, and whether that is enough to save
+        total = self.sample_store.count(employee_id)
+        if total < MIN_SAMPLES:
+            messagebox.showwarning("Too Few Usable Images",
+                                   f"Only {len(crops)} usable face images were captured ({total} saved in total, "
+                                   f"at least {MIN_SAMPLES} needed). Face the camera in good light and capture "
+                                   f"again.")
+        else:
+            messagebox.showinfo("Capture Complete",
+                                f"{len(crops)} of up to {SAMPLE_COUNT} face images were usable and have been "
+                                f"saved ({total} in total).")
 
     def save_info(self):
-        """Save the employee information to the Excel file."""
+        """Save the employee information to the registry."""
         # Ensure images are saved before saving data
         employee_id = self.employee_id_entry.get()
-        image_folder = f"employee_data/{employee_id}"
 
-        if not os.path.exists(image_folder) or len(os.listdir(image_folder)) != 10:
-            messagebox.showwarning("No Images Captured", "Please ensure 10 images are captured and saved.")
+        count = self.sample_store.count(employee_id)
+        if count < MIN_SAMPLES:
+            messagebox.showwarning("Not Enough Images Captured",
+                                   f"{count} usable face images are saved; please capture until at least "
+                                   f"{MIN_SAMPLES} are.")
             return
 
         # Get employee details from input fields
@@ -281,60 +363,39 @@ class EmployeeManagementSystem:
         if self.check_existing_data(employee_id):
             messagebox.showwarning("Duplicate Data", "Employee ID already exists.")
             return
+        if self.registry.find_by_cnic(cnic):
+            messagebox.showwarning("Duplicate Data", "CNIC already belongs to another employee.")
+            return
 
-        # Create or load the Excel file
-        if not os.path.exists(self.excel_filename):
-            workbook = openpyxl.Workbook()
-            sheet = workbook.active
-            sheet.append(["Employee ID", "Name", "Department", "Job Title", "Gender", "DOB", "Phone No", "Email", "Address", "CNIC"])
-        else:
-            workbook = openpyxl.load_workbook(self.excel_filename)
-            sheet = workbook.active
-
-        # Add the employee data to the sheet
-        sheet.append([employee_id, name, department, job_title, gender, dob, phone, email, address, cnic])
-
-        # Save the workbook
-        workbook.save(self.excel_filename)
+        # Add the employee to the registry (a single indexed insert)
+        record = {"employee_id": employee_id, "name": name, "department": department, "job_title": job_title,
+                  "gender": gender, "dob": dob, "phone": phone, "email": email, "address": address, "cnic": cnic}
+        with self.metrics.time("registry_add_ms", "Registry insert (ms)"):
+            self.registry.add(record)
 
         # Update the treeview with the new employee data
-        self.tree.insert('', 'end', values=(employee_id, name, department, job_title, cnic))
+        self.insert_tree_row(self.registry.get(employee_id))
 
         # Clear input fields
         self.clear_inputs()
 
     def check_existing_data(self, employee_id):
-        """Check if Employee ID already exists in the Excel file."""
-        if os.path.exists(self.excel_filename):
-            workbook = openpyxl.load_workbook(self.excel_filename)
-            sheet = workbook.active
-            for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row):
-                if row[0].value == employee_id:
-                    return True
-        return False
+        """Check if Employee ID already exists in the registry."""
+        return self.registry.exists(employee_id)
 
     def delete_info(self):
-        """Delete the selected employee from the Excel file and treeview."""
+        """Delete the selected employee from the registry and treeview."""
         selected_item = self.tree.selection()
         if not selected_item:
             messagebox.showwarning("No Selection", "Please select an employee to delete.")
             return
 
-        # Get employee ID to delete
-        employee_id = self.tree.item(selected_item)["values"][0]
+        # Get employee ID to delete (rows are keyed by Employee ID)
+        employee_id = selected_item[0]
 
-        # Load the existing data
-        workbook = openpyxl.load_workbook(self.excel_filename)
-        sheet = workbook.active
-
-        # Find and delete the row corresponding to the selected employee
-        for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row):
-            if row[0].value == employee_id:
-                sheet.delete_rows(row[0].row)
-                break
-
-        # Save the updated workbook
-        workbook.save(self.excel_filename)
+        # Delete the employee by primary key
+        with self.metrics.time("registry_delete_ms", "Registry delete (ms)"):
+            self.registry.delete(employee_id)
 
         # Delete the row from the treeview
         self.tree.delete(selected_item)
@@ -354,6 +415,14 @@ class EmployeeManagementSystem:
 
 
 if __name__ == "__main__":
+    from sample_store import StoreLockedError
+
     root = tk.Tk()
-    app = EmployeeManagementSystem(root)
-    root.mainloop()
\ No newline at end of file
+    try:
+        app = EmployeeManagementSystem(root)
+    except StoreLockedError as e:
+        # The attendance app or a bulk import is writing the sample store; open Employee Management from there
+        messagebox.showerror("Sample Store In Use", f"{e}.\nWait for it to finish, then start again.")
+        root.destroy()
+    else:
+        root.mainloop()
\ No newline at end of file
@@ -1,11 +1,29 @@
+import time
+PROCESS_STARTED = time.perf_counter()  # Before the heavy imports, so startup timings include them
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from datetime import datetime
 import cv2
-from PIL import Image, ImageTk
 import os
-import numpy as np
-from Emplyee_code import EmployeeManagementSystem
+import threading
+from collections import deque
+from camera_broker import CameraBroker
+from recognition import FaceRecognitionPipeline
+from face_tracker import FaceTracker
+from motion_gate import MotionGate
+from face_trainer import BackgroundTrainer, IncrementalTrainer
+from lbph_model import LBPHModel
+from sample_store import SampleStore, StoreLockedError, check_employee_id
+from identification import VectorIdentifier
+from employee_registry import get_registry
+from attendance_journal import AttendanceJournal
+from presence import PresenceTracker
+from attendance_report import ReportEngine, ReportWindow
+from preview_renderer import PreviewRenderer
+from image_writer import ImageWriter
+from enrollment import MIN_SAMPLES, SAMPLE_COUNT, BurstEnrollment
+from metrics import MetricsRegistry, MetricsServer, WindowProfiler
+from event_bus import EventBus
 
 class FaceDetectionAttendanceSystem:
     def __init__(self, root):
@@ -14,32 +32,153 @@ class FaceDetectionAttendanceSystem:
         self.root.geometry("1030x700")
         self.root.configure(bg="white")
 
-        # Initialize camera and face detection
-        self.cap = cv2.VideoCapture(0)
+        # Hot-path metrics, summarized next to the status bar; set metrics_port (e.g. 9108) to also serve
+        # them at http://127.0.0.1:<port>/metrics for Prometheus
+        self.metrics = MetricsRegistry()
+        self.metrics_port = None
+        self.recognition_fps = self.metrics.rate("recognition_fps", "Frames through recognition per second", 5.0)
+        self.preview_fps = self.metrics.rate("preview_fps", "Preview frames drawn per second", 5.0)
+        self.events_rate = self.metrics.rate("events_per_minute", "Attendance events logged per minute", 300.0, 60.0)
+        self.events_logged = self.metrics.counter("events_total", "Attendance events logged")
+        self.frames_reader = None  # The recognition thread's ring reader, once the camera is up
+        self.training_started = None
+
+        # "Profile 30 s" records a cProfile of the UI and recognition threads to Data/profiles
+        self.profiler = WindowProfiler("Data/profiles")
+
+        # Worker threads never touch Tk: they post attendance events, status messages and callbacks here, and
+        # process_events() applies them in one batch every 100 ms. The live panel keeps the newest `live_rows`.
+        self.events = EventBus()
+        self.live_rows = 200
+        self.live_row_ids = deque()
+
+        # Initialize camera and face detection. The broker is the only owner of the device: it publishes frames
+        # to a shared-memory ring that the preview, recognition thread, enrollment and other processes read.
+        # It is started once the window is on screen (see show_started), since opening a camera can take seconds.
+        self.cap = CameraBroker(0)
+        self.last_frame_seq = 0
+        self.first_frame_ms = None
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 
-        # Initialize the LBPH face recognizer
-        self.face_recognizer = cv2.face.LBPHFaceRecognizer_create()
+        # Initialize the LBPH face recognizer (binary model format: saved models are memory-mapped, not parsed)
+        self.face_recognizer = LBPHModel()
 
-        # Employee database
-        self.employee_data = {"Emp001": "John Doe"}  # Initially, only one employee is added
+        # Employee database: the indexed registry shared with the Employee Management window.
+        # employee_data is its ID -> name cache, updated in place, so the pipeline always sees current names
+        self.registry = get_registry("employee_data.db", "employee_data.xlsx")
+        self.employee_data = self.registry.names
+
+        # Detection + recognition stage used by capture(); faces above the LBPH distance threshold stay "Unknown"
+        self.recognition = FaceRecognitionPipeline(self.face_cascade, self.face_recognizer, self.employee_data,
+                                                   confidence_threshold=70.0)
+        self.recognition.metrics = self.metrics
+        self.recognition.registry = self.registry
+
+        # Live tracking mode: full cascade every `detect_interval` frames, template tracking in between
+        self.tracker = FaceTracker(self.recognition, detect_interval=5, track_expiry=15)
+        self.live_recognitions = []
+
+        # Only run detection while something moves in the entrance region (plus a short hold-over)
+        self.motion_gate = MotionGate(roi=None, hold_seconds=2.0)
+
+        # Live preview: frames are shrunk to the label size and drawn into one reused image
+        self.preview = PreviewRenderer(450, 400)
 
         # Setup UI components
         self.create_ui()
 
-        # Ensure 'Data' folder exists for storing face images and trained model
+        # Ensure 'Data' folder exists for storing face samples and trained model
         if not os.path.exists("Data"):
             os.makedirs("Data")
 
-        # Load the trained model if it exists
-        if os.path.exists("Data/face_recognizer.yml"):
-            self.face_recognizer.read("Data/face_recognizer.yml")
-
-        # Flag to track if an employee has logged in
+        # Captured images are encoded and written on worker threads (set crop_faces=True to keep only the faces)
+        self.image_writer = ImageWriter(workers=2, max_queue=16, image_format="jpg", jpeg_quality=90,
+                                        crop_faces=False)
+
+        # Packed store of normalized face crops (run `python sample_store.py migrate` to import old JPEGs)
+        self.sample_store = SampleStore("Data").open()
+        self.recognition.label_map = self.sample_store.employee_by_label
+
+        # Identification engine: "lbph" (the cv2 LBPH model, trained incrementally) or "vector"
+        # (VectorIdentifier: vectorized nearest-neighbour search over LBP features, for large workforces)
+        self.identification_engine = "lbph"
+        self.identifier = None
+
+        # Load the trained model if it exists (plus any samples added since its last checkpoint).
+        # Full retrains run in a worker process and are hot-swapped in when done.
+        self.trainer = IncrementalTrainer(self.face_recognizer, self.sample_store, lock=self.recognition.lock,
+                                          auto_compact=False)
+        self.background_trainer = BackgroundTrainer(self.trainer, self.recognition)
+        if self.identification_engine == "vector":
+            self.identifier = VectorIdentifier().load_store(self.sample_store)
+            self.recognition.confidence_threshold = 30.0  # VectorIdentifier distances run 0-100
+            self.recognition.swap_recognizer(self.identifier)
+            self.recognition.model_trained = not self.identifier.empty()
+        else:
+            self.recognition.excluded_labels = self.trainer.tombstones
+            self.recognition.model_trained = self.trainer.load()
+            if self.trainer.trained:
+                self.status_bar.config(text=f"Model v{self.trainer.model_version} active")
+            elif self.trainer.load_error:
+                self.status_bar.config(text=f"Saved model unreadable ({self.trainer.load_error}), retraining...")
+        self.poll_training()
+        if self.trainer.needs_retrain and self.identifier is None:
+            self.train_face_recognizer()
+
+        # Flag to track if an employee has logged in (employee ID -> time of their IN event)
         self.logged_in_employees = {}
 
-        # Attendance log storage
-        self.attendance_log = []
+        # IN/OUT state machine: repeated recognitions of someone already IN (or OUT) are not logged again
+        # until `min_gap_seconds` have passed; live events also need `confirmations` consistent sightings
+        self.presence = PresenceTracker(self.logged_in_employees, confirmations=3, min_gap_seconds=300.0)
+
+        # Set to "IN" or "OUT" to log recognized faces automatically (a camera that faces one way through the door)
+        self.auto_attendance = None
+
+        # Attendance log storage: events are journaled to Data/attendance (one segment per day) and replayed
+        # here at startup. Only the newest `live_rows` events stay in memory for the live panel (which starts
+        # with today's); the full history is in the journal and the report engine
+        self.journal = AttendanceJournal("Data/attendance").start()
+        self.attendance_log = deque(maxlen=self.live_rows)
+        history = list(self.journal.replay())
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.show_rows([record for record in history if record["Date"] == today])
+        self.presence.restore(history)
+
+        # Sessions and daily/monthly totals, updated as events are logged so the report opens instantly
+        self.report = ReportEngine(late_after="09:15:00")
+        for record in history:
+            self.report.add(record)
+        del history
+
+        # Queue depths and drop counts, read whenever the metrics are rendered
+        self.metrics.gauge("recognition_queue_depth", "Frames waiting for the recognition thread",
+                           lambda: self.frames_reader.queue_depth())
+        self.metrics.gauge("recognition_frames_dropped", "Frames skipped because recognition fell behind",
+                           lambda: self.frames_reader.frames_dropped)
+        self.metrics.gauge("motion_gated_frames", "Frames skipped by the motion gate",
+                           lambda: self.motion_gate.gated_frames)
+        self.metrics.gauge("journal_pending", "Attendance events not yet on disk",
+                           lambda: self.journal.events_queued - self.journal.events_written)
+        self.metrics.gauge("image_writer_queue_depth", "Captured images waiting to be written",
+                           self.image_writer.queue_depth)
+        self.metrics.gauge("image_writer_dropped", "Captured images dropped under backpressure",
+                           lambda: self.image_writer.dropped)
+        self.metrics.gauge("ui_events_pending", "Events waiting for the next UI batch", self.events.depth)
+        self.metrics_server = MetricsServer(self.metrics, self.metrics_port).start() if self.metrics_port else None
+        self.update_metrics_bar()
+        self.process_events()
+
+        # Follow faces on a background thread so capture() can log them without re-running the recognizer
+        self.recognition_running = True
+        self.recognition_thread = threading.Thread(target=self.recognition_loop, name="Recognition", daemon=True)
+        self.recognition_thread.start()
+
+        # Stop the capture thread and release the camera when the window closes
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Open the camera once the window has been drawn
+        self.root.after_idle(self.show_started)
 
     def create_ui(self):
         # Attendance Panel
@@ -79,7 +218,11 @@ class FaceDetectionAttendanceSystem:
 
         # Status Bar
         self.status_bar = tk.Label(self.root, text="System Messages", bd=1, relief=tk.SUNKEN, anchor=tk.W, font=("Arial", 10), bg="white")
-        self.status_bar.place(x=20, y=550, width=997, height=30)
+        self.status_bar.place(x=20, y=550, width=597, height=30)
+
+        # Live metrics summary (fps, latencies, drops, queue depth, events/min)
+        self.metrics_bar = tk.Label(self.root, text="", bd=1, relief=tk.SUNKEN, anchor=tk.W, font=("Arial", 9), bg="white")
+        self.metrics_bar.place(x=627, y=550, width=390, height=30)
 
         # Additional Control Buttons below Status Bar
         controls_frame = tk.Frame(self.root, bg="white")
@@ -91,6 +234,12 @@ class FaceDetectionAttendanceSystem:
         view_report_button = tk.Button(controls_frame, text="View Report", command=self.view_report, width=15, font=("Arial", 10))
         view_report_button.grid(row=0, column=2, padx=10)
 
+        profile_button = tk.Button(controls_frame, text="Profile 30 s", command=self.start_profiling, width=15, font=("Arial", 10))
+        profile_button.grid(row=0, column=3, padx=10)
+
+        export_button = tk.Button(controls_frame, text="Export", command=self.open_export, width=15, font=("Arial", 10))
+        export_button.grid(row=0, column=4, padx=10)
+
         # Start video stream
         self.update_video_stream()
 
@@ -99,150 +248,321 @@ class FaceDetectionAttendanceSystem:
         name = simpledialog.askstring("Input", "Enter Employee Name:")
 
         if employee_id and name:
-            # Add the new employee to the dictionary
-            self.employee_data[employee_id] = name
-            captured_faces = []
-            count = 0
-
-            while count < 10:
-                ret, frame = self.cap.read()
-                if not ret:
-                    continue
-                
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-                
-                for (x, y, w, h) in faces:
-                    count += 1
-                    face_img = gray[y:y+h, x:x+w]
-                    captured_faces.append(face_img)
-                    # Save each captured face
-                    cv2.imwrite(f"Data/{employee_id}_{count}.jpg", face_img)
-                    
-                    # Display feedback for capture
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    cv2.putText(frame, f"Capturing image {count}", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                    cv2.imshow("Capturing Face", frame)
-                    cv2.waitKey(100)
-                    
-                if count >= 10:
-                    break
-            
-            cv2.destroyWindow("Capturing Face")
-            self.train_face_recognizer()  # Retrain recognizer with the new data
-            messagebox.showinfo("Success", f"Employee {name} added and trained successfully!")
+            try:
+                check_employee_id(employee_id)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            # Grab a 2 s burst in the background and keep the SAMPLE_COUNT best, most varied face crops;
+            # the preview keeps running meanwhile
+            self.status_bar.config(text=f"Enrolling {name}: look at the camera and turn your head slightly...")
+            enrollment = BurstEnrollment(self.cap, self.face_cascade, sample_count=SAMPLE_COUNT, duration=2.0)
+            enrollment.start(lambda crops, qualities: self.events.post(
+                "call", self.finish_enrollment, employee_id, name, crops, qualities, enrollment.error))
 
         else:
             messagebox.showerror("Error", "Employee ID and Name are required!")
 
+    def finish_enrollment(self, employee_id, name, crops, qualities, error=None):
+        if error is not None:
+            self.status_bar.config(text=f"Enrollment of {name} failed: {error}")
+            messagebox.showerror("Error", f"Enrollment failed: {error}")
+            return
+        if len(crops) < MIN_SAMPLES:
+            self.status_bar.config(text=f"Enrollment of {name} failed")
+            messagebox.showerror("Error", f"Only {len(crops)} clear face images were captured (at least "
+                                          f"{MIN_SAMPLES} needed). Please try again.")
+            return
+
+        # Add the new employee to the registry (keeping any details entered in Employee Management)
+        record = dict(self.registry.get(employee_id) or {})
+        record.update(employee_id=employee_id, name=name)
+        self.registry.add(record, replace=True)
+
+        # Save the selected crops to the sample store in one write
+        self.sample_store.append_many(employee_id, crops, qualities, normalized=True)
+        self.add_samples(employee_id)
+        self.status_bar.config(text=f"Enrolled {name} with {len(crops)} samples")
+        messagebox.showinfo("Success", f"Employee {name} added and trained successfully!")
+
+    def add_samples(self, employee_id):
+        # New samples of one employee are in the store (here or from Employee Management): add them to the model
+        self.tracker.reset()
+        if self.identifier is not None:
+            self.identifier.add_from_store(self.sample_store, employee_id)
+            self.recognition.model_trained = True
+        else:
+            with self.metrics.time("train_incremental_ms", "Adding one employee to the model (ms)"):
+                self.trainer.add_employee(employee_id)  # Only the new samples are added to the model
+            self.recognition.model_trained = self.trainer.trained
+            if self.trainer.employee_tombstoned(employee_id):
+                self.train_face_recognizer()  # Re-enrolled ID: old samples must be compacted away
+
     def delete_employee(self):
         employee_id = simpledialog.askstring("Input", "Enter Employee ID to Delete:")
         if employee_id in self.employee_data:
-            del self.employee_data[employee_id]
-            # Remove saved face images
+            self.registry.delete(employee_id)
+            # Remove loose face images left over from before the sample store
             for file in os.listdir("Data"):
                 if file.startswith(f"{employee_id}_"):
                     os.remove(f"Data/{file}")
+            # Tombstone the samples and mask the employee out of the model;
+            # a full retrain only happens once enough samples are dead
+            self.tracker.reset()
+            if self.identifier is not None:
+                self.sample_store.delete_employee(employee_id)
+                self.identifier.remove_label(self.sample_store.label_for(employee_id))
+            else:
+                self.trainer.remove_employee(employee_id)
+                if self.trainer.compaction_due():
+                    self.train_face_recognizer()
             messagebox.showinfo("Success", f"Employee ID {employee_id} deleted successfully!")
-            self.train_face_recognizer()  # Retrain recognizer after deletion
         else:
             messagebox.showerror("Error", "Employee not found!")
 
     def train_face_recognizer(self):
-        # Train the face recognizer using all stored images
-        faces = []
-        labels = []
-
-        for file in os.listdir("Data"):
-            if file.endswith(".jpg"):
-                employee_id = file.split("_")[0]  # Extract the employee ID part (Emp001, Emp002, etc.)
-                if employee_id.startswith("Emp"):
-                    label = int(employee_id[3:])  # Extract label number from 'EmpXXX'
-                    img_path = os.path.join("Data", file)
-                    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-                    faces.append(img)
-                    labels.append(label)
-
-        if faces and labels:
-            labels = np.array(labels, dtype=np.int32)
-            self.face_recognizer.train(faces, labels)
-            self.face_recognizer.save("Data/face_recognizer.yml")  # Save trained model
-        else:
-            messagebox.showerror("Error", "No face data to train the recognizer!")
+        # Full retrain from all stored images in a worker process; also compacts away deleted employees.
+        # Recognition keeps using the current model until the new version is swapped in by poll_training().
+        if self.identifier is not None:
+            threading.Thread(target=self.rebuild_identifier, daemon=True).start()
+        elif self.background_trainer.start():
+            self.training_started = time.perf_counter()
+            self.status_bar.config(text=f"Training model v{self.background_trainer.version} in the background...")
+
+    def poll_training(self):
+        # Show training progress and swap in finished models
+        status = self.background_trainer.poll()
+        if status:
+            self.status_bar.config(text=status)
+        if self.identifier is None and self.face_recognizer is not self.trainer.face_recognizer:
+            self.face_recognizer = self.trainer.face_recognizer
+            self.tracker.reset()  # Re-recognize faces with the new model
+            if self.training_started is not None:
+                self.metrics.histogram("train_ms", "Full retrain, start to swap-in (ms)").observe(
+                    (time.perf_counter() - self.training_started) * 1000.0)
+                self.training_started = None
+        self.root.after(250, self.poll_training)
+
+    def rebuild_identifier(self):
+        # Recompute the feature matrix from the sample store, then swap it in
+        with self.metrics.time("train_ms", "Full retrain, start to swap-in (ms)"):
+            identifier = VectorIdentifier().load_store(self.sample_store)
+        self.recognition.swap_recognizer(identifier)
+        self.recognition.model_trained = not identifier.empty()
+        self.identifier = identifier
 
     def capture(self, status):
-        # Capture image and log attendance without checking if model is trained
-        ret, frame = self.cap.read()
-        if not ret:
+        # Capture image, recognize every face in it and log attendance for each one
+        latest = self.cap.read_latest()
+        if latest is None:
             messagebox.showerror("Error", "Failed to capture image!")
             return
-        
-        # Save the captured image (without face detection)
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        started = time.perf_counter()
+        frame = latest.image.copy()  # The ring slot is reused; the queued image write needs its own copy
+
+        now = datetime.now()
+        recognitions, latency_ms = self.live_recognitions, self.tracker.last_latency_ms
+        if not recognitions:
+            recognitions, latency_ms = self.recognition.process(frame)
+
+        # Save the captured image (queued; encoding and the disk write happen on the writer pool)
+        timestamp = now.strftime("%Y-%m-%d_%H-%M-%S")
         image_filename = f"Data/captured_{timestamp}.jpg"
-        cv2.imwrite(image_filename, frame)
+        saved = self.image_writer.submit(image_filename, frame, boxes=[r.box for r in recognitions])
 
         # Log the attendance
-        current_time = datetime.now().strftime("%H:%M:%S")
-        current_date = datetime.now().strftime("%Y-%m-%d")
+        current_time = now.strftime("%H:%M:%S")
 
-        # Record login or logout status
+        # Record login or logout status for everyone in the frame (an unrecognized frame is still logged as "Unknown")
         status_str = "Logged IN" if status == "IN" else "Logged OUT"
-        self.attendance_log.append({
-            "Employee ID": "Unknown", "Name": "Unknown", "Date": current_date, "Time": current_time, "Status": status_str
-        })
-        self.attendance_tree.insert("", "end", values=("Unknown", "Unknown", current_date, current_time, status_str))
-        self.status_bar.config(text=f"Image captured, {status_str} at {current_time}")
+        people = [(r.employee_id, r.name) for r in recognitions] or [("Unknown", "Unknown")]
+        logged, repeated = [], []
+        for employee_id, name in people:
+            if employee_id != "Unknown" and not self.presence.commit(employee_id, status, now.timestamp()):
+                repeated.append(name)  # Already logged with this status recently
+                continue
+            self.events.post("attendance", employee_id, name, status, now.timestamp())
+            logged.append(name)
+
+        message = f"{', '.join(logged)}: {status_str} at {current_time}" if logged else ""
+        if repeated:
+            message += f"{'; ' if message else ''}{', '.join(repeated)} already {status_str}"
+        if not saved:
+            # The writer queue is full (slow disk): the event is logged, but there is no photo of it
+            message += f"{'; ' if message else ''}image NOT saved, disk too slow"
+        self.metrics.histogram("capture_ms", "Capture button handling (ms)").observe(
+            (time.perf_counter() - started) * 1000.0)
+        self.events.post("status", f"{message} (recognition {latency_ms:.0f} ms)")
+
+    def log_attendance(self, employee_id, name, status, timestamp):
+        # Queued for the journal's background writer; the disk flush never blocks the UI.
+        # Runs on the Tk thread (from process_events); the row is shown by show_rows()
+        record = self.journal.append(employee_id, name, status, timestamp)
+        self.events_logged.inc()
+        self.events_rate.mark()
+        self.report.add(record)
+        return record
+
+    def show_rows(self, records):
+        # Add rows to the live panel and drop the oldest beyond `live_rows` (the report view has them all)
+        for record in list(records)[-self.live_rows:]:
+            self.attendance_log.append(record)
+            self.live_row_ids.append(self.attendance_tree.insert("", "end", values=(
+                record["Employee ID"], record["Name"], record["Date"], record["Time"], record["Status"])))
+        excess = len(self.live_row_ids) - self.live_rows
+        if excess > 0:
+            self.attendance_tree.delete(*[self.live_row_ids.popleft() for _ in range(excess)])
+        if records:
+            self.attendance_tree.see(self.live_row_ids[-1])
+
+    def process_events(self):
+        # Apply everything posted since the last tick: all attendance rows in one batch, only the newest status
+        batch = self.events.drain()
+        if batch:
+            with self.metrics.time("ui_batch_ms", "Applying one batch of UI events (ms)"):
+                records, status = [], None
+                for kind, args in batch:
+                    if kind == "attendance":
+                        records.append(self.log_attendance(*args))
+                    elif kind == "status":
+                        status = args[0]
+                    elif kind == "call":
+                        args[0](*args[1:])
+                if records:
+                    self.show_rows(records)
+                if status is not None:
+                    self.status_bar.config(text=status)
+        self.root.after(100, self.process_events)
 
     def view_report(self):
-        # Show full attendance report
-        report_window = tk.Toplevel(self.root)
-        report_window.title("Monthly Attendance Report")
-        report_window.geometry("800x600")
-
-        report_tree = ttk.Treeview(report_window, columns=("Employee ID", "Name", "Date", "Time", "Status"), show="headings")
-        report_tree.heading("Employee ID", text="Employee ID")
-        report_tree.heading("Name", text="Name")
-        report_tree.heading("Date", text="Date")
-        report_tree.heading("Time", text="Time")
-        report_tree.heading("Status", text="Status")
-        report_tree.column("Employee ID", width=80, anchor="center")
-        report_tree.column("Name", width=120, anchor="center")
-        report_tree.column("Date", width=80, anchor="center")
-        report_tree.column("Time", width=80, anchor="center")
-        report_tree.column("Status", width=80, anchor="center")
-        report_tree.pack(fill="both", expand=True)
-
-        # Populate the report with attendance log data
-        for record in self.attendance_log:
-            report_tree.insert("", "end", values=(record["Employee ID"], record["Name"], record["Date"], record["Time"], record["Status"]))
-        
-        # Close button
-        close_button = tk.Button(report_window, text="Close", command=report_window.destroy)
-        close_button.pack(pady=10)
+        # Show the attendance report: working hours, first IN / last OUT and late arrivals, one page at a time
+        ReportWindow(self.root, self.report)
 
-    def update_video_stream(self):
-        # Capture frame from camera and update the GUI
-        ret, frame = self.cap.read()
-        if ret:
-            cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(cv2image)
-            img_tk = ImageTk.PhotoImage(image=img)
-            self.video_label.img_tk = img_tk
-            self.video_label.config(image=img_tk)
+    def open_export(self):
+        # Attendance/employee export for a date range; runs on its own thread with a progress bar
+        from attendance_export import ExportWindow
 
-        self.root.after(10, self.update_video_stream)
+        ExportWindow(self.root, self.journal, self.registry.db_path)
 
-    def open_employee_management(self):
-        # Open the Employee Management System
-        emp_manager = EmployeeManagementSystem(self)
-        emp_manager.run()
+    def update_video_stream(self):
+        # Show the latest frame from the capture thread, skipping the redraw if nothing new arrived
+        self.profiler.check()
+        latest = self.cap.read_latest()
+        rendered = latest is not None and latest.seq != self.last_frame_seq
+        if rendered:
+            self.last_frame_seq = latest.seq
+            with self.metrics.time("render_ms", "Preview frame render (ms)"):
+                self.preview.render(self.video_label, latest.image, self.live_recognitions)
+            self.preview_fps.mark()
+            if self.first_frame_ms is None:
+                self.report_first_frame()
+
+        # Refresh as fast as frames arrive, slower while the camera is idle or the UI is busy
+        self.root.after(self.preview.next_interval_ms(rendered), self.update_video_stream)
+
+    def show_started(self):
+        # The window is on screen: record how long that took and start opening the camera
+        window_ms = (time.perf_counter() - PROCESS_STARTED) * 1000.0
+        self.metrics.gauge("startup_window_ms", "Process start to window shown (ms)").set(window_ms)
+        self.status_bar.config(text=f"Window ready in {window_ms:.0f} ms, opening camera...")
+        self.cap.start_async()
+
+    def report_first_frame(self):
+        # Time to first frame: process start (including imports) to the first preview frame on screen
+        self.first_frame_ms = (time.perf_counter() - PROCESS_STARTED) * 1000.0
+        self.metrics.gauge("startup_first_frame_ms", "Process start to first preview frame (ms)").set(
+            self.first_frame_ms)
+        window_ms = self.metrics.value("startup_window_ms")
+        self.status_bar.config(text=f"First frame after {self.first_frame_ms:.0f} ms (window {window_ms:.0f} ms)")
+
+    def update_metrics_bar(self):
+        # One-line summary of the hot-path metrics, refreshed every 2 s
+        def p95(name):
+            value = self.metrics.percentile(name, 95)
+            return "-" if value is None else f"{value:.0f}"
+
+        text = (f"{self.metrics.value('recognition_fps'):.0f} fps | detect {p95('detect_ms')} ms | "
+                f"predict {p95('predict_ms')} ms | dropped {self.metrics.value('recognition_frames_dropped'):.0f} | "
+                f"queue {self.metrics.value('image_writer_queue_depth'):.0f} | "
+                f"{self.metrics.value('events_per_minute'):.1f} ev/min")
+        if self.profiler.active:
+            text = "PROFILING | " + text
+        elif self.profiler.error:
+            text = f"Profiling failed: {self.profiler.error} | " + text
+        self.metrics_bar.config(text=text)
+        self.root.after(2000, self.update_metrics_bar)
+
+    def start_profiling(self):
+        # Profile the UI and recognition threads for 30 s; the .prof files are written when the window ends
+        prefix = self.profiler.start(30.0)
+        self.status_bar.config(text=f"Profiling for 30 s to {prefix}_*.prof")
+
+    def recognition_loop(self):
+        # Consume frames from the camera ring (own cursor) and keep the tracked identities up to date
+        frames = None
+        while self.recognition_running:
+            self.profiler.check()
+            if frames is None:
+                if not self.cap.wait_ready(timeout=0.5):
+                    if self.cap.error is not None:
+                        self.events.post("status", f"Camera unavailable: {self.cap.error}")
+                        return
+                    time.sleep(0.1)  # Camera not opened yet (or it failed): don't spin
+                    continue
+                frames = self.frames_reader = self.cap.reader()
+            frame = frames.get(timeout=0.5)
+            if frame is None:
+                continue
+            self.recognition_fps.mark()
+            if not self.motion_gate.check(frame.image, frame.timestamp):
+                # Idle entrance: forget stale tracks and skip detection entirely
+                if self.tracker.tracks:
+                    self.tracker.reset()
+                    self.live_recognitions = []
+                continue
+            self.live_recognitions = self.tracker.process(frame.image)[0]
+            if self.auto_attendance:
+                status = self.auto_attendance
+                for r in self.live_recognitions:
+                    if r.employee_id != "Unknown" and self.presence.observe(r.employee_id, status, frame.timestamp):
+                        # Tk widgets may only be touched from the main thread: hand the event to the UI batch
+                        self.events.post("attendance", r.employee_id, r.name, status, frame.timestamp)
 
     def open_employee_management(self):
+        # Imported on first use: the module pulls in tkcalendar, which startup never needs
+        from Emplyee_code import EmployeeManagementSystem
+
         new_window = tk.Toplevel(self.root)
-        app = EmployeeManagementSystem(new_window)  # Create an instance of EmployeeManagementSystem
+        # Samples it captures go to the shared store; on_samples_added puts them into the live model too
+        app = EmployeeManagementSystem(new_window, sample_store=self.sample_store, registry=self.registry,
+                                       camera=self.cap, metrics=self.metrics, on_samples_added=self.add_samples)
         new_window.mainloop()
+
+    def on_close(self):
+        self.recognition_running = False
+        self.recognition_thread.join(timeout=1)
+        for kind, args in self.events.drain():
+            if kind == "attendance":
+                self.log_attendance(*args)  # Journal events the UI hasn't applied yet
+        self.background_trainer.stop()
+        if not self.journal.close():  # Flushes any events still queued
+            unsaved = self.journal.events_queued - self.journal.events_written
+            messagebox.showwarning("Attendance Not Saved", f"{unsaved} attendance events could not be written to "
+                                   f"{self.journal.directory}: {self.journal.last_error}")
+        self.image_writer.close()  # Writes any captures still queued
+        self.sample_store.close()  # Releases the write lock (see bulk_import)
+        self.cap.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.root.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
-    app = FaceDetectionAttendanceSystem(root)
-    root.mainloop()
+    try:
+        app = FaceDetectionAttendanceSystem(root)
+    except StoreLockedError as e:
+        # Another process (e.g. a bulk import) is writing the sample store
+        messagebox.showerror("Sample Store In Use", f"{e}.\nWait for it to finish, then start again.")
+        root.destroy()
+    else:
+        root.mainloop()
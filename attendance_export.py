@@ -0,0 +1,480 @@
+"""Attendance and employee exports over any date range, streamed from the journal and the registry.
+
+Rows are produced one journal segment (one day) at a time and written as they come: .xlsx through an openpyxl
+write-only workbook, .csv through the csv module, and .npz as compressed column chunks for the payroll
+pipeline (`np.load(path)` works; `read_columnar()` returns whole columns). Memory stays flat however long
+the range is: at most one day of events, two days of daily totals and one column chunk are held at a time.
+
+    python attendance_export.py daily 2026-01-01 2026-12-31 payroll_2026.npz
+    python attendance_export.py bench [employees] [days]
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import tkinter as tk
+import zipfile
+from tkinter import ttk, filedialog, messagebox
+
+import numpy as np
+
+from attendance_journal import STATUS_TEXT
+from attendance_report import DailySummary
+from employee_registry import EXCEL_HEADERS, FIELDS
+
+# (header, column key, columnar type); "dict" columns are dictionary-encoded strings in the .npz format
+EVENT_COLUMNS = (("Employee ID", "employee_id", "dict"), ("Name", "name", "dict"), ("Date", "date", "dict"),
+                 ("Time", "time", "U8"), ("Status", "status", "dict"), ("Timestamp", "timestamp", "f8"))
+DAILY_COLUMNS = (("Employee ID", "employee_id", "dict"), ("Name", "name", "dict"), ("Date", "date", "dict"),
+                 ("First IN", "first_in", "U8"), ("Last OUT", "last_out", "U8"), ("Hours", "hours", "f8"),
+                 ("Sessions", "sessions", "i4"), ("Late", "late", "u1"))
+EMPLOYEE_COLUMNS = tuple((header, field, "dict") for header, field in zip(EXCEL_HEADERS, FIELDS))
+
+XLSX_MAX_ROWS = 1048576  # Per sheet, header included; longer exports continue on the next sheet
+
+
+def _segments(journal, start_date, end_date):
+    return [date for date, _ in journal.segments()
+            if not (start_date and date < start_date) and not (end_date and date > end_date)]
+
+
+def iter_events(journal, start_date=None, end_date=None, progress=None):
+    """Every IN/OUT event between two dates (inclusive), as EVENT_COLUMNS rows in journal order."""
+    dates = _segments(journal, start_date, end_date)
+    for done, date in enumerate(dates, 1):
+        for timestamp, code, employee_id, name in journal.read_segment(date):
+            yield (employee_id, name, date, time.strftime("%H:%M:%S", time.localtime(timestamp)), STATUS_TEXT[code],
+                   timestamp)
+        if progress is not None:
+            progress(done / len(dates))
+
+
+def iter_daily(journal, start_date=None, end_date=None, late_after="09:15:00", progress=None):
+    """Per-employee daily totals (first IN, last OUT, hours, sessions, late) as DAILY_COLUMNS rows, by date.
+
+    Sessions are paired like ReportEngine does, crediting the day a session started on. Only the current and
+    previous day are kept open, so a session still open after the next day has ended is dropped as a
+    forgotten log-out instead of being credited with days of hours.
+    """
+    open_sessions = {}  # employee_id -> (IN timestamp, IN date)
+    days = {}  # date -> {employee_id: DailySummary}, at most two dates
+    dates = _segments(journal, start_date, end_date)
+
+    def finish(date):
+        for employee_id, day in sorted(days.pop(date).items()):
+            yield (employee_id, day.name, date, day.first_in or "", day.last_out or "",
+                   round(day.seconds / 3600.0, 2), day.sessions, int(day.late))
+
+    def summary(employee_id, date, name):
+        day = days[date].get(employee_id)
+        if day is None:
+            day = days[date][employee_id] = DailySummary(name)
+        return day
+
+    for done, date in enumerate(dates, 1):
+        for old in sorted(days)[:-1]:
+            yield from finish(old)
+        for employee_id in [e for e, (_, started) in open_sessions.items() if started not in days]:
+            del open_sessions[employee_id]
+        days[date] = {}
+        for timestamp, code, employee_id, name in journal.read_segment(date):
+            if employee_id == "Unknown":
+                continue
+            day = summary(employee_id, date, name)
+            clock = time.strftime("%H:%M:%S", time.localtime(timestamp))
+            if code == 1:
+                if day.first_in is None:
+                    day.first_in = clock
+                    day.late = clock > late_after
+                started = open_sessions.get(employee_id)
+                if started is None or started[1] != date:
+                    open_sessions[employee_id] = (timestamp, date)
+            else:
+                day.last_out = clock
+                started = open_sessions.pop(employee_id, None)
+                if started is None:
+                    continue
+                start_day = summary(employee_id, started[1], name)
+                start_day.seconds += max(timestamp - started[0], 0.0)
+                start_day.sessions += 1
+        if progress is not None:
+            progress(done / len(dates))
+    for date in sorted(days):
+        yield from finish(date)
+
+
+def iter_employees(db_path="employee_data.db", progress=None):
+    """Every registry record as EMPLOYEE_COLUMNS rows, read through a separate connection (WAL lets it run
+    alongside the UI's writes)."""
+    connection = sqlite3.connect(db_path)
+    try:
+        total = connection.execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+        for done, row in enumerate(connection.execute(f"SELECT {', '.join(FIELDS)} FROM employees ORDER BY rowid"),
+                                   1):
+            yield tuple("" if value is None else value for value in row)
+            if progress is not None and done % 1000 == 0:
+                progress(done / total)
+    finally:
+        connection.close()
+
+
+# ---- writers: append(row) as rows arrive, close() moves the finished file into place, abort() discards it ----
+
+def _tmp_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.tmp{ext}"
+
+
+class CsvWriter:
+    def __init__(self, path, columns):
+        self.path = path
+        self.file = open(_tmp_path(path), "w", newline="", encoding="utf-8-sig")  # BOM so Excel reads UTF-8
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([header for header, _, _ in columns])
+
+    def append(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+        os.replace(_tmp_path(self.path), self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(_tmp_path(self.path))
+
+
+class XlsxWriter:
+    """openpyxl write-only workbook: rows go straight to a temporary XML stream instead of a cell tree."""
+
+    def __init__(self, path, columns, title="Export"):
+        import openpyxl
+
+        self.path = path
+        self.title = title
+        self.headers = [header for header, _, _ in columns]
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheets = 0
+        self.sheet_rows = 0
+        self._next_sheet()
+
+    def _next_sheet(self):
+        self.sheets += 1
+        self.sheet = self.workbook.create_sheet(self.title if self.sheets == 1 else f"{self.title} {self.sheets}")
+        self.sheet.append(self.headers)
+        self.sheet_rows = 1
+
+    def append(self, row):
+        if self.sheet_rows >= XLSX_MAX_ROWS:
+            self._next_sheet()
+        self.sheet.append(row)
+        self.sheet_rows += 1
+
+    def close(self):
+        self.workbook.save(_tmp_path(self.path))
+        os.replace(_tmp_path(self.path), self.path)
+
+    def abort(self):
+        self.workbook.close()
+
+
+class ColumnarWriter:
+    """Columns in chunks of `group_rows` as deflated .npy members of a zip, i.e. an .npz file.
+
+    Members are `<key>.<group>.npy` per column chunk, `<key>.dictionary.npy` for dictionary-encoded string
+    columns (the chunks hold int32 codes) and `schema.json`. Only one chunk of each column is in memory.
+    """
+
+    def __init__(self, path, columns, group_rows=65536, dataset=None):
+        self.path = path
+        self.columns = columns
+        self.group_rows = group_rows
+        self.dataset = dataset
+        self.archive = zipfile.ZipFile(_tmp_path(path), "w", zipfile.ZIP_DEFLATED, allowZip64=True)
+        self.buffers = [np.empty(group_rows, np.int32 if kind == "dict" else kind) for _, _, kind in columns]
+        self.dictionaries = [{} if kind == "dict" else None for _, _, kind in columns]
+        self.filled = 0
+        self.groups = 0
+        self.rows = 0
+
+    def append(self, row):
+        for buffer, dictionary, value in zip(self.buffers, self.dictionaries, row):
+            if dictionary is not None:
+                code = dictionary.get(value)
+                if code is None:
+                    code = dictionary[value] = len(dictionary)
+                value = code
+            buffer[self.filled] = value
+        self.filled += 1
+        if self.filled == self.group_rows:
+            self._flush()
+
+    def _write(self, name, array):
+        with self.archive.open(name, "w", force_zip64=True) as f:
+            np.save(f, array)
+
+    def _flush(self):
+        if not self.filled:
+            return
+        for (_, key, _), buffer in zip(self.columns, self.buffers):
+            self._write(f"{key}.{self.groups:05d}.npy", buffer[:self.filled])
+        self.groups += 1
+        self.rows += self.filled
+        self.filled = 0
+
+    def close(self):
+        self._flush()
+        for (_, key, _), dictionary in zip(self.columns, self.dictionaries):
+            if dictionary is not None:
+                self._write(f"{key}.dictionary.npy", np.array(list(dictionary) or [""], dtype=str))
+        schema = {"dataset": self.dataset, "rows": self.rows, "groups": self.groups, "group_rows": self.group_rows,
+                  "columns": [{"name": header, "key": key, "type": kind} for header, key, kind in self.columns]}
+        self.archive.writestr("schema.json", json.dumps(schema, indent=1))
+        self.archive.close()
+        os.replace(_tmp_path(self.path), self.path)
+
+    def abort(self):
+        self.archive.close()
+        os.remove(_tmp_path(self.path))
+
+
+def read_columnar(path, columns=None):
+    """Load an .npz export as {key: array} (strings decoded), optionally only some column keys."""
+    with zipfile.ZipFile(path) as archive:
+        schema = json.loads(archive.read("schema.json"))
+
+        def load(name):
+            return np.load(io.BytesIO(archive.read(name)))
+
+        result = {}
+        for column in schema["columns"]:
+            key = column["key"]
+            if columns is not None and key not in columns:
+                continue
+            chunks = [load(f"{key}.{group:05d}.npy") for group in range(schema["groups"])]
+            values = np.concatenate(chunks) if chunks else np.zeros(0, np.int32 if column["type"] == "dict"
+                                                                    else column["type"])
+            result[key] = load(f"{key}.dictionary.npy")[values] if column["type"] == "dict" else values
+        return result
+
+
+def open_writer(path, columns, dataset=None):
+    """Writer for the file type given by the extension (.xlsx, .csv or .npz)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return CsvWriter(path, columns)
+    if ext == ".xlsx":
+        return XlsxWriter(path, columns, (dataset or "export").capitalize())
+    if ext == ".npz":
+        return ColumnarWriter(path, columns, dataset=dataset)
+    raise ValueError(f"Unsupported export format {ext or path!r}; use .xlsx, .csv or .npz")
+
+
+DATASETS = {"events": EVENT_COLUMNS, "daily": DAILY_COLUMNS, "employees": EMPLOYEE_COLUMNS}
+
+
+class ExportJob:
+    """One export, run on a background thread (`start()`) or inline (`run()`).
+
+    The UI polls `progress` (0..1), `rows`, `done` and `error`; `cancel()` stops at the next row and removes
+    the partial file.
+    """
+
+    def __init__(self, dataset, path, journal=None, registry_path="employee_data.db", start_date=None,
+                 end_date=None, late_after="09:15:00"):
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset {dataset!r}; choose from {', '.join(DATASETS)}")
+        self.dataset = dataset
+        self.path = path
+        self.journal = journal
+        self.registry_path = registry_path
+        self.start_date = start_date
+        self.end_date = end_date
+        self.late_after = late_after
+        self.thread = None
+        self.cancelled = False
+
+        # Status
+        self.progress = 0.0
+        self.rows = 0
+        self.done = False
+        self.error = None
+        self.seconds = 0.0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="Export", daemon=True)
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _rows(self):
+        def progress(fraction):
+            self.progress = fraction
+
+        if self.dataset == "employees":
+            return iter_employees(self.registry_path, progress)
+        if self.journal.running:
+            if not self.journal.flush():  # Include events that are still queued for the writer
+                raise OSError(f"Attendance journal writes are failing ({self.journal.last_error}); "
+                              "recent events would be missing from the export")
+        if self.dataset == "events":
+            return iter_events(self.journal, self.start_date, self.end_date, progress)
+        return iter_daily(self.journal, self.start_date, self.end_date, self.late_after, progress)
+
+    def run(self):
+        started = time.perf_counter()
+        writer = None
+        try:
+            writer = open_writer(self.path, DATASETS[self.dataset], self.dataset)
+            for row in self._rows():
+                if self.cancelled:
+                    break
+                writer.append(row)
+                self.rows += 1
+            if self.cancelled:
+                writer.abort()
+            else:
+                writer.close()
+                self.progress = 1.0
+        except Exception as e:  # Reported to the UI instead of dying silently on the worker thread
+            self.error = e
+            if writer is not None:
+                try:
+                    writer.abort()
+                except OSError:
+                    pass
+        self.seconds = time.perf_counter() - started
+        self.done = True
+        return self
+
+
+class ExportWindow:
+    """Date range, dataset and file picker for an export, with a progress bar while the job runs."""
+
+    def __init__(self, parent, journal, registry_path="employee_data.db"):
+        self.journal = journal
+        self.registry_path = registry_path
+        self.job = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Export Attendance")
+        self.window.geometry("420x200")
+
+        form = tk.Frame(self.window)
+        form.pack(fill="x", padx=10, pady=10)
+        tk.Label(form, text="Data:").grid(row=0, column=0, sticky="w", pady=3)
+        self.dataset_cb = ttk.Combobox(form, values=list(DATASETS), state="readonly", width=15)
+        self.dataset_cb.set("daily")
+        self.dataset_cb.grid(row=0, column=1, sticky="w")
+        tk.Label(form, text="From (YYYY-MM-DD):").grid(row=1, column=0, sticky="w", pady=3)
+        self.start_entry = tk.Entry(form, width=12)
+        self.start_entry.insert(0, time.strftime("%Y-%m-01"))
+        self.start_entry.grid(row=1, column=1, sticky="w")
+        tk.Label(form, text="To (YYYY-MM-DD):").grid(row=2, column=0, sticky="w", pady=3)
+        self.end_entry = tk.Entry(form, width=12)
+        self.end_entry.insert(0, time.strftime("%Y-%m-%d"))
+        self.end_entry.grid(row=2, column=1, sticky="w")
+
+        self.progress_bar = ttk.Progressbar(self.window, maximum=1.0, length=400)
+        self.progress_bar.pack(padx=10)
+        self.status_label = tk.Label(self.window, text="")
+        self.status_label.pack()
+
+        buttons = tk.Frame(self.window)
+        buttons.pack(pady=5)
+        self.export_button = tk.Button(buttons, text="Export...", command=self.export, width=10)
+        self.export_button.pack(side="left", padx=5)
+        tk.Button(buttons, text="Close", command=self.close, width=10).pack(side="left", padx=5)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+    def export(self):
+        dataset = self.dataset_cb.get()
+        start_date, end_date = self.start_entry.get().strip(), self.end_entry.get().strip()
+        for value in (start_date, end_date):
+            try:
+                time.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                messagebox.showerror("Export", f"{value!r} is not a YYYY-MM-DD date.", parent=self.window)
+                return
+        path = filedialog.asksaveasfilename(
+            parent=self.window, defaultextension=".xlsx", initialfile=f"{dataset}_{start_date}_{end_date}.xlsx",
+            filetypes=[("Excel workbook", "*.xlsx"), ("CSV", "*.csv"), ("Columnar (payroll)", "*.npz")])
+        if not path:
+            return
+        self.job = ExportJob(dataset, path, self.journal, self.registry_path, start_date, end_date).start()
+        self.export_button.config(state=tk.DISABLED)
+        self.poll()
+
+    def poll(self):
+        # The job runs on its own thread; the dialog only reads its counters
+        job = self.job
+        self.progress_bar["value"] = job.progress
+        self.status_label.config(text=f"{job.rows:,} rows")
+        if not job.done:
+            self.window.after(200, self.poll)
+            return
+        self.export_button.config(state=tk.NORMAL)
+        if job.error is not None:
+            self.status_label.config(text=f"Export failed: {job.error}")
+        elif not job.cancelled:
+            self.status_label.config(text=f"{job.rows:,} rows written to {os.path.basename(job.path)} "
+                                          f"in {job.seconds:.1f} s")
+
+    def close(self):
+        if self.job is not None and not self.job.done:
+            self.job.cancel()
+        self.window.destroy()
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import tracemalloc
+
+    from attendance_journal import AttendanceJournal, encode_record
+
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        # Synthetic year (IN, OUT, IN, OUT per employee per day), then each dataset/format with its peak memory
+        # (timed under tracemalloc, so roughly twice as slow as a normal run; a year of events is left out of
+        # the .xlsx run because openpyxl needs minutes for it, at the same flat memory)
+        employees = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        day_count = int(sys.argv[3]) if len(sys.argv) > 3 else 365
+        directory = tempfile.mkdtemp()
+        journal = AttendanceJournal(directory)
+        os.makedirs(directory, exist_ok=True)
+        base = time.mktime(time.strptime("2026-01-01 08:30:00", "%Y-%m-%d %H:%M:%S"))
+        for day in range(day_count):
+            start = base + day * 86400
+            date = time.strftime("%Y-%m-%d", time.localtime(start))
+            with open(journal.segment_path(date), "wb") as f:
+                f.write(b"".join(encode_record(start + slot * 4 * 3600 + e * 1.5, 1 - slot % 2, f"Emp{e:04d}",
+                                               f"Employee {e}") for slot in range(4) for e in range(employees)))
+        print(f"journal: events={employees * day_count * 4} days={day_count}")
+        for dataset, ext in (("daily", ".npz"), ("daily", ".csv"), ("daily", ".xlsx"), ("events", ".npz"),
+                             ("events", ".csv")):
+            path = os.path.join(directory, f"{dataset}{ext}")
+            tracemalloc.start()
+            job = ExportJob(dataset, path, journal).run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if job.error is not None:
+                raise job.error
+            print(f"{dataset}{ext}: rows={job.rows} seconds={job.seconds:.1f} "
+                  f"rows_per_second={job.rows / job.seconds:.0f} peak_mb={peak / 2 ** 20:.1f} "
+                  f"file_mb={os.path.getsize(path) / 2 ** 20:.1f}")
+        hours = read_columnar(os.path.join(directory, "daily.npz"), ["employee_id", "hours"])
+        print(f"read_columnar: rows={len(hours['hours'])} total_hours={hours['hours'].sum():.0f}")
+    elif len(sys.argv) == 5:
+        # python attendance_export.py <events|daily|employees> <from> <to> <file.xlsx|.csv|.npz>
+        job = ExportJob(sys.argv[1], sys.argv[4], AttendanceJournal("Data/attendance"), "employee_data.db",
+                        sys.argv[2], sys.argv[3]).run()
+        if job.error is not None:
+            raise job.error
+        print(f"{job.rows} rows written to {job.path} in {job.seconds:.1f} s")
+    else:
+        print(__doc__)
@@ -0,0 +1,299 @@
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+# Record = header (payload length, crc32 of payload) + payload
+# Payload = timestamp, status (1 = IN, 0 = OUT), ID length, name length, then the UTF-8 ID and name
+HEADER = struct.Struct("<HI")
+PAYLOAD = struct.Struct("<dBBB")
+SEGMENT_PREFIX = "attendance-"
+SEGMENT_SUFFIX = ".log"
+
+STATUS_TEXT = {1: "Logged IN", 0: "Logged OUT"}
+
+
+def _field(text):
+    # At most 255 bytes, cut on a character boundary so the record always decodes
+    return text.encode()[:255].decode("utf-8", "ignore").encode()
+
+
+def encode_record(timestamp, status, employee_id, name):
+    employee_id = _field(employee_id)
+    name = _field(name)
+    payload = PAYLOAD.pack(timestamp, status, len(employee_id), len(name)) + employee_id + name
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_records(data):
+    """Yield (timestamp, status, employee_id, name, end_offset) until the data ends or a record is torn/corrupt."""
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, crc = HEADER.unpack_from(data, offset)
+        start, end = offset + HEADER.size, offset + HEADER.size + length
+        if end > len(data) or length < PAYLOAD.size or zlib.crc32(data[start:end]) != crc:
+            return
+        timestamp, status, id_len, name_len = PAYLOAD.unpack_from(data, start)
+        text = data[start + PAYLOAD.size:end]
+        # "replace": segments written before fields were cut on character boundaries may end mid-character
+        yield (timestamp, status, text[:id_len].decode("utf-8", "replace"),
+               text[id_len:id_len + name_len].decode("utf-8", "replace"), end)
+        offset = end
+
+
+def event_dict(timestamp, status, employee_id, name):
+    """A journal record in the same shape as the entries of FaceDetectionAttendanceSystem.attendance_log."""
+    local = time.localtime(timestamp)
+    return {"Employee ID": employee_id, "Name": name, "Date": time.strftime("%Y-%m-%d", local),
+            "Time": time.strftime("%H:%M:%S", local), "Status": STATUS_TEXT[status], "Timestamp": timestamp}
+
+
+class AttendanceJournal:
+    """Append-only attendance log on disk, one segment file per day.
+
+    `append()` only queues the event; a writer thread drains whatever has queued up, writes it with one
+    write() per segment and makes it durable with a single fsync (group commit), so a burst at shift change
+    costs one disk flush instead of one per person. A crash can only lose the torn tail of the last record,
+    which replay and the next append ignore.
+    """
+
+    def __init__(self, directory="Data/attendance", max_batch=1024):
+        self.directory = directory
+        self.max_batch = max_batch
+        self.pending = queue.Queue()
+        self.handles = {}  # date -> open append handle
+        self.thread = None
+        self.running = False
+        self.condition = threading.Condition()
+
+        # Counters
+        self.events_queued = 0
+        self.events_written = 0
+        self.commits = 0
+        self.last_commit_ms = 0.0
+        self.write_errors = 0
+        self.last_error = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+        return self
+
+    # ---- writing ----
+
+    def append(self, employee_id, name, status, timestamp=None):
+        """Queue one IN/OUT event (status "IN" or "OUT") and return it as an attendance_log entry."""
+        if timestamp is None:
+            timestamp = time.time()
+        code = 1 if status == "IN" else 0
+        with self.condition:
+            self.events_queued += 1
+        self.pending.put((timestamp, code, employee_id, name))
+        return event_dict(timestamp, code, employee_id, name)
+
+    def _writer(self):
+        batch = []  # Events not on disk yet, including any from a failed commit
+        backoff = 0.0
+        while self.running or batch or not self.pending.empty():
+            if not batch:
+                try:
+                    batch = [self.pending.get(timeout=0.2)]
+                except queue.Empty:
+                    continue
+            # Group commit: everything that queued up while the previous fsync ran goes in this one
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            started = time.perf_counter()
+            failed = self._commit(batch)
+            self.last_commit_ms = (time.perf_counter() - started) * 1000.0
+            with self.condition:
+                self.commits += 1
+                self.events_written += len(batch) - len(failed)  # Only what is durable counts for flush()
+                self.condition.notify_all()
+            batch = failed
+            if failed:
+                # Disk full, unplugged share, ...: keep the events and retry, backing off up to 5 s
+                if not self.running:
+                    break  # close() gave up waiting; flush() has already reported the loss
+                backoff = min(max(backoff * 2, 0.1), 5.0)
+                time.sleep(backoff)
+            else:
+                backoff = 0.0
+
+    def _commit(self, batch):
+        """Write and fsync a batch, one segment at a time. Returns the events that could not be written."""
+        by_date = {}
+        for event in batch:
+            by_date.setdefault(time.strftime("%Y-%m-%d", time.localtime(event[0])), []).append(event)
+        failed = []
+        for date, events in by_date.items():
+            size = None
+            try:
+                handle = self._handle(date)
+                size = os.fstat(handle.fileno()).st_size
+                handle.write(b"".join(encode_record(*event) for event in events))
+                handle.flush()
+                os.fsync(handle.fileno())
+            except OSError as e:
+                self.write_errors += 1
+                self.last_error = e
+                failed.extend(events)
+                # Cut off whatever part of this write reached the file, so the retry doesn't duplicate it
+                handle = self.handles.pop(date, None)
+                if handle is not None:
+                    try:
+                        handle.close()
+                        if size is not None:
+                            os.truncate(self.segment_path(date), size)
+                    except OSError:
+                        pass  # Reopening for the retry trims a torn tail anyway
+        return failed
+
+    def _handle(self, date):
+        handle = self.handles.get(date)
+        if handle is None:
+            path = self.segment_path(date)
+            if os.path.exists(path):
+                self._trim_torn_tail(path)
+            handle = open(path, "ab")
+            self.handles[date] = handle
+            self.rotate(keep=date)
+        return handle
+
+    @staticmethod
+    def _trim_torn_tail(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        valid = 0
+        for record in decode_records(data):
+            valid = record[-1]
+        if valid != len(data):
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+
+    def rotate(self, keep=None):
+        """Close the append handles of every segment except `keep` (today's, by default)."""
+        keep = keep or time.strftime("%Y-%m-%d")
+        for date in [d for d in self.handles if d != keep]:
+            self.handles.pop(date).close()
+
+    def flush(self, timeout=5.0):
+        """Block until every event queued so far is on disk. Returns False if that didn't happen in time
+        (e.g. writes are failing; see write_errors and last_error), in which case they are still being retried."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            target = self.events_queued
+            while self.events_written < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        """Flush and stop the writer. Returns False if events queued so far could not be written (they are lost)."""
+        flushed = self.flush(timeout)
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+        for handle in self.handles.values():
+            handle.close()
+        self.handles.clear()
+        return flushed
+
+    # ---- reading ----
+
+    def segment_path(self, date):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{date}{SEGMENT_SUFFIX}")
+
+    def segments(self):
+        """[(date, path)] of every segment on disk, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(f for f in os.listdir(self.directory)
+                       if f.startswith(SEGMENT_PREFIX) and f.endswith(SEGMENT_SUFFIX))
+        return [(f[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)], os.path.join(self.directory, f)) for f in names]
+
+    def read_segment(self, date):
+        """Raw (timestamp, status, employee_id, name) tuples of one day's segment."""
+        path = self.segment_path(date)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            data = f.read()
+        return [record[:4] for record in decode_records(data)]
+
+    def replay(self, start_date=None, end_date=None):
+        """Yield every committed event (as attendance_log entries) between two dates, inclusive."""
+        for date, _ in self.segments():
+            if (start_date and date < start_date) or (end_date and date > end_date):
+                continue
+            for record in self.read_segment(date):
+                yield event_dict(*record)
+
+    def compact(self, date):
+        """Rewrite a closed segment without its torn/corrupt tail and exact duplicates. Returns records dropped.
+
+        Only records with the same timestamp, status and ID are duplicates (a batch written twice); repeated
+        INs are real events that presence accepted after its minimum gap, so they stay. "Unknown" records are
+        never dropped: several unrecognized faces in one frame share the ID and the timestamp.
+        """
+        if date in self.handles:
+            raise ValueError("Can't compact a segment that is still being appended to; rotate() first")
+        path = self.segment_path(date)
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            data = f.read()
+        records = list(decode_records(data))
+        kept, seen = [], set()
+        for timestamp, code, employee_id, name, _ in records:
+            key = (timestamp, code, employee_id)
+            if employee_id != "Unknown":
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(encode_record(timestamp, code, employee_id, name))
+        if len(kept) == len(records) and (records[-1][-1] if records else 0) == len(data):
+            return 0  # Nothing to drop; leave the file alone
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(kept))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return len(records) - len(kept)
+
+
+if __name__ == "__main__":
+    # Group-commit throughput and replay speed: python attendance_journal.py [events] [directory]
+    import sys
+    import tempfile
+
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    directory = sys.argv[2] if len(sys.argv) > 2 else tempfile.mkdtemp()
+    journal = AttendanceJournal(directory).start()
+
+    started = time.perf_counter()
+    base = time.time()
+    for i in range(event_count):
+        journal.append(f"Emp{i % 500:03d}", f"Employee {i % 500}", "IN" if (i // 500) % 2 == 0 else "OUT", base + i)
+    enqueue_us = (time.perf_counter() - started) * 1e6 / event_count
+    journal.flush(timeout=60.0)
+    durable_s = time.perf_counter() - started
+    journal.close()
+
+    started = time.perf_counter()
+    replayed = sum(1 for _ in AttendanceJournal(directory).replay())
+    replay_s = time.perf_counter() - started
+    print(f"events={event_count} enqueue_us={enqueue_us:.1f} durable_s={durable_s:.2f} commits={journal.commits} "
+          f"events_per_commit={journal.events_written / max(journal.commits, 1):.0f} "
+          f"replayed={replayed} replay_s={replay_s:.2f}")
@@ -0,0 +1,235 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class DailySummary:
+    __slots__ = ("name", "first_in", "last_out", "seconds", "sessions", "late")
+
+    def __init__(self, name):
+        self.name = name
+        self.first_in = None  # "HH:MM:SS"
+        self.last_out = None
+        self.seconds = 0.0
+        self.sessions = 0
+        self.late = False
+
+
+class MonthlySummary:
+    __slots__ = ("name", "days", "seconds", "sessions", "late_days")
+
+    def __init__(self, name):
+        self.name = name
+        self.days = set()
+        self.seconds = 0.0
+        self.sessions = 0
+        self.late_days = 0
+
+
+class ReportEngine:
+    """Pairs IN/OUT events into work sessions and keeps per-employee daily and monthly totals up to date.
+
+    Feed it attendance_log entries in time order with `add()` (once at startup, then one per new event);
+    the report window only reads the precomputed summaries, so opening it doesn't depend on the event count.
+    A session is credited to the day (and month) it started on.
+
+    Memory is bounded for a process that runs for years: summaries are kept for the last `keep_months` months
+    and raw events (the "Events" view) for the last `event_months`; older data stays in the journal and can
+    be exported (attendance_export.py).
+    """
+
+    def __init__(self, late_after="09:15:00", keep_months=12, event_months=2):
+        self.late_after = late_after  # A first IN later than this counts as a late arrival
+        self.keep_months = keep_months
+        self.event_months = event_months
+        self.open_sessions = {}  # employee_id -> (IN timestamp, IN date)
+        self.daily = {}  # (employee_id, date) -> DailySummary
+        self.monthly = {}  # (employee_id, "YYYY-MM") -> MonthlySummary
+        self.events_by_month = {}  # "YYYY-MM" -> attendance_log entries, in order
+        self.newest_month = None
+        self.session_count = 0
+
+    @staticmethod
+    def _month_before(month, count):
+        index = int(month[:4]) * 12 + int(month[5:7]) - 1 - count
+        return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+    def _prune(self):
+        """Drop summaries and events that fell out of the retention windows (runs once per new month)."""
+        keep_from = self._month_before(self.newest_month, self.keep_months - 1)
+        events_from = self._month_before(self.newest_month, self.event_months - 1)
+        for month in [m for m in self.events_by_month if m < events_from]:
+            del self.events_by_month[month]
+        for key in [k for k in self.monthly if k[1] < keep_from]:
+            del self.monthly[key]
+        for key in [k for k in self.daily if k[1][:7] < keep_from]:
+            del self.daily[key]
+
+    def add(self, record):
+        month = record["Date"][:7]
+        if self.newest_month is None or month > self.newest_month:
+            self.newest_month = month
+            self._prune()
+        if month >= self._month_before(self.newest_month, self.event_months - 1):
+            self.events_by_month.setdefault(month, []).append(record)
+        employee_id = record["Employee ID"]
+        if employee_id == "Unknown":
+            return
+
+        timestamp = record.get("Timestamp")
+        day = self._daily(employee_id, record["Date"], record["Name"])
+        if record["Status"] == "Logged IN":
+            if day.first_in is None:
+                day.first_in = record["Time"]
+                day.late = record["Time"] > self.late_after
+                summary = self._monthly(employee_id, month, record["Name"])
+                summary.days.add(record["Date"])
+                summary.late_days += day.late
+            # A second IN without an OUT keeps the original start; a session left open on an earlier day
+            # (forgot to log out) is dropped rather than credited with the whole night
+            started = self.open_sessions.get(employee_id)
+            if started is None or started[1] != record["Date"]:
+                self.open_sessions[employee_id] = (timestamp, record["Date"])
+        else:
+            day.last_out = record["Time"]
+            started = self.open_sessions.pop(employee_id, None)
+            if started is None or timestamp is None or started[0] is None:
+                return  # OUT without a matching IN: shown as last-out, no hours credited
+            seconds = max(timestamp - started[0], 0.0)
+            self.session_count += 1
+            start_day = self._daily(employee_id, started[1], record["Name"])
+            start_day.seconds += seconds
+            start_day.sessions += 1
+            summary = self._monthly(employee_id, started[1][:7], record["Name"])
+            summary.seconds += seconds
+            summary.sessions += 1
+
+    def _daily(self, employee_id, date, name):
+        day = self.daily.get((employee_id, date))
+        if day is None:
+            day = self.daily[(employee_id, date)] = DailySummary(name)
+        return day
+
+    def _monthly(self, employee_id, month, name):
+        summary = self.monthly.get((employee_id, month))
+        if summary is None:
+            summary = self.monthly[(employee_id, month)] = MonthlySummary(name)
+        return summary
+
+    def months(self):
+        return sorted({month for _, month in self.monthly} | set(self.events_by_month), reverse=True)
+
+    def monthly_rows(self, month):
+        rows = [(employee_id, s.name, len(s.days), f"{s.seconds / 3600.0:.2f}", s.sessions, s.late_days)
+                for (employee_id, m), s in self.monthly.items() if m == month]
+        return sorted(rows)
+
+    def daily_rows(self, month):
+        rows = [(employee_id, d.name, date, d.first_in or "", d.last_out or "", f"{d.seconds / 3600.0:.2f}",
+                 "Late" if d.late else "")
+                for (employee_id, date), d in self.daily.items() if date[:7] == month]
+        return sorted(rows, key=lambda row: (row[2], row[0]))
+
+    def event_rows(self, month):
+        return [(r["Employee ID"], r["Name"], r["Date"], r["Time"], r["Status"])
+                for r in self.events_by_month.get(month, [])]
+
+
+REPORT_VIEWS = {
+    "Monthly totals": (("Employee ID", "Name", "Days", "Hours", "Sessions", "Late Days"), "monthly_rows"),
+    "Daily": (("Employee ID", "Name", "Date", "First IN", "Last OUT", "Hours", "Late"), "daily_rows"),
+    "Events": (("Employee ID", "Name", "Date", "Time", "Status"), "event_rows"),
+}
+
+
+class ReportWindow:
+    """Monthly attendance report that shows one page of rows at a time instead of inserting every record."""
+
+    def __init__(self, parent, engine, page_size=100):
+        self.engine = engine
+        self.page_size = page_size
+        self.rows = []
+        self.page = 0
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Monthly Attendance Report")
+        self.window.geometry("800x600")
+
+        controls = tk.Frame(self.window)
+        controls.pack(fill="x", padx=10, pady=5)
+        tk.Label(controls, text="Month:").pack(side="left")
+        months = engine.months()
+        self.month_cb = ttk.Combobox(controls, values=months, state="readonly", width=10)
+        self.month_cb.pack(side="left", padx=5)
+        if months:
+            self.month_cb.set(months[0])
+        tk.Label(controls, text="View:").pack(side="left", padx=(10, 0))
+        self.view_cb = ttk.Combobox(controls, values=list(REPORT_VIEWS), state="readonly", width=15)
+        self.view_cb.set("Monthly totals")
+        self.view_cb.pack(side="left", padx=5)
+        self.month_cb.bind("<<ComboboxSelected>>", lambda event: self.refresh())
+        self.view_cb.bind("<<ComboboxSelected>>", lambda event: self.refresh())
+
+        self.tree = ttk.Treeview(self.window, show="headings")
+        self.tree.pack(fill="both", expand=True)
+
+        pager = tk.Frame(self.window)
+        pager.pack(pady=5)
+        tk.Button(pager, text="< Prev", command=lambda: self.show_page(self.page - 1), width=8).pack(side="left")
+        self.page_label = tk.Label(pager, text="", width=24)
+        self.page_label.pack(side="left")
+        tk.Button(pager, text="Next >", command=lambda: self.show_page(self.page + 1), width=8).pack(side="left")
+
+        # Close button
+        close_button = tk.Button(self.window, text="Close", command=self.window.destroy)
+        close_button.pack(pady=10)
+
+        self.refresh()
+
+    def refresh(self):
+        columns, method = REPORT_VIEWS[self.view_cb.get()]
+        self.tree["columns"] = columns
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=90, anchor="center")
+        self.rows = getattr(self.engine, method)(self.month_cb.get()) if self.month_cb.get() else []
+        self.show_page(0)
+
+    def show_page(self, page):
+        pages = max((len(self.rows) + self.page_size - 1) // self.page_size, 1)
+        self.page = min(max(page, 0), pages - 1)
+        self.tree.delete(*self.tree.get_children())
+        start = self.page * self.page_size
+        for row in self.rows[start:start + self.page_size]:
+            self.tree.insert("", "end", values=row)
+        self.page_label.config(text=f"Page {self.page + 1} of {pages} ({len(self.rows)} rows)")
+
+
+if __name__ == "__main__":
+    # Aggregation and report-query timing for a synthetic month: python attendance_report.py [events]
+    import sys
+    import time
+
+    from attendance_journal import event_dict
+
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    employees = 500
+    base = time.mktime(time.strptime("2026-03-01 08:30:00", "%Y-%m-%d %H:%M:%S"))
+    records = []
+    for i in range(event_count):
+        day, slot = divmod(i // employees, 4)  # IN, OUT, IN, OUT per employee per day
+        offset = day * 86400 + slot * 4 * 3600 + (i % employees) * 3
+        records.append(event_dict(base + offset, 1 if slot % 2 == 0 else 0, f"Emp{i % employees:03d}",
+                                  f"Employee {i % employees}"))
+
+    engine = ReportEngine()
+    started = time.perf_counter()
+    for record in records:
+        engine.add(record)
+    build_ms = (time.perf_counter() - started) * 1000.0
+    month = engine.months()[-1]
+    for method in ("monthly_rows", "daily_rows", "event_rows"):
+        started = time.perf_counter()
+        rows = getattr(engine, method)(month)
+        print(f"{method}: rows={len(rows)} query_ms={(time.perf_counter() - started) * 1000.0:.1f}")
+    print(f"events={event_count} build_ms={build_ms:.0f} add_us={build_ms * 1000.0 / event_count:.1f} "
+          f"sessions={engine.session_count}")
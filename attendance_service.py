@@ -0,0 +1,287 @@
+"""Headless attendance service: one worker process per camera, one shared attendance journal.
+
+Run with `python attendance_service.py cameras.json [--duration SECONDS]`. The config looks like:
+
+    {
+        "data_dir": "Data",
+        "registry": "employee_data.db",
+        "engine": "lbph",
+        "confidence_threshold": 70.0,
+        "sources": [
+            {"name": "floor1-in", "source": 0, "direction": "IN"},
+            {"name": "floor1-out", "source": "rtsp://10.0.0.12/stream1", "direction": "OUT"},
+            {"name": "test", "source": "clip.avi", "direction": "IN", "realtime": false, "loop": true}
+        ]
+    }
+
+Each source gets its own capture -> motion gate -> detect/track -> recognize -> presence pipeline in a separate
+process, so sources never compete for the GIL. Confirmed transitions are sent to this process, which applies
+the global IN/OUT state (so walking past two IN doors logs once) and writes them to the attendance journal.
+Nothing here imports Tk.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import traceback
+
+DEFAULT_CONFIG = {
+    "data_dir": "Data",
+    "registry": "employee_data.db",
+    "engine": "lbph",  # "lbph" or "vector"
+    "confidence_threshold": None,  # Default depends on the engine
+    "min_gap_seconds": 300.0,
+    "confirmations": 3,
+    "detect_interval": 5,
+    "reload_seconds": 10.0,  # How often workers look for a newer model or registry changes
+    "threads_per_worker": 1,  # OpenCV threads per process; 1 keeps N sources from oversubscribing the cores
+    "stats_seconds": 5.0,
+}
+
+
+def load_config(path):
+    with open(path) as f:
+        config = dict(DEFAULT_CONFIG, **json.load(f))
+    for i, source in enumerate(config["sources"]):
+        source.setdefault("name", f"camera{i}")
+        if source.get("direction") not in ("IN", "OUT"):
+            raise ValueError(f"Source {source['name']}: direction must be \"IN\" or \"OUT\"")
+    return config
+
+
+class RecognitionModel:
+    """The recognizer, sample store and employee names a worker needs, reloaded when they change on disk."""
+
+    def __init__(self, config, pipeline):
+        self.config = config
+        self.pipeline = pipeline
+        self.registry = None
+        self.stamp = None
+
+    def _stamp(self):
+        # The registry is in WAL mode: commits land in the -wal file and leave the .db untouched until a
+        # checkpoint, so its mtime and size count too
+        paths = [os.path.join(self.config["data_dir"], name) for name in ("training_state.json", "samples.idx")]
+        paths += [self.config["registry"], self.config["registry"] + "-wal"]
+        stamp = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def refresh(self):
+        """Load (or reload) everything if any of the files changed. Returns True if something was loaded."""
+        from employee_registry import EmployeeRegistry
+        from face_trainer import IncrementalTrainer
+        from identification import VectorIdentifier
+        from lbph_model import LBPHModel
+        from sample_store import SampleStore, store_writer
+
+        stamp = self._stamp()
+        if stamp == self.stamp:
+            return False
+        writer = store_writer(self.config["data_dir"])
+        if writer is not None and writer["owner"] == "bulk_import":
+            return False  # Half-imported; reload once the import has trained and released the store
+        self.stamp = stamp
+
+        if self.registry is None:
+            self.registry = EmployeeRegistry(self.config["registry"])
+            self.pipeline.employee_data = self.registry.names
+            self.pipeline.registry = self.registry
+        else:
+            self.registry._load_cache()
+
+        store = SampleStore(self.config["data_dir"], readonly=True).open()
+        if self.config["engine"] == "vector":
+            recognizer = VectorIdentifier().load_store(store)
+            trained = not recognizer.empty()
+            excluded = {}
+        else:
+            recognizer = LBPHModel()
+            trainer = IncrementalTrainer(recognizer, store, checkpoint_every=10 ** 12, auto_compact=False)
+            trained = trainer.load()
+            if not trained and trainer.needs_retrain:
+                # The saved model couldn't be read (e.g. an old cv2 model): train in memory until the GUI or
+                # a trainer run writes a new checkpoint
+                faces, labels, _ = store.training_set()
+                recognizer.train(faces, labels)
+                trained = True
+            excluded = trainer.tombstones
+        self.pipeline.label_map = store.employee_by_label
+        self.pipeline.excluded_labels = excluded
+        self.pipeline.swap_recognizer(recognizer)
+        self.pipeline.model_trained = trained
+        return True
+
+
+def camera_worker(config, source_config, events, stop_event):
+    """Worker process body: run one source until stop_event is set, posting events and stats to `events`."""
+    name = source_config["name"]
+    broker = None
+    try:
+        import cv2
+
+        from face_tracker import FaceTracker
+        from camera_broker import CameraBroker, ring_name
+        from lbph_model import LBPHModel
+        from motion_gate import MotionGate
+        from presence import PresenceTracker
+        from recognition import FaceRecognitionPipeline
+
+        cv2.setNumThreads(config["threads_per_worker"])
+        direction = source_config["direction"]
+        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        threshold = config["confidence_threshold"] or (30.0 if config["engine"] == "vector" else 70.0)
+        pipeline = FaceRecognitionPipeline(face_cascade, LBPHModel(), {},
+                                           confidence_threshold=threshold)
+        model = RecognitionModel(config, pipeline)
+        model.refresh()
+        tracker = FaceTracker(pipeline, detect_interval=config["detect_interval"])
+        gate = MotionGate(roi=source_config.get("roi"))
+        presence = PresenceTracker(confirmations=config["confirmations"],
+                                   min_gap_seconds=config["min_gap_seconds"])
+        # Frames are published to a shared-memory ring named after the source, so a preview or enrollment in
+        # another process can attach (RingReader.attach(name=...)) without reopening the camera
+        broker = CameraBroker(source_config["source"], name=ring_name(name),
+                              realtime=source_config.get("realtime", True), loop=source_config.get("loop", False))
+        camera = broker.start().reader()
+
+        frames = 0
+        last_reload = last_stats = time.monotonic()
+        while not stop_event.is_set():
+            frame = camera.get(timeout=0.5)
+            if frame is None:
+                if not broker.running:
+                    break  # File source finished
+                continue
+            frames += 1
+            now = time.monotonic()
+            if now - last_reload >= config["reload_seconds"]:
+                last_reload = now
+                if model.refresh():
+                    tracker.reset()
+            if now - last_stats >= config["stats_seconds"]:
+                events.put(("stats", name, frames, tracker.detections_run, frames / (now - last_stats)))
+                frames, last_stats = 0, now
+
+            if not gate.check(frame.image, frame.timestamp):
+                if tracker.tracks:
+                    tracker.reset()
+                continue
+            for r in tracker.process(frame.image)[0]:
+                if r.employee_id != "Unknown" and presence.observe(r.employee_id, direction, frame.timestamp):
+                    events.put(("event", name, r.employee_id, r.name, direction, frame.timestamp))
+        events.put(("stats", name, frames, tracker.detections_run, frames / max(time.monotonic() - last_stats, 1e-6)))
+    except KeyboardInterrupt:
+        pass  # Ctrl-C reaches every process of the group; the service stops the workers through stop_event
+    except Exception:
+        events.put(("error", name, traceback.format_exc()))
+    finally:
+        if broker is not None:
+            broker.stop()
+        events.put(("stopped", name))
+
+
+class AttendanceService:
+    """Starts one worker per configured source and funnels their events into the attendance journal."""
+
+    def __init__(self, config):
+        self.config = config
+        self.context = multiprocessing.get_context("spawn")
+        self.events = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.processes = {}
+        self.stats = {}  # source name -> latest (frames, detections, fps)
+        self.events_logged = 0
+        self.events_suppressed = 0
+
+    def start(self):
+        from attendance_journal import AttendanceJournal
+        from presence import PresenceTracker
+
+        self.journal = AttendanceJournal(os.path.join(self.config["data_dir"], "attendance")).start()
+        # Global IN/OUT state across every door, restored from the journal
+        self.presence = PresenceTracker(confirmations=1, min_gap_seconds=self.config["min_gap_seconds"])
+        self.presence.restore(self.journal.replay())
+        for source_config in self.config["sources"]:
+            process = self.context.Process(target=camera_worker, name=f"camera-{source_config['name']}",
+                                           args=(self.config, source_config, self.events, self.stop_event),
+                                           daemon=True)
+            process.start()
+            self.processes[source_config["name"]] = process
+        return self
+
+    def _handle(self, message):
+        kind, name = message[0], message[1]
+        if kind == "event":
+            _, _, employee_id, employee_name, direction, timestamp = message
+            if self.presence.commit(employee_id, direction, timestamp):
+                self.journal.append(employee_id, employee_name, direction, timestamp)
+                self.events_logged += 1
+                print(f"[{name}] {employee_id} {employee_name}: {direction}", flush=True)
+            else:
+                self.events_suppressed += 1
+        elif kind == "stats":
+            self.stats[name] = message[2:]
+        elif kind == "error":
+            print(f"[{name}] worker failed:\n{message[2]}", flush=True)
+        elif kind == "stopped":
+            self.processes.pop(name, None)
+
+    def run(self, duration=None):
+        """Process events until every worker stops, `duration` elapses, or SIGINT/SIGTERM arrives."""
+        deadline = time.monotonic() + duration if duration else None
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: self.stop_event.set())
+        while self.processes and not self.stop_event.is_set():
+            if deadline and time.monotonic() >= deadline:
+                break
+            try:
+                self._handle(self.events.get(timeout=0.5))
+            except queue.Empty:
+                pass
+        self.stop()
+
+    def stop(self, timeout=5.0):
+        """Ask every worker to finish, log whatever they already sent, then flush the journal."""
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        while self.processes and time.monotonic() < deadline:
+            try:
+                self._handle(self.events.get(timeout=0.2))
+            except queue.Empty:
+                self.processes = {n: p for n, p in self.processes.items() if p.is_alive()}
+        for process in self.processes.values():
+            process.terminate()
+        while True:
+            try:
+                self._handle(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if not self.journal.close():
+            print(f"{self.journal.events_queued - self.journal.events_written} events could not be written to the "
+                  f"journal: {self.journal.last_error}", flush=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless multi-camera attendance service")
+    parser.add_argument("config", help="JSON config with the camera sources")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    args = parser.parse_args()
+
+    service = AttendanceService(load_config(args.config)).start()
+    started = time.monotonic()
+    service.run(args.duration)
+    total_fps = sum(stats[2] for stats in service.stats.values())
+    for name, (frames, detections, fps) in sorted(service.stats.items()):
+        print(f"source={name} fps={fps:.1f} detections={detections}")
+    print(f"sources={len(service.stats)} total_fps={total_fps:.1f} logged={service.events_logged} "
+          f"suppressed={service.events_suppressed} seconds={time.monotonic() - started:.1f}")
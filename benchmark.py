@@ -0,0 +1,422 @@
+"""Headless benchmark suite for the detect / recognize / log pipeline.
+
+    python benchmark.py [--video clip.avi | --store Data] [--output results.json] [--compare old.json]
+
+Frames come from a recorded video (`--video`) or are synthesized by pasting face crops onto a textured
+background; face crops come from a sample store (`--store`) or are synthetic textures. The cascade never
+fires on synthetic textures, so for those the boxes where they were pasted are injected as detections
+(InjectedCascade) and the recognition stages see a face in every frame. Results are written as JSON:
+per-stage latency percentiles in milliseconds plus throughput figures, tagged with the git commit and
+library versions so runs can be compared across versions with `--compare`.
+"""
+import json
+import os
+import platform
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from lbph_model import LBPHModel
+
+FACE_CASCADE = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+
+class StageTimer:
+    """Collects durations per named stage and summarizes them as percentiles."""
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextmanager
+    def time(self, name):
+        started = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds * 1000.0)
+
+    def summary(self):
+        result = {}
+        for name, values in self.samples.items():
+            values = np.asarray(values)
+            result[name] = {"count": int(len(values)), "mean_ms": round(float(values.mean()), 4),
+                            "p50_ms": round(float(np.percentile(values, 50)), 4),
+                            "p90_ms": round(float(np.percentile(values, 90)), 4),
+                            "p99_ms": round(float(np.percentile(values, 99)), 4),
+                            "max_ms": round(float(values.max()), 4)}
+        return result
+
+
+# ---- inputs ----
+
+def synthetic_identities(count, samples, seed=0):
+    """(crops, labels): `samples` noisy variants of `count` random smooth 100x100 textures."""
+    rng = np.random.default_rng(seed)
+    crops, labels = [], []
+    for label in range(count):
+        base = cv2.GaussianBlur(rng.integers(0, 256, (100, 100), dtype=np.uint8), (7, 7), 0).astype(np.int16)
+        for _ in range(samples):
+            # Same-identity distance ~55, under the 70 threshold
+            noise = rng.integers(-5, 5, (100, 100), dtype=np.int16)
+            crops.append(np.clip(base + noise, 0, 255).astype(np.uint8))
+            labels.append(label)
+    return crops, np.asarray(labels, dtype=np.int32)
+
+
+def store_identities(data_dir, count, samples):
+    """Real face crops from a sample store, at most `samples` per employee for `count` employees."""
+    from sample_store import SampleStore
+
+    store = SampleStore(data_dir, readonly=True).open()
+    crops, labels = [], []
+    for employee_id in list(store.label_by_employee)[:count]:
+        indices = store.live_indices(employee_id)[:samples]
+        crops.extend(np.array(store.images[i]) for i in indices)
+        labels.extend([store.label_for(employee_id)] * len(indices))
+    return crops, np.asarray(labels, dtype=np.int32)
+
+
+def recognition_gallery(store_dir, count, samples):
+    """(training crops, labels, one held-out crop per identity to paste into frames), normalized like the store."""
+    from sample_store import normalize_face
+
+    crops, labels = store_identities(store_dir, count, samples + 1) if store_dir else \
+        synthetic_identities(count, samples + 1)
+    crops = [normalize_face(crop) for crop in crops]
+    held_out = [i for i in range(len(labels)) if i + 1 == len(labels) or labels[i + 1] != labels[i]]
+    keep = np.setdiff1d(np.arange(len(labels)), held_out)
+    return [crops[i] for i in keep], labels[keep], [crops[i] for i in held_out]
+
+
+class InjectedCascade:
+    """The Haar cascade, plus the faces synthetic_frames() pasted into the current frame.
+
+    The real cascade still runs on every call, so its cost is in every figure; when it finds nothing, the known
+    boxes of the frame are returned instead, scaled to the image it was given.
+    """
+
+    def __init__(self, path=FACE_CASCADE, frame_width=640):
+        self.cascade = cv2.CascadeClassifier(path)
+        self.frame_width = frame_width
+        self.boxes = []  # (x, y, w, h) in frame coordinates, set by synthetic_frames()
+
+    def detectMultiScale(self, image, *args, **kwargs):
+        faces = self.cascade.detectMultiScale(image, *args, **kwargs)
+        if len(faces) or not self.boxes:
+            return faces
+        scale = image.shape[1] / float(self.frame_width)
+        return [tuple(int(v * scale) for v in box) for box in self.boxes]
+
+
+def synthetic_frames(faces, count, size=(640, 480), faces_per_frame=1, seed=0, cascade=None):
+    """BGR frames with face crops pasted at drifting positions onto a fixed textured background.
+
+    With an InjectedCascade, its boxes are set to the pasted faces before each frame is yielded.
+    """
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8), (15, 15), 0)
+    for i in range(count):
+        frame = background.copy()
+        boxes = []
+        for j in range(faces_per_frame):
+            face = cv2.resize(faces[(i // 30 + j) % len(faces)], (140, 140))
+            x = int((size[0] - 140) * (0.5 + 0.4 * np.sin(i / 40.0 + j * 2.1)))
+            y = int((size[1] - 140) * (0.5 + 0.3 * np.cos(i / 55.0 + j)))
+            frame[y:y + 140, x:x + 140] = cv2.cvtColor(face, cv2.COLOR_GRAY2BGR)
+            boxes.append((x, y, 140, 140))
+        if cascade is not None:
+            cascade.boxes = boxes
+        yield frame
+
+
+def video_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = 0
+    while frames < count:
+        ok, frame = cap.read()
+        if not ok:
+            if frames == 0:
+                break
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Loop short clips
+            continue
+        frames += 1
+        yield frame
+    cap.release()
+
+
+# ---- benchmarks ----
+
+def bench_stages(frames, timer, recognizer, face_cascade):
+    """Per-frame stages: colour conversion, full and downscaled detection, predict on every detected face."""
+    from recognition import FaceRecognitionPipeline
+    from sample_store import normalize_face
+
+    pipeline = FaceRecognitionPipeline(face_cascade, recognizer, {}, confidence_threshold=float("inf"))
+    pipeline.model_trained = True
+    faces_found = 0
+    for frame in frames:
+        with timer.time("bgr_to_gray"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with timer.time("detect_multiscale_full"):
+            face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+        with timer.time("detect_pipeline_downscaled"):
+            boxes = pipeline.detect(gray)
+        for (x, y, w, h) in boxes:
+            faces_found += 1
+            with timer.time("lbph_predict"):
+                recognizer.predict(normalize_face(gray[y:y + h, x:x + w]))
+    return faces_found
+
+
+def bench_end_to_end(frames, recognizer, labels, face_cascade):
+    """Frames per second through the live path: motion gate -> tracker -> recognizer (as recognition_loop)."""
+    from face_tracker import FaceTracker
+    from motion_gate import MotionGate
+    from recognition import FaceRecognitionPipeline
+
+    employees = {f"E{label}": f"Employee {label}" for label in set(labels.tolist())}
+    pipeline = FaceRecognitionPipeline(face_cascade, recognizer, employees)
+    pipeline.label_map = {int(employee_id[1:]): employee_id for employee_id in employees}
+    pipeline.model_trained = True
+    tracker, gate = FaceTracker(pipeline), MotionGate()
+    count, recognized, started = 0, 0, time.perf_counter()
+    for i, frame in enumerate(frames):
+        if gate.check(frame, i / 30.0):
+            results, _ = tracker.process(frame)
+            recognized += any(r.employee_id != "Unknown" for r in results)
+        count += 1
+    elapsed = time.perf_counter() - started
+    return {"frames": count, "fps": round(count / elapsed, 2), "detections_run": tracker.detections_run,
+            "predictions_run": tracker.predictions_run, "frames_with_known_face": recognized,
+            "gated_frames": gate.gated_frames, "identity_changes": tracker.identity_changes}
+
+
+def bench_training(timer, sizes, samples, directory, store_dir=None):
+    """Full retrain, one-employee incremental update, model load (cold start) and predict per workforce size."""
+    from face_trainer import train_model_worker
+    from sample_store import SampleStore
+
+    results = {}
+    for size in sizes:
+        crops, labels = store_identities(store_dir, size, samples) if store_dir else \
+            synthetic_identities(size, samples)
+        # Every employee but the last goes into a sample store; 'EmpN' keeps label N in the store
+        data_dir = os.path.join(directory, f"store_{size}")
+        store = SampleStore(data_dir).open()
+        trained = len(crops) - samples if len(crops) > samples else len(crops)
+        for label in np.unique(labels[:trained]):
+            rows = np.flatnonzero(labels[:trained] == label)
+            store.append_many(f"Emp{label}", [crops[i] for i in rows], normalized=store_dir is not None)
+        store.close()
+
+        # The worker train_face_recognizer starts, run in this process so the spawn isn't counted
+        model_path = os.path.join(directory, f"model_{size}.npz")
+        messages = queue.Queue()
+        started = time.perf_counter()
+        train_model_worker(data_dir, model_path, messages)
+        timer.add(f"train_full_{size}", time.perf_counter() - started)
+        while not messages.empty():
+            message = messages.get()
+        if message[0] != "done":
+            raise RuntimeError(f"Training {size} employees failed: {message}")
+
+        with timer.time(f"model_load_{size}"):
+            recognizer = LBPHModel()
+            recognizer.read(model_path)
+        with timer.time(f"train_incremental_one_employee_{size}"):
+            recognizer.update(crops[-samples:], labels[-samples:])
+        for crop in crops[:50]:
+            with timer.time(f"lbph_predict_{size}_employees"):
+                recognizer.predict(crop)
+        results[size] = recognizer
+    return results
+
+
+def bench_registry(timer, sizes, directory):
+    """Employee registry operations: the SQLite registry vs the old per-operation openpyxl workbook pattern."""
+    import openpyxl
+
+    from employee_registry import EXCEL_HEADERS, EmployeeRegistry
+
+    for size in sizes:
+        # The old Emplyee_code.py pattern: every lookup or save reloads (and rewrites) the whole workbook
+        path = os.path.join(directory, f"employees_{size}.xlsx")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(EXCEL_HEADERS)
+        for i in range(size):
+            sheet.append([f"Emp{i:05d}", f"Employee {i}", "IT", "Engineer", "M", "1990-01-01", "03001234567",
+                          f"e{i}@example.com", "Street", f"35202-{i:07d}-1"])
+        workbook.save(path)
+        for i in range(5):
+            with timer.time(f"xlsx_check_existing_{size}"):
+                sheet = openpyxl.load_workbook(path).active
+                any(row[0].value == f"Emp{size - 1 - i:05d}" for row in sheet.iter_rows(min_row=2))
+            with timer.time(f"xlsx_save_employee_{size}"):
+                workbook = openpyxl.load_workbook(path)
+                workbook.active.append([f"New{i}", "New", "IT", "Engineer", "F", "", "", "", "", f"x{i}"])
+                workbook.save(path)
+
+        registry = EmployeeRegistry(os.path.join(directory, f"employees_{size}.db"))
+        with timer.time(f"registry_import_xlsx_{size}"):
+            registry.import_excel(path)
+        for i in range(20):
+            with timer.time(f"registry_check_existing_{size}"):
+                registry.exists(f"Emp{size - 1 - i % size:05d}")
+            with timer.time(f"registry_save_employee_{size}"):
+                registry.add({"employee_id": f"Reg{i}", "name": "New", "cnic": f"r{i}"})
+            with timer.time(f"registry_delete_employee_{size}"):
+                registry.delete(f"Reg{i}")
+        registry.close()
+
+
+def bench_shift_change(timer, directory, people=300, minutes=5.0, fps=15, dwell_seconds=2.0, samples=5, seed=0):
+    """Hundreds of people walking in within a few minutes: recognize every visible face in every frame,
+    run the presence state machine and journal/report each accepted event. Simulated time runs flat out."""
+    from attendance_journal import AttendanceJournal
+    from attendance_report import ReportEngine
+    from presence import PresenceTracker
+
+    crops, labels = synthetic_identities(people, samples + 1, seed)
+    gallery = [i for i in range(len(crops)) if i % (samples + 1)]  # Hold one crop per person back as the probe
+    recognizer = LBPHModel()
+    recognizer.train([crops[i] for i in gallery], labels[gallery])
+    probes = crops[::samples + 1]
+
+    rng = random.Random(seed)
+    window = minutes * 60.0
+    arrivals = sorted((rng.uniform(0, window), person) for person in range(people))
+    base = time.time()
+    journal = AttendanceJournal(os.path.join(directory, "attendance")).start()
+    presence = PresenceTracker(confirmations=3, min_gap_seconds=300.0)
+    report = ReportEngine()
+
+    frame_count = int((window + dwell_seconds) * fps)
+    next_arrival, visible = 0, []
+    logged, correct, peak_visible = 0, 0, 0
+    started = time.perf_counter()
+    for frame in range(frame_count):
+        now = frame / float(fps)
+        while next_arrival < len(arrivals) and arrivals[next_arrival][0] <= now:
+            visible.append((arrivals[next_arrival][0] + dwell_seconds, arrivals[next_arrival][1]))
+            next_arrival += 1
+        visible = [(leave, person) for leave, person in visible if leave > now]
+        peak_visible = max(peak_visible, len(visible))
+        frame_started = time.perf_counter()
+        for _, person in visible:
+            with timer.time("shift_predict"):
+                label, _ = recognizer.predict(probes[person])
+            correct += label == person
+            with timer.time("shift_presence_and_log"):
+                if presence.observe(f"Emp{label:04d}", "IN", base + now):
+                    report.add(journal.append(f"Emp{label:04d}", f"Employee {label}", "IN", base + now))
+                    logged += 1
+        timer.add("shift_frame", time.perf_counter() - frame_started)
+    with timer.time("shift_journal_flush"):
+        journal.flush(timeout=60.0)
+    elapsed = time.perf_counter() - started
+    journal.close()
+    observations = presence.observations
+    return {"people": people, "minutes": minutes, "frames": frame_count, "peak_faces_in_frame": peak_visible,
+            "observations": observations, "events_logged": logged, "prediction_accuracy": round(
+                correct / max(observations, 1), 4), "journal_commits": journal.commits,
+            "wall_seconds": round(elapsed, 2), "realtime_factor": round((window + dwell_seconds) / elapsed, 2)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline_path):
+    """Print p50 changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"{'stage':48s} {'base p50':>10s} {'now p50':>10s} {'change':>8s}")
+    for name, stats in sorted(current["stages"].items()):
+        old = baseline.get("stages", {}).get(name)
+        if old and old["p50_ms"] > 0:
+            change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100.0
+            print(f"{name:48s} {old['p50_ms']:10.3f} {stats['p50_ms']:10.3f} {change:+7.1f}%")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", help="Recorded video to use instead of synthetic frames")
+    parser.add_argument("--store", help="Sample store directory to take real face crops from")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--sizes", default="10,100,1000", help="Workforce sizes for training/registry benchmarks")
+    parser.add_argument("--samples", type=int, default=5, help="Samples per employee for training benchmarks")
+    parser.add_argument("--people", type=int, default=300, help="Shift-change scenario: people arriving")
+    parser.add_argument("--minutes", type=float, default=5.0, help="Shift-change scenario: arrival window")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads (1 = single-core figures)")
+    parser.add_argument("--skip", default="", help="Comma-separated sections to skip: "
+                                                   "stages,end_to_end,training,registry,shift_change")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare p50s against")
+    args = parser.parse_args(argv)
+
+    cv2.setNumThreads(args.threads)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    skip = set(args.skip.split(","))
+    timer = StageTimer()
+    results = {"meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__,
+                        "platform": platform.platform(), "cpus": os.cpu_count(), "args": vars(args)}}
+
+    # The end-to-end model is trained on the identities whose held-out crops walk through the frames
+    gallery_crops, gallery_labels, faces = recognition_gallery(args.store, 50, args.samples)
+    face_cascade = cv2.CascadeClassifier(FACE_CASCADE) if args.video or args.store else InjectedCascade()
+
+    def frames():
+        return video_frames(args.video, args.frames) if args.video else \
+            synthetic_frames(faces, args.frames, cascade=face_cascade if args.store is None else None)
+
+    with tempfile.TemporaryDirectory() as directory:
+        recognizers = {}
+        if "training" not in skip:
+            recognizers = bench_training(timer, sizes, args.samples, directory, args.store)
+        if "stages" not in skip:
+            recognizer = recognizers.get(max(sizes)) if recognizers else None
+            if recognizer is None:
+                crops, labels = synthetic_identities(100, args.samples)
+                recognizer = LBPHModel()
+                recognizer.train(crops, labels)
+            results["faces_detected"] = bench_stages(frames(), timer, recognizer, face_cascade)
+        recognizers.clear()
+        if "end_to_end" not in skip:
+            recognizer = LBPHModel()
+            recognizer.train(gallery_crops, gallery_labels)
+            results["end_to_end"] = bench_end_to_end(frames(), recognizer, gallery_labels, face_cascade)
+        if "registry" not in skip:
+            bench_registry(timer, sizes, directory)
+        if "shift_change" not in skip:
+            results["shift_change"] = bench_shift_change(timer, directory, args.people, args.minutes)
+
+    results["stages"] = timer.summary()
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,282 @@
+"""Bulk enrollment from existing ID photos: one folder per employee ID, as a directory or a .zip / .tar archive.
+
+    python bulk_import.py photos.zip [--metadata staff.csv] [--data Data] [--registry employee_data.db]
+
+    photos.zip
+        Emp001/passport.jpg
+        Emp001/badge.png
+        Emp002/...
+
+Photos are decoded, face-detected with the Haar cascade, cropped, checked and normalized (size and histogram)
+in a process pool; the main process appends the crops to the sample store, upserts the registry in one
+transaction (names and details from the optional CSV/XLSX) and trains the recognizer once at the end.
+
+The import holds the sample store's write lock throughout, so it refuses to start while the attendance app or
+Employee Management has the store open (and they refuse to start while it runs); the attendance service
+postpones its reloads until the import is done.
+"""
+import multiprocessing
+import os
+import tarfile
+import time
+import zipfile
+from collections import Counter
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def list_photos(source):
+    """employee ID -> sorted photo names (paths for a directory, member names for an archive)."""
+    if os.path.isdir(source):
+        names = [os.path.relpath(os.path.join(root, file), source).replace(os.sep, "/")
+                 for root, _, files in os.walk(source) for file in files]
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            names = [member.name for member in archive.getmembers() if member.isfile()]
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+    photos = {}
+    for name in names:
+        parts = [part for part in name.split("/") if part]
+        if len(parts) < 2 or not name.lower().endswith(IMAGE_EXTENSIONS) or parts[-1].startswith("."):
+            continue
+        # The folder directly above the photo is the employee ID (so "export/Emp001/a.jpg" works too)
+        photos.setdefault(parts[-2], []).append(name)
+    return {employee_id: sorted(names) for employee_id, names in sorted(photos.items())}
+
+
+class PhotoReader:
+    """Reads photo bytes from a directory or an archive; one per worker process (archives stay open)."""
+
+    def __init__(self, source):
+        self.source = source
+        self.archive = None
+        if not os.path.isdir(source):
+            self.archive = zipfile.ZipFile(source) if zipfile.is_zipfile(source) else tarfile.open(source)
+
+    def read(self, name):
+        if self.archive is None:
+            with open(os.path.join(self.source, name), "rb") as f:
+                return f.read()
+        if isinstance(self.archive, zipfile.ZipFile):
+            return self.archive.read(name)
+        return self.archive.extractfile(name).read()
+
+
+# Per-process state of the pool workers, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(source, settings):
+    cv2.setNumThreads(1)  # Parallelism comes from the pool
+    _worker["reader"] = PhotoReader(source)
+    _worker["cascade"] = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    _worker["settings"] = settings
+
+
+def crop_face(gray, face_cascade, detection_width=480, min_face_size=60):
+    """Largest face of a photo at full resolution, or (None, reason) if there isn't a usable one."""
+    height, width = gray.shape[:2]
+    scale = width / float(detection_width) if width > detection_width else 1.0
+    small = cv2.resize(gray, (int(width / scale), int(height / scale)), interpolation=cv2.INTER_AREA) \
+        if scale > 1.0 else gray
+    faces = face_cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5,
+                                          minSize=(max(int(min_face_size / scale), 12),) * 2)
+    if len(faces) == 0:
+        return None, "no_face"
+    x, y, w, h = [int(v * scale) for v in max(faces, key=lambda f: f[2] * f[3])]
+    if min(w, h) < min_face_size:
+        return None, "face_too_small"
+    return gray[y:y + h, x:x + w], None
+
+
+def _process_employee(task):
+    """Pool task: every photo of one employee -> (employee_id, normalized crops, sharpness, rejects, photos)."""
+    from enrollment import face_quality
+    from sample_store import normalize_face
+
+    employee_id, names = task
+    settings = _worker["settings"]
+    crops, qualities, rejects = [], [], Counter()
+    for name in names:
+        try:
+            data = _worker["reader"].read(name)
+            gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        except (OSError, KeyError, cv2.error):
+            gray = None
+        if gray is None:
+            rejects["unreadable"] += 1
+            continue
+        crop, reason = crop_face(gray, _worker["cascade"], settings["detection_width"], settings["min_face_size"])
+        if crop is None:
+            rejects[reason] += 1
+            continue
+        score, sharpness, _ = face_quality(crop, settings["size"])
+        if score <= 0:
+            rejects["bad_exposure"] += 1
+            continue
+        if sharpness < settings["min_sharpness"]:
+            rejects["blurry"] += 1
+            continue
+        crops.append(normalize_face(crop, settings["size"]))
+        qualities.append(sharpness)
+    return employee_id, crops, qualities, dict(rejects), len(names)
+
+
+class BulkImporter:
+    """Enrolls every employee folder of a photo directory or archive in one run.
+
+    Employees with fewer than `min_samples` usable photos are skipped (and reported). With replace=True
+    an employee's existing samples are dropped first, so a re-run does not add the same photos twice.
+    """
+
+    def __init__(self, source, data_dir="Data", registry_path="employee_data.db", metadata=None, workers=None,
+                 min_samples=1, replace=False, size=(100, 100), detection_width=480, min_face_size=60,
+                 min_sharpness=10.0):
+        self.source = source
+        self.data_dir = data_dir
+        self.registry_path = registry_path
+        self.metadata = metadata
+        self.workers = workers or os.cpu_count() or 1
+        self.min_samples = min_samples
+        self.replace = replace
+        self.settings = {"size": size, "detection_width": detection_width, "min_face_size": min_face_size,
+                         "min_sharpness": min_sharpness}
+
+        # Results
+        self.report = {}  # employee ID -> {"photos", "accepted", "rejects", "enrolled"}
+        self.photos = 0
+        self.accepted = 0
+        self.seconds = 0.0
+        self.train_seconds = 0.0
+        self.model_version = None
+
+    def run(self, progress=None):
+        """Import everything; `progress(done, total)` is called after each employee. Returns the report.
+
+        Raises sample_store.StoreLockedError if another process has the sample store open for writing.
+        """
+        from sample_store import SampleStore
+
+        # Labels are assigned and samples appended by this process alone, so take the lock before anything else
+        store = SampleStore(self.data_dir, owner="bulk_import").open()
+        try:
+            return self._run(store, progress)
+        finally:
+            store.close()
+
+    def _run(self, store, progress):
+        from employee_registry import get_registry, read_records
+        from face_trainer import IncrementalTrainer
+        from lbph_model import LBPHModel
+        from sample_store import check_employee_id
+
+        started = time.perf_counter()
+        photos = list_photos(self.source)
+        for employee_id in list(photos):
+            try:
+                check_employee_id(employee_id)
+            except ValueError:
+                # Folder name too long for the sample index: reported, never processed
+                count = len(photos.pop(employee_id))
+                self.report[employee_id] = {"photos": count, "accepted": 0, "rejects": {"id_too_long": count},
+                                            "enrolled": False}
+                self.photos += count
+        metadata = {record["employee_id"]: record for record in read_records(self.metadata)} \
+            if self.metadata else {}
+        registry = get_registry(self.registry_path, None)
+
+        records = []
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(min(self.workers, max(len(photos), 1)), initializer=_init_worker,
+                          initargs=(self.source, self.settings)) as pool:
+            results = pool.imap_unordered(_process_employee, photos.items(), chunksize=1)
+            for done, (employee_id, crops, qualities, rejects, count) in enumerate(results, 1):
+                enrolled = len(crops) >= self.min_samples
+                if enrolled:
+                    if self.replace and store.count(employee_id):
+                        store.delete_employee(employee_id)
+                    store.append_many(employee_id, crops, qualities, normalized=True)
+                    # Metadata wins, then what the registry already has; the ID stands in for a missing name
+                    record = dict(registry.get(employee_id) or {"employee_id": employee_id})
+                    record.update(metadata.get(employee_id, {}))
+                    record["name"] = record.get("name") or employee_id
+                    records.append(record)
+                self.report[employee_id] = {"photos": count, "accepted": len(crops), "rejects": rejects,
+                                            "enrolled": enrolled}
+                self.photos += count
+                self.accepted += len(crops)
+                if progress is not None:
+                    progress(done, len(photos))
+        registry.add_many(records)
+
+        # One full training run over the whole store (also compacts away replaced samples)
+        train_started = time.perf_counter()
+        trainer = IncrementalTrainer(LBPHModel(), store, auto_compact=False)
+        trainer.load()
+        if trainer.compact():
+            self.model_version = trainer.model_version
+        self.train_seconds = time.perf_counter() - train_started
+        self.seconds = time.perf_counter() - started
+        return self.report
+
+    def summary(self):
+        enrolled = sum(1 for entry in self.report.values() if entry["enrolled"])
+        rejects = Counter()
+        for entry in self.report.values():
+            rejects.update(entry["rejects"])
+        return (f"employees={len(self.report)} enrolled={enrolled} photos={self.photos} accepted={self.accepted} "
+                f"rejected={self.photos - self.accepted} {dict(rejects)} seconds={self.seconds:.1f} "
+                f"photos_per_second={self.photos / max(self.seconds - self.train_seconds, 1e-6):.1f} "
+                f"train_seconds={self.train_seconds:.1f} model=v{self.model_version}")
+
+    def write_report(self, path):
+        """Per-employee CSV: photos, accepted, enrolled and the count per reject reason."""
+        import csv
+
+        reasons = sorted({reason for entry in self.report.values() for reason in entry["rejects"]})
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Employee ID", "Photos", "Accepted", "Enrolled"] + reasons)
+            for employee_id, entry in sorted(self.report.items()):
+                writer.writerow([employee_id, entry["photos"], entry["accepted"], entry["enrolled"]] +
+                                [entry["rejects"].get(reason, 0) for reason in reasons])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Enroll employees from a folder (or archive) of ID photos")
+    parser.add_argument("source", help="Directory, .zip or .tar with one folder of photos per employee ID")
+    parser.add_argument("--metadata", help="CSV or XLSX with the employee details (Employee ID, Name, ...)")
+    parser.add_argument("--data", default="Data", help="Data directory with the sample store and models")
+    parser.add_argument("--registry", default="employee_data.db", help="Employee registry database")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--min-samples", type=int, default=1, help="Usable photos needed to enroll someone")
+    parser.add_argument("--replace", action="store_true", help="Drop existing samples of imported employees")
+    parser.add_argument("--report", help="Write the per-employee results to this CSV")
+    args = parser.parse_args()
+
+    from sample_store import StoreLockedError
+
+    importer = BulkImporter(args.source, args.data, args.registry, args.metadata, args.workers,
+                            args.min_samples, args.replace)
+    try:
+        importer.run(lambda done, total: print(f"\r{done}/{total} employees", end="", flush=True))
+    except StoreLockedError as e:
+        raise SystemExit(f"{e}; close it and run the import again")
+    print()
+    for employee_id, entry in sorted(importer.report.items()):
+        if entry["rejects"] or not entry["enrolled"]:
+            print(f"{employee_id}: {entry['accepted']}/{entry['photos']} accepted"
+                  f"{'' if entry['enrolled'] else ' (not enrolled)'} {entry['rejects']}")
+    if args.report:
+        importer.write_report(args.report)
+    print(importer.summary())
@@ -0,0 +1,364 @@
+import os
+import re
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from frame_grabber import Frame, FrameGrabber
+
+RING_MAGIC = 0x46524E47  # "FRNG"
+HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("slots", "<u4"),
+    ("height", "<u4"),
+    ("width", "<u4"),
+    ("channels", "<u4"),
+    ("closed", "<u4"),
+    ("latest_seq", "<i8"),
+    ("owner_pid", "<u4"),
+    ("reserved", "<u4"),
+    ("heartbeat", "<f8"),  # time.time() of the owner's last publish or idle tick
+])
+STALE_SECONDS = 5.0  # A ring whose owner hasn't ticked for this long was left behind by a dead broker
+SLOT_DTYPE = np.dtype([("seq", "<i8"), ("timestamp", "<f8")])  # seq is -1 while the slot is being written
+
+
+def ring_name(source):
+    """Shared-memory name for a camera source, e.g. 0 -> "fdas_cam_0"."""
+    return "fdas_cam_" + re.sub(r"[^A-Za-z0-9]+", "_", str(source))[-40:]
+
+
+def _attach_untracked(name):
+    # The creating process owns the segment: keep it out of this process's resource tracker, which would
+    # otherwise unlink it when this process exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name != "nt":  # Only POSIX segments are tracked
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class FrameRing:
+    """Fixed-size ring of frames in one shared-memory block, plus a sequence number per slot.
+
+    Layout: HEADER_DTYPE, then one SLOT_DTYPE per slot, then the slot images back to back. The writer marks a
+    slot -1, fills it, then publishes its sequence number and finally the header's latest_seq, so a reader
+    can tell whether a slot it is looking at was overwritten in the meantime. The owner also stamps its pid
+    and a heartbeat, so a new broker can tell a live ring from one a crashed broker left behind.
+    """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((1,), HEADER_DTYPE, buffer=shm.buf)
+        slots, height, width, channels = (int(self.header[f][0]) for f in ("slots", "height", "width", "channels"))
+        self.slots = slots
+        self.shape = (height, width, channels) if channels > 1 else (height, width)
+        self.meta = np.ndarray((slots,), SLOT_DTYPE, buffer=shm.buf, offset=HEADER_DTYPE.itemsize)
+        self.images = np.ndarray((slots,) + self.shape, np.uint8, buffer=shm.buf,
+                                 offset=HEADER_DTYPE.itemsize + slots * SLOT_DTYPE.itemsize)
+
+    @classmethod
+    def create(cls, name, shape, slots=8):
+        channels = shape[2] if len(shape) == 3 else 1
+        size = HEADER_DTYPE.itemsize + slots * SLOT_DTYPE.itemsize + slots * int(np.prod(shape))
+        try:
+            existing = _attach_untracked(name)
+        except FileNotFoundError:
+            pass
+        else:
+            # Replace a segment left behind by a crashed broker, but never one a live broker still publishes to
+            live, pid = False, None
+            if existing.size >= HEADER_DTYPE.itemsize:
+                header = np.ndarray((1,), HEADER_DTYPE, buffer=existing.buf)
+                live = int(header["magic"][0]) == RING_MAGIC and not header["closed"][0] and \
+                    time.time() - float(header["heartbeat"][0]) < STALE_SECONDS
+                pid = int(header["owner_pid"][0])
+                del header
+            existing.close()
+            if live:
+                raise FileExistsError(f"Frame ring {name} is in use by a running broker (pid {pid})")
+            existing.unlink()
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((1,), HEADER_DTYPE, buffer=shm.buf)
+        header[0] = (RING_MAGIC, slots, shape[0], shape[1], channels, 0, 0, os.getpid(), 0, time.time())
+        del header
+        ring = cls(shm, owner=True)
+        ring.meta["seq"] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        shm = _attach_untracked(name)
+        header = np.ndarray((1,), HEADER_DTYPE, buffer=shm.buf)
+        magic = int(header["magic"][0])
+        del header
+        if magic != RING_MAGIC:
+            shm.close()
+            raise ValueError(f"{name} is not a frame ring")
+        return cls(shm, owner=False)
+
+    @property
+    def latest_seq(self):
+        return int(self.header["latest_seq"][0])
+
+    @property
+    def closed(self):
+        return bool(self.header["closed"][0])
+
+    def publish(self, image, timestamp, seq):
+        slot = seq % self.slots
+        self.meta["seq"][slot] = -1
+        if image.shape != self.shape:
+            image = cv2.resize(image, (self.shape[1], self.shape[0]))
+        self.images[slot] = image
+        self.meta["timestamp"][slot] = timestamp
+        self.meta["seq"][slot] = seq
+        self.header["latest_seq"][0] = seq
+        self.header["heartbeat"][0] = time.time()
+
+    def beat(self):
+        """Owner is alive but has nothing to publish (camera idle)."""
+        self.header["heartbeat"][0] = time.time()
+
+    def frame(self, seq):
+        """Zero-copy Frame for `seq`, or None if that slot has already been reused (or isn't written yet)."""
+        if seq <= 0:
+            return None
+        slot = seq % self.slots
+        if int(self.meta["seq"][slot]) != seq:
+            return None
+        return Frame(self.images[slot], float(self.meta["timestamp"][slot]), seq)
+
+    def valid(self, frame):
+        """True while the memory behind a zero-copy Frame still holds that frame."""
+        return int(self.meta["seq"][frame.seq % self.slots]) == frame.seq
+
+    def close(self):
+        if self.owner:
+            self.header["closed"][0] = 1
+        self.header = self.meta = self.images = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A consumer still holds a frame view; the mapping goes away with the process
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingReader:
+    """Consumer side of a FrameRing, with the same read methods as FrameGrabber.
+
+    Frames are views into shared memory (no copies). A view stays valid until the broker laps the ring
+    (`slots - 1` newer frames); copy a frame you need to keep longer, or check `ring.valid(frame)`.
+    Each reader has its own cursor, so preview, recognition and enrollment never steal frames from each other.
+    """
+
+    def __init__(self, ring, condition=None, max_lag=1):
+        self.ring = ring
+        self.condition = condition  # The broker's condition when in the same process; otherwise poll
+        self.max_lag = max_lag  # get() skips ahead when more than this many frames behind (like a 2-deep queue)
+        self.last_seq = 0
+        self.frames_dropped = 0
+
+    @classmethod
+    def attach(cls, source=0, name=None):
+        """Attach to the ring of a broker running in another process."""
+        return cls(FrameRing.attach(name or ring_name(source)))
+
+    @property
+    def running(self):
+        return self.ring.header is not None and not self.ring.closed
+
+    def _wait(self, ready, timeout):
+        if self.condition is not None:
+            with self.condition:
+                self.condition.wait_for(lambda: ready() or not self.running, timeout)
+            return ready()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ready() and self.running:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.002)
+        return ready()
+
+    def read_latest(self):
+        """Most recent Frame without blocking, or None if nothing has been published yet."""
+        if not self.running:
+            return None
+        return self.ring.frame(self.ring.latest_seq)
+
+    def get(self, timeout=None):
+        """Next frame after the last one this reader returned, waiting up to `timeout` seconds."""
+        while self._wait(lambda: self.running and self.ring.latest_seq > self.last_seq, timeout):
+            latest = self.ring.latest_seq
+            seq = self.last_seq + 1
+            if latest - seq > self.max_lag:
+                self.frames_dropped += latest - self.max_lag - seq
+                seq = latest - self.max_lag
+            frame = self.ring.frame(seq)
+            self.last_seq = seq
+            if frame is not None:
+                return frame
+        return None
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """Block until a frame newer than `after_seq` is available and return it (None on timeout)."""
+        if self._wait(lambda: self.running and self.ring.latest_seq > after_seq, timeout):
+            return self.read_latest()
+        return None
+
+    def queue_depth(self):
+        return max(self.ring.latest_seq - self.last_seq, 0) if self.running else 0
+
+    def stop(self):
+        if not self.ring.owner:
+            self.ring.close()
+
+
+class CameraBroker:
+    """Owns one camera and publishes its frames into a shared-memory ring for every consumer.
+
+    Use it like a FrameGrabber (`read_latest()`, `wait_for_frame()`), call `reader()` for an independent
+    in-process cursor, or `RingReader.attach(source)` from another process; nobody else opens the device.
+    """
+
+    def __init__(self, source=0, slots=8, name=None, realtime=True, loop=False):
+        self.source = source
+        self.slots = slots
+        self.name = name or ring_name(source)
+        self.grabber = FrameGrabber(source, max_queue=1, realtime=realtime, loop=loop)
+        self.condition = threading.Condition()
+        self.ring = None
+        self.thread = None
+        self.running = False
+        self.starting = False  # start_async() is still opening the device
+        self.frames_published = 0
+        self._reader = None
+        self.error = None  # Why no ring could be published (e.g. another broker already serves this name)
+
+    def start(self):
+        if self.running:
+            return self
+        self.grabber.start()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="CameraBroker", daemon=True)
+        self.thread.start()
+        return self
+
+    def start_async(self):
+        """start() on a background thread: opening a device can take seconds, so a UI can show first."""
+        self.starting = True
+
+        def start():
+            try:
+                self.start()
+            finally:
+                self.starting = False
+
+        threading.Thread(target=start, name="CameraOpen", daemon=True).start()
+        return self
+
+    def _run(self):
+        last_seq = 0
+        while self.running:
+            frame = self.grabber.wait_for_frame(last_seq, timeout=0.5)
+            if frame is None:
+                if not self.grabber.running:
+                    break  # File source finished
+                if self.ring is not None:
+                    self.ring.beat()
+                continue
+            last_seq = frame.seq
+            if self.ring is None:
+                try:
+                    self.ring = FrameRing.create(self.name, frame.image.shape, self.slots)
+                except FileExistsError as e:
+                    self.error = e
+                    self.grabber.stop()  # Don't hold the device for a ring that can't be published
+                    break
+                self._reader = RingReader(self.ring, self.condition)
+            self.ring.publish(frame.image, frame.timestamp, frame.seq)
+            self.frames_published += 1
+            with self.condition:
+                self.condition.notify_all()
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+
+    def wait_ready(self, timeout=5.0):
+        """Wait until the first frame is published (the ring is sized from it). Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.ring is None and (self.running or self.starting) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.ring is not None
+
+    def reader(self, max_lag=1):
+        """A new in-process reader with its own cursor (waits for the first frame)."""
+        self.wait_ready()
+        if self.ring is None:
+            raise IOError(self.error or f"Camera {self.source} produced no frames")
+        return RingReader(self.ring, self.condition, max_lag)
+
+    # FrameGrabber-compatible access for consumers that only look at the newest frame
+
+    def read_latest(self):
+        return self._reader.read_latest() if self._reader is not None else None
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        if self._reader is None and not self.wait_ready(timeout or 5.0):
+            return None
+        return self._reader.wait_for_frame(after_seq, timeout)
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        self.grabber.stop()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+            self._reader = None
+
+
+def _benchmark_reader(source, seconds, results):
+    reader = RingReader.attach(source)
+    frames, latency = 0, 0.0
+    started = time.monotonic()
+    while time.monotonic() - started < seconds:
+        frame = reader.get(timeout=1.0)
+        if frame is None:
+            continue
+        frames += 1
+        latency += time.time() - frame.timestamp
+    results.put((frames, reader.frames_dropped, latency * 1000.0 / max(frames, 1)))
+    reader.stop()
+
+
+if __name__ == "__main__":
+    # Fan-out check: one broker, several readers in other processes: python camera_broker.py [source] [readers]
+    import multiprocessing
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    reader_count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    broker = CameraBroker(source).start()
+    broker.wait_ready()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=_benchmark_reader, args=(source, 3.0, results)) for _ in range(reader_count)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        frames, dropped, latency_ms = results.get(timeout=30)
+        print(f"reader frames={frames} dropped={dropped} avg_latency_ms={latency_ms:.2f}")
+    for process in processes:
+        process.join()
+    print(f"published={broker.frames_published} shape={broker.ring.shape} slots={broker.slots}")
+    broker.stop()
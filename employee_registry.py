@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import threading
+
+# Database fields and the matching Excel column headers, in sheet order
+FIELDS = ["employee_id", "name", "department", "job_title", "gender", "dob", "phone", "email", "address", "cnic"]
+EXCEL_HEADERS = ["Employee ID", "Name", "Department", "Job Title", "Gender", "DOB", "Phone No", "Email", "Address", "CNIC"]
+
+
+class EmployeeRegistry:
+    """Employee records in SQLite (primary key on Employee ID, index on CNIC) behind an in-memory cache.
+
+    Lookups never touch the disk; each save or delete is a single-row statement instead of rewriting a
+    workbook. Excel is only used for import and export. Use `get_registry()` so every window shares one
+    instance and sees the same cache.
+    """
+
+    def __init__(self, db_path="employee_data.db"):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS employees ("
+            "employee_id TEXT PRIMARY KEY, name TEXT NOT NULL, department TEXT, job_title TEXT, gender TEXT, "
+            "dob TEXT, phone TEXT, email TEXT, address TEXT, cnic TEXT)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_employees_cnic ON employees (cnic)")
+        self.connection.commit()
+
+        self.employees = {}  # employee_id -> record dict
+        self.names = {}  # employee_id -> name; shared with the recognition pipeline, updated in place
+        self.by_cnic = {}  # cnic -> employee_id
+        self.listeners = []  # Called with (action, record) after every change
+        self.version = 0  # Bumped on every change to the cache (e.g. to invalidate indexes built from names)
+        self._load_cache()
+
+    def _load_cache(self):
+        with self.lock:
+            self.employees.clear()
+            self.names.clear()
+            self.by_cnic.clear()
+            for row in self.connection.execute(f"SELECT {', '.join(FIELDS)} FROM employees ORDER BY rowid"):
+                self._cache(dict(zip(FIELDS, row)))
+            self.version += 1
+
+    def _cache(self, record):
+        self.employees[record["employee_id"]] = record
+        self.names[record["employee_id"]] = record["name"]
+        if record.get("cnic"):
+            self.by_cnic[record["cnic"]] = record["employee_id"]
+
+    def _notify(self, action, record):
+        for listener in list(self.listeners):
+            listener(action, record)
+
+    def __len__(self):
+        return len(self.employees)
+
+    def exists(self, employee_id):
+        return employee_id in self.employees
+
+    def get(self, employee_id):
+        return self.employees.get(employee_id)
+
+    def find_by_cnic(self, cnic):
+        return self.by_cnic.get(cnic)
+
+    def all(self):
+        return list(self.employees.values())
+
+    def add(self, record, replace=False):
+        """Insert one employee (a dict keyed by FIELDS). Returns False if the ID exists and replace is False."""
+        record = {field: record.get(field) for field in FIELDS}
+        record["dob"] = str(record["dob"]) if record["dob"] else ""
+        with self.lock:
+            if record["employee_id"] in self.employees and not replace:
+                return False
+            verb = "INSERT OR REPLACE" if replace else "INSERT"
+            self.connection.execute(
+                f"{verb} INTO employees ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                [record[field] for field in FIELDS],
+            )
+            self.connection.commit()
+            old = self.employees.get(record["employee_id"])
+            if old and old.get("cnic"):
+                self.by_cnic.pop(old["cnic"], None)
+            self._cache(record)
+            self.version += 1
+        self._notify("add", record)
+        return True
+
+    def add_many(self, records, replace=True):
+        """Upsert many employees in one transaction. Returns the number written."""
+        rows = []
+        for record in records:
+            record = {field: record.get(field) for field in FIELDS}
+            record["dob"] = str(record["dob"]) if record["dob"] else ""
+            if record["employee_id"] and record["name"]:
+                rows.append(record)
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self.lock:
+            self.connection.executemany(
+                f"{verb} INTO employees ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                [[record[field] for field in FIELDS] for record in rows],
+            )
+            self.connection.commit()
+            for record in rows:
+                if replace or record["employee_id"] not in self.employees:
+                    # A replaced record may have a different CNIC; don't leave the old one pointing at it
+                    old = self.employees.get(record["employee_id"])
+                    if old and old.get("cnic") and self.by_cnic.get(old["cnic"]) == record["employee_id"]:
+                        self.by_cnic.pop(old["cnic"], None)
+                    self._cache(record)
+            self.version += 1
+        for record in rows:
+            self._notify("add", record)
+        return len(rows)
+
+    def delete(self, employee_id):
+        with self.lock:
+            record = self.employees.pop(employee_id, None)
+            if record is None:
+                return False
+            self.connection.execute("DELETE FROM employees WHERE employee_id = ?", (employee_id,))
+            self.connection.commit()
+            self.names.pop(employee_id, None)
+            if record.get("cnic"):
+                self.by_cnic.pop(record["cnic"], None)
+            self.version += 1
+        self._notify("delete", record)
+        return True
+
+    def import_excel(self, path="employee_data.xlsx"):
+        """Upsert every row of an employee workbook (same columns as the old employee_data.xlsx)."""
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        sheet = workbook.active
+        records = []
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            if row and row[0]:
+                values = [("" if value is None else str(value)) for value in row[:len(FIELDS)]]
+                records.append(dict(zip(FIELDS, values)))
+        workbook.close()
+        return self.add_many(records)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def read_records(path):
+    """Employee records (dicts keyed by FIELDS) from a .csv or .xlsx with a header row.
+
+    Headers may be the Excel column names ("Employee ID", "Phone No", ...) or the field names, in any order;
+    unknown columns are ignored.
+    """
+    aliases = {header.lower(): field for header, field in zip(EXCEL_HEADERS, FIELDS)}
+    aliases.update({field: field for field in FIELDS})
+    if path.lower().endswith(".csv"):
+        import csv
+
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+    else:
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        rows = [list(row) for row in workbook.active.iter_rows(values_only=True)]
+        workbook.close()
+    if not rows:
+        return []
+    columns = [aliases.get(str(header or "").strip().lower()) for header in rows[0]]
+    if "employee_id" not in columns:
+        raise ValueError(f"{path}: no Employee ID column")
+    records = []
+    for row in rows[1:]:
+        record = {field: ("" if value is None else str(value).strip())
+                  for field, value in zip(columns, row) if field}
+        if record.get("employee_id"):
+            records.append(record)
+    return records
+
+
+_registries = {}
+
+
+def get_registry(db_path="employee_data.db", legacy_excel="employee_data.xlsx"):
+    """Shared registry per database file. A new database imports the legacy workbook once, if present."""
+    key = os.path.abspath(db_path)
+    if key not in _registries:
+        is_new = not os.path.exists(db_path)
+        registry = EmployeeRegistry(db_path)
+        if is_new and legacy_excel and os.path.exists(legacy_excel):
+            registry.import_excel(legacy_excel)
+        _registries[key] = registry
+    return _registries[key]
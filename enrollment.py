@@ -0,0 +1,163 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from sample_store import normalize_face
+
+# Samples a burst tries to keep, and the fewest usable ones an employee can be saved with (blurry, badly lit
+# and duplicate frames are dropped, so a burst may keep fewer than SAMPLE_COUNT)
+SAMPLE_COUNT = 10
+MIN_SAMPLES = 5
+
+
+def face_quality(crop, size=(100, 100)):
+    """Score a grayscale face crop. Returns (score, sharpness, brightness); a score of 0 means reject."""
+    resized = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+    sharpness = float(cv2.Laplacian(resized, cv2.CV_64F).var())  # Measured at a fixed size so faces compare
+    brightness = float(resized.mean())
+    if brightness < 40 or brightness > 215:
+        return 0.0, sharpness, brightness
+    # Sharper, larger (closer, more pixels of detail) and better-exposed faces score higher
+    size_factor = min(crop.shape[0] * crop.shape[1] / float(120 * 120), 1.0) ** 0.5
+    exposure_factor = 1.0 - abs(brightness - 128.0) / 128.0
+    return float(np.log1p(sharpness)) * size_factor * exposure_factor, sharpness, brightness
+
+
+def pose_descriptor(normalized):
+    """Tiny mean-centred, unit-length thumbnail; the dot product of two is high for near-identical poses."""
+    thumb = cv2.resize(normalized, (16, 16), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    thumb -= thumb.mean()
+    return thumb / (np.linalg.norm(thumb) + 1e-6)
+
+
+def select_samples(candidates, count, duplicate_similarity=0.97):
+    """Greedy best-N selection: best quality first, then the candidate that adds the most pose variety.
+
+    `candidates` are (score, normalized_crop, descriptor, sharpness) tuples. Near-duplicates of an already
+    chosen sample are skipped while enough distinct ones remain.
+    """
+    remaining = sorted((c for c in candidates if c[0] > 0), key=lambda c: -c[0])
+    if not remaining:
+        return []
+    chosen = [remaining.pop(0)]
+    while remaining and len(chosen) < count:
+        descriptors = np.stack([c[2] for c in chosen])
+        similarity = np.stack([c[2] for c in remaining]) @ descriptors.T
+        closest = similarity.max(axis=1)
+        distinct = closest < duplicate_similarity
+        if distinct.any():
+            # Trade quality against similarity to what is already kept
+            values = np.array([c[0] for c in remaining]) * (1.0 - closest + 0.05)
+            values[~distinct] = -1.0
+        else:
+            values = np.array([c[0] for c in remaining])  # Only duplicates left: fall back to quality
+        chosen.append(remaining.pop(int(values.argmax())))
+    return chosen
+
+
+class BurstEnrollment:
+    """Collects enrollment samples from a short burst of frames on a background thread.
+
+    Every frame of the burst is scanned for its largest face; each crop is scored for sharpness, size and
+    exposure, and the best `sample_count` crops with the most pose variety are kept (blurry, badly lit and
+    duplicate frames are discarded). Frames come from a FrameGrabber, so the live preview keeps running.
+    A burst that keeps fewer than `min_samples` crops is not enough to enroll with.
+    """
+
+    def __init__(self, grabber, face_cascade, sample_count=SAMPLE_COUNT, duration=2.0, size=(100, 100),
+                 detection_width=320, min_face_size=40, max_candidates=120, min_samples=MIN_SAMPLES):
+        self.grabber = grabber
+        self.face_cascade = face_cascade
+        self.sample_count = sample_count
+        self.min_samples = min_samples
+        self.duration = duration
+        self.size = size
+        self.detection_width = detection_width
+        self.min_face_size = min_face_size
+        self.max_candidates = max_candidates
+        self.thread = None
+        self.error = None  # Set if the burst failed (camera gone, cascade error, ...)
+
+        # Progress
+        self.frames_seen = 0
+        self.faces_found = 0
+        self.rejected = 0
+
+    def _largest_face(self, gray):
+        height, width = gray.shape[:2]
+        scale = width / float(self.detection_width) if width > self.detection_width else 1.0
+        small = cv2.resize(gray, (int(width / scale), int(height / scale)), interpolation=cv2.INTER_AREA) \
+            if scale > 1.0 else gray
+        faces = self.face_cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5,
+                                                   minSize=(int(self.min_face_size / scale),) * 2)
+        if len(faces) == 0:
+            return None
+        x, y, w, h = [int(v * scale) for v in max(faces, key=lambda f: f[2] * f[3])]
+        return gray[y:y + h, x:x + w]
+
+    def run(self):
+        """Capture for `duration` seconds; returns (normalized crops, sharpness scores), best first."""
+        candidates = []
+        last_seq = 0
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            frame = self.grabber.wait_for_frame(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            self.frames_seen += 1
+            image = frame.image
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+            crop = self._largest_face(gray)
+            if crop is None or crop.size == 0:
+                continue
+            self.faces_found += 1
+            score, sharpness, _ = face_quality(crop, self.size)
+            if score <= 0:
+                self.rejected += 1
+                continue
+            normalized = normalize_face(crop, self.size)
+            candidates.append((score, normalized, pose_descriptor(normalized), sharpness))
+            if len(candidates) > self.max_candidates:
+                candidates.remove(min(candidates, key=lambda c: c[0]))
+
+        chosen = select_samples(candidates, self.sample_count)
+        return [c[1] for c in chosen], [c[3] for c in chosen]
+
+    def start(self, on_done):
+        """Run the burst on a worker thread and call `on_done(crops, qualities)` from that thread.
+
+        `on_done` is always called: if the burst failed it gets empty lists and the exception is in `error`.
+        """
+        def run():
+            try:
+                crops, qualities = self.run()
+            except Exception as e:  # Reported through `error` instead of dying silently on the worker thread
+                self.error = e
+                crops, qualities = [], []
+            on_done(crops, qualities)
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        return self
+
+
+if __name__ == "__main__":
+    # Enroll from a camera or video file: python enrollment.py [source] [seconds]
+    import sys
+
+    from frame_grabber import FrameGrabber
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "0"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    grabber = FrameGrabber(source, loop=True).start()
+    enrollment = BurstEnrollment(grabber, face_cascade, duration=seconds)
+    started = time.perf_counter()
+    crops, qualities = enrollment.run()
+    grabber.stop()
+    print(f"seconds={time.perf_counter() - started:.2f} frames={enrollment.frames_seen} "
+          f"faces={enrollment.faces_found} rejected={enrollment.rejected} kept={len(crops)} "
+          f"sharpness={[round(q) for q in qualities]}")
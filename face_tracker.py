@@ -0,0 +1,220 @@
+import time
+
+import cv2
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / float(union) if union else 0.0
+
+
+class FaceTrack:
+    """One face followed across frames, with the identity it was recognized as."""
+
+    def __init__(self, track_id, box, template, frame_index):
+        self.track_id = track_id
+        self.box = box  # In detection (downscaled) coordinates
+        self.template = template
+        self.recognition = None
+        self.recognition_attempts = 0
+        self.last_confirmed = frame_index  # Last frame the cascade saw this face
+        self.last_verified = frame_index  # Last frame the face was predicted
+        self.identity_template = None  # The face as it looked at the last prediction
+        self.lost = False
+
+
+class FaceTracker:
+    """Runs the full cascade every `detect_interval` frames and follows faces with template matching in between.
+
+    LBPH prediction runs once per track instead of once per frame; tracks that are still "Unknown" are retried
+    on detection frames up to `max_recognition_attempts` times. A track is predicted again on a detection frame
+    once its identity is `reverify_interval` frames old, or as soon as the face in its box no longer looks like
+    the one that was recognized (someone else stepped into the same spot); a different result replaces the
+    label, so nobody inherits another person's name.
+    """
+
+    def __init__(self, pipeline, detect_interval=5, track_expiry=15, match_threshold=0.55,
+                 search_margin=0.5, max_recognition_attempts=3, reverify_interval=30, reverify_similarity=0.5):
+        self.pipeline = pipeline
+        self.detect_interval = detect_interval  # Frames between full cascade runs
+        self.track_expiry = track_expiry  # Frames a track survives without being confirmed by the cascade
+        self.match_threshold = match_threshold  # Normalized correlation below which a track counts as lost
+        self.search_margin = search_margin  # Search window around the previous box, as a fraction of its size
+        self.max_recognition_attempts = max_recognition_attempts
+        self.reverify_interval = reverify_interval  # Frames an identity is trusted without predicting again
+        self.reverify_similarity = reverify_similarity  # Correlation with the recognized face below which to re-check
+
+        self.tracks = []
+        self.next_track_id = 1
+        self.frame_index = 0
+
+        # Counters for comparing against the per-frame path
+        self.detections_run = 0
+        self.predictions_run = 0
+        self.identity_changes = 0
+        self.frames_processed = 0
+        self.last_latency_ms = 0.0
+
+    def reset(self):
+        self.tracks = []
+
+    def _follow(self, track, small):
+        """Move a track to the best template match near its previous position."""
+        x, y, w, h = track.box
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        height, width = small.shape[:2]
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(width, x + w + mx), min(height, y + h + my)
+        region = small[y0:y1, x0:x1]
+        if region.shape[0] < h or region.shape[1] < w:
+            track.lost = True
+            return
+
+        scores = cv2.matchTemplate(region, track.template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        if best < self.match_threshold:
+            track.lost = True
+            return
+        track.box = (x0 + bx, y0 + by, w, h)
+
+    def _full_box(self, box, scale):
+        x, y, w, h = box
+        return (int(x * scale), int(y * scale), int(w * scale), int(h * scale))
+
+    def _recognize(self, track, gray, scale):
+        track.recognition_attempts += 1
+        self.predictions_run += 1
+        results = self.pipeline.recognize_faces(gray, [self._full_box(track.box, scale)])
+        track.last_verified = self.frame_index
+        track.identity_template = track.template
+        if results:
+            previous = track.recognition
+            track.recognition = results[0]
+            if previous is not None and previous.employee_id != results[0].employee_id:
+                # A different face (or none we know) is in the box now: the old label goes, retries start over
+                self.identity_changes += 1
+                track.recognition_attempts = 1
+
+    def _appearance_changed(self, track, template):
+        reference = track.identity_template
+        if reference is None or template.size == 0:
+            return False
+        resized = cv2.resize(template, (reference.shape[1], reference.shape[0]))
+        return float(cv2.matchTemplate(resized, reference, cv2.TM_CCOEFF_NORMED)[0, 0]) < self.reverify_similarity
+
+    def process(self, frame):
+        """Update tracks for a BGR frame. Returns (recognitions with current boxes, latency in ms)."""
+        started = time.perf_counter()
+        self.frame_index += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small, scale = self.pipeline.downscale(gray)
+
+        run_detection = (self.frame_index - 1) % self.detect_interval == 0
+
+        if not run_detection:
+            following = [track for track in self.tracks if not track.lost]
+            for track in following:
+                self._follow(track, small)
+            # A face lost just now triggers a detection on this frame rather than waiting for the next interval
+            run_detection = any(track.lost for track in following)
+
+        if run_detection:
+            self.detections_run += 1
+            boxes = [tuple(int(v / scale) for v in box) for box in self.pipeline.detect(gray, small, scale)]
+            unmatched_tracks = list(self.tracks)
+            for box in boxes:
+                best_track, best_iou = None, 0.3
+                for track in unmatched_tracks:
+                    iou = box_iou(box, track.box)
+                    if iou > best_iou:
+                        best_track, best_iou = track, iou
+                x, y, w, h = box
+                template = small[y:y + h, x:x + w].copy()
+                if best_track is None:
+                    track = FaceTrack(self.next_track_id, box, template, self.frame_index)
+                    self.next_track_id += 1
+                    self.tracks.append(track)
+                    self._recognize(track, gray, scale)
+                else:
+                    unmatched_tracks.remove(best_track)
+                    best_track.box = box
+                    best_track.template = template
+                    best_track.last_confirmed = self.frame_index
+                    best_track.lost = False
+                    recognition = best_track.recognition
+                    stale = self.frame_index - best_track.last_verified >= self.reverify_interval
+                    if recognition is None or recognition.employee_id == "Unknown":
+                        if stale or best_track.recognition_attempts < self.max_recognition_attempts:
+                            self._recognize(best_track, gray, scale)
+                    elif stale or self._appearance_changed(best_track, template):
+                        self._recognize(best_track, gray, scale)
+            for track in unmatched_tracks:
+                track.lost = True
+
+        # Lost tracks are kept (not shown) until they expire, so a face the cascade misses once is matched back
+        # to its track on the next detection instead of starting a new one and being predicted again
+        self.tracks = [track for track in self.tracks if self.frame_index - track.last_confirmed <= self.track_expiry]
+
+        results = [track.recognition._replace(box=self._full_box(track.box, scale))
+                   for track in self.tracks if track.recognition is not None and not track.lost]
+        self.frames_processed += 1
+        self.last_latency_ms = (time.perf_counter() - started) * 1000.0
+        return results, self.last_latency_ms
+
+
+if __name__ == "__main__":
+    # Compare the per-frame path with the tracking path: python face_tracker.py [source] [frames] [detect_interval]
+    import os
+    import sys
+
+    from face_trainer import IncrementalTrainer
+    from frame_grabber import FrameGrabber
+    from lbph_model import LBPHModel
+    from recognition import FaceRecognitionPipeline
+    from sample_store import SampleStore
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    frame_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    detect_interval = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    cv2.setNumThreads(1)
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    face_recognizer = LBPHModel()
+    pipeline = FaceRecognitionPipeline(face_cascade, face_recognizer, {})
+    if os.path.isdir("Data"):
+        # The active model checkpoint plus samples added since, as the app loads it
+        store = SampleStore("Data", readonly=True).open()
+        trainer = IncrementalTrainer(face_recognizer, store, checkpoint_every=10 ** 12, auto_compact=False)
+        pipeline.model_trained = trainer.load()
+        pipeline.label_map = store.employee_by_label
+
+    # Read the frames once so both paths see exactly the same input
+    grabber = FrameGrabber(source, realtime=False).start()
+    frames = []
+    while len(frames) < frame_count:
+        frame = grabber.get(timeout=2.0)
+        if frame is None:
+            break
+        frames.append(frame.image)
+    grabber.stop()
+
+    started = time.perf_counter()
+    for image in frames:
+        pipeline.process(image)
+    per_frame_fps = len(frames) / (time.perf_counter() - started)
+
+    tracker = FaceTracker(pipeline, detect_interval=detect_interval)
+    started = time.perf_counter()
+    for image in frames:
+        tracker.process(image)
+    tracking_fps = len(frames) / (time.perf_counter() - started)
+
+    print(f"frames={len(frames)} per_frame_fps={per_frame_fps:.1f} tracking_fps={tracking_fps:.1f} "
+          f"gain={tracking_fps / per_frame_fps:.2f}x detections={tracker.detections_run} "
+          f"predictions={tracker.predictions_run}")
@@ -0,0 +1,403 @@
+import json
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import traceback
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from lbph_model import LBPHModel
+from sample_store import SampleStore
+
+MODEL_DIR_NAME = "models"
+# .npz is the binary LBPHModel format; .yml models were written by cv2's LBPH before it
+MODEL_FILE_PATTERN = re.compile(r"^face_recognizer_v(\d+)\.(npz|yml)$")
+
+
+def records_path(model_path):
+    """Sidecar listing which sample-store records a saved model was trained on."""
+    return os.path.splitext(model_path)[0] + ".records.npy"
+
+
+def write_atomically(path, write):
+    """Call write(tmp_path) and move the result into place, so readers never see a partial file."""
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{ext}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_model(face_recognizer, model_path, indices):
+    write_atomically(records_path(model_path), lambda path: np.save(path, np.asarray(indices, dtype=np.int64)))
+    face_recognizer.save(model_path)  # LBPHModel.save() replaces its two files atomically itself
+
+
+def train_model_worker(data_dir, model_path, messages):
+    """Full retrain in a separate process. Writes `model_path` atomically and reports through `messages`."""
+    try:
+        store = SampleStore(data_dir, readonly=True).open()
+        faces, labels, indices = store.training_set()
+        messages.put(("progress", 0, len(indices)))
+        if not len(indices):
+            messages.put(("empty",))
+            return
+        face_recognizer = LBPHModel()
+        # Train in chunks so the UI can show progress; update() appends to what train() started
+        chunk = max(len(indices) // 10, 50)
+        for start in range(0, len(indices), chunk):
+            if start == 0:
+                face_recognizer.train(faces[:chunk], labels[:chunk])
+            else:
+                face_recognizer.update(faces[start:start + chunk], labels[start:start + chunk])
+            messages.put(("progress", min(start + chunk, len(indices)), len(indices)))
+        save_model(face_recognizer, model_path, indices)
+        messages.put(("done", model_path, indices))
+    except Exception:
+        messages.put(("error", traceback.format_exc()))
+
+
+class IncrementalTrainer:
+    """Keeps the LBPH model up to date with work proportional to the change instead of the whole workforce.
+
+    * New samples are added with `LBPHModel.update()`. Saved models are versioned checkpoints under
+      Data/models, each with a sidecar of the sample-store records it contains; live records missing from the
+      checkpoint are replayed on load, so adding an employee does not rewrite the whole model.
+    * Deleted employees are tombstoned: their labels are masked out of predictions until enough dead samples
+      pile up, at which point a full retrain compacts them away.
+
+    The state file is the commit point: it is replaced atomically after a new model version is fully written,
+    so a crash at any moment leaves the previous version loadable.
+    """
+
+    def __init__(self, face_recognizer, store, lock=None, checkpoint_every=200, compaction_ratio=0.2,
+                 auto_compact=True, keep_versions=3):
+        self.face_recognizer = face_recognizer
+        self.store = store
+        self.data_dir = store.data_dir
+        self.model_dir = os.path.join(self.data_dir, MODEL_DIR_NAME)
+        self.state_path = os.path.join(self.data_dir, "training_state.json")
+        self.lock = lock or threading.Lock()  # Shared with the recognition pipeline
+        self.checkpoint_every = checkpoint_every  # Samples added since the checkpoint before a new one is written
+        self.compaction_ratio = compaction_ratio  # Fraction of dead samples that triggers a full retrain
+        self.auto_compact = auto_compact  # False: callers check compaction_due() and retrain in the background
+        self.keep_versions = keep_versions
+
+        self.model_version = 0
+        self.reserved_version = 0  # Version a background retrain will write; never reused for checkpoints
+        self.model_records = np.zeros(0, dtype=np.int64)  # Store records inside the in-memory model
+        self.checkpoint_size = 0  # len(model_records) at the last checkpoint
+        self.tombstones = {}  # label -> number of dead samples still inside the model (shared, never reassigned)
+        self.trained = False
+        self.needs_retrain = False  # Set when the saved model can't be matched to store records
+        self.load_error = None  # Why the saved model couldn't be read, if it couldn't
+
+    # ---- persistence ----
+
+    def model_path(self, version, ext=".npz"):
+        return os.path.join(self.model_dir, f"face_recognizer_v{version}{ext}")
+
+    def next_version(self):
+        versions = [self.model_version, self.reserved_version]
+        if os.path.isdir(self.model_dir):
+            for file in os.listdir(self.model_dir):
+                match = MODEL_FILE_PATTERN.match(file)
+                if match:
+                    versions.append(int(match.group(1)))
+        return max(versions) + 1
+
+    def load(self):
+        """Load the active checkpoint, then replay samples added since. Returns True if a model is available."""
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.model_version = json.load(f).get("model_version", 0)
+
+        model_path = self.model_path(self.model_version) if self.model_version else None
+        if model_path is not None and not os.path.exists(model_path):
+            model_path = self.model_path(self.model_version, ".yml")  # Saved before the binary format
+        legacy_path = os.path.join(self.data_dir, "face_recognizer.yml")
+        if (model_path is None or not os.path.exists(model_path)) and os.path.exists(legacy_path):
+            model_path = legacy_path  # Model trained from loose JPEGs before the sample store existed
+        if model_path is None or not os.path.exists(model_path):
+            self.needs_retrain = len(self.store.live_indices()) > 0
+            return False
+
+        try:
+            with self.lock:
+                self.face_recognizer.read(model_path)
+        except (OSError, ValueError, cv2.error) as e:
+            # E.g. a cv2 model trained on crops of different sizes can't be converted; rebuild from the store
+            self.load_error = str(e)
+            with self.lock:
+                self.face_recognizer.clear()
+            self.needs_retrain = len(self.store.live_indices()) > 0
+            return False
+        self.trained = True
+        if model_path.endswith(".yml"):
+            # Parsing YAML is slow; one background retrain rewrites the model in the binary format
+            self.needs_retrain = True
+        if os.path.exists(records_path(model_path)):
+            self.model_records = np.load(records_path(model_path))
+            self.checkpoint_size = len(self.model_records)
+            self._update(np.setdiff1d(self.store.live_indices(), self.model_records))
+        else:
+            # We can't tell which samples this model holds; keep using it until a retrain replaces it
+            self.model_records = self.store.live_indices()
+            self.needs_retrain = True
+        self.refresh_tombstones()
+        return True
+
+    def save_state(self):
+        state = {"model_version": self.model_version}
+
+        def write(path):
+            with open(path, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        write_atomically(self.state_path, write)
+
+    def checkpoint(self):
+        """Write the in-memory model as a new version."""
+        os.makedirs(self.model_dir, exist_ok=True)
+        version = self.next_version()
+        with self.lock:
+            save_model(self.face_recognizer, self.model_path(version), self.model_records)
+        self.model_version = version
+        self.checkpoint_size = len(self.model_records)
+        self.save_state()
+        self.prune_versions()
+
+    def prune_versions(self, keep=None):
+        if not os.path.isdir(self.model_dir):
+            return
+        keep = keep or self.keep_versions
+        for file in os.listdir(self.model_dir):
+            match = MODEL_FILE_PATTERN.match(file)
+            if match and int(match.group(1)) <= self.model_version - keep:
+                model_path = os.path.join(self.model_dir, file)
+                os.remove(model_path)
+                for sidecar in (records_path(model_path), LBPHModel.histograms_path(model_path)):
+                    if os.path.exists(sidecar):
+                        os.remove(sidecar)
+
+    def export_yaml(self, path):
+        """Write the active model in cv2's LBPH YAML format, for tools that expect it."""
+        with self.lock:
+            self.face_recognizer.export_yaml(path)
+
+    # ---- samples ----
+
+    def _update(self, indices):
+        if not len(indices):
+            return 0
+        faces, labels, indices = self.store.training_set(indices)
+        with self.lock:
+            if self.trained:
+                self.face_recognizer.update(faces, labels)
+            else:
+                self.face_recognizer.train(faces, labels)
+        self.trained = True
+        self.model_records = np.concatenate([self.model_records, indices])
+        return len(indices)
+
+    def refresh_tombstones(self):
+        """Recount deleted samples that are still inside the model, per label."""
+        dead = self.model_records[self.store.index["deleted"][self.model_records] == 1]
+        self.tombstones.clear()
+        self.tombstones.update(Counter(int(label) for label in self.store.index["label"][dead]))
+
+    # ---- public operations ----
+
+    def add_employee(self, employee_id):
+        """Add the not-yet-trained samples of one employee. Returns the number of samples added."""
+        if self.employee_tombstoned(employee_id) and self.auto_compact:
+            # The old samples for this ID are still inside the model; drop them first
+            self.compact()
+        added = self._update(np.setdiff1d(self.store.live_indices(employee_id), self.model_records))
+        if len(self.model_records) - self.checkpoint_size >= self.checkpoint_every:
+            self.checkpoint()
+        return added
+
+    def remove_employee(self, employee_id):
+        """Tombstone an employee's samples; compacts once too much of the model is dead (if auto_compact)."""
+        self.store.delete_employee(employee_id)
+        self.refresh_tombstones()
+        if self.auto_compact and self.compaction_due():
+            self.compact()
+
+    def employee_tombstoned(self, employee_id):
+        return self.store.label_by_employee.get(employee_id) in self.tombstones
+
+    def compaction_due(self):
+        dead = sum(self.tombstones.values())
+        return bool(dead) and dead / float(len(self.model_records)) >= self.compaction_ratio
+
+    def compact(self):
+        """Full retrain in this process; clears all tombstones. Returns False if there is no data."""
+        faces, labels, indices = self.store.training_set()
+        if not len(indices):
+            self.trained = False
+            self.model_records = np.zeros(0, dtype=np.int64)
+            self.tombstones.clear()
+            return False
+        with self.lock:
+            self.face_recognizer.train(faces, labels)
+        self.trained = True
+        self.needs_retrain = False
+        self.model_records = indices
+        self.tombstones.clear()
+        self.checkpoint()
+        return True
+
+    def compact_store(self, min_dead_fraction=0.2):
+        """Drop deleted samples from the store files once no model references them any more."""
+        dead = len(self.store) - len(self.store.live_indices())
+        if self.tombstones or not dead or dead / float(len(self.store)) < min_dead_fraction:
+            return False
+        mapping = self.store.compact()
+        self.model_records = mapping[self.model_records]
+        # Record numbers changed, so only the active version's sidecar can be kept valid
+        if self.model_version:
+            model_path = self.model_path(self.model_version)
+            write_atomically(records_path(model_path), lambda path: np.save(path, self.model_records))
+            self.prune_versions(keep=1)
+        return True
+
+    def install_model(self, face_recognizer, version, indices):
+        """Adopt a model retrained elsewhere and reconcile it with changes made while it was training.
+
+        Samples added meanwhile are replayed into the new model; samples deleted meanwhile are tombstoned.
+        Returns the recognizer that was replaced.
+        """
+        with self.lock:
+            previous, self.face_recognizer = self.face_recognizer, face_recognizer
+        self.trained = True
+        self.needs_retrain = False
+        self.model_version = version
+        self.model_records = np.asarray(indices, dtype=np.int64)
+        self.checkpoint_size = len(self.model_records)
+        self._update(np.setdiff1d(self.store.live_indices(), self.model_records))
+        self.refresh_tombstones()
+        self.save_state()  # Commit point: from here on this version is the one loaded at startup
+        self.prune_versions()
+        return previous
+
+
+class BackgroundTrainer:
+    """Runs full retrains in a worker process and hot-swaps the result into the recognition pipeline.
+
+    Call `poll()` periodically from the UI thread; it returns a status message whenever something changed.
+    Predictions keep using the old model until the new one is completely loaded.
+    """
+
+    def __init__(self, trainer, pipeline):
+        self.trainer = trainer
+        self.pipeline = pipeline
+        self.context = multiprocessing.get_context("spawn")  # Never fork a process that owns Tk and threads
+        self.process = None
+        self.messages = None
+        self.version = None
+        self.loaded = queue.Queue()  # Models read from disk by the loader thread, waiting to be swapped in
+        self.progress = None
+
+    def running(self):
+        return self.process is not None
+
+    def start(self):
+        """Start a retrain unless one is already running. Returns True if a new one was started."""
+        if self.process is not None:
+            return False
+        os.makedirs(self.trainer.model_dir, exist_ok=True)
+        self.version = self.trainer.next_version()
+        self.trainer.reserved_version = self.version
+        self.messages = self.context.Queue()
+        self.process = self.context.Process(
+            target=train_model_worker,
+            args=(self.trainer.data_dir, self.trainer.model_path(self.version), self.messages),
+            daemon=True,
+        )
+        self.process.start()
+        self.progress = (0, 0)
+        return True
+
+    def _load(self, model_path, version, indices):
+        # The histograms are memory-mapped, so this is quick; it still stays off the UI thread
+        try:
+            face_recognizer = LBPHModel()
+            face_recognizer.read(model_path)
+            self.loaded.put((face_recognizer, version, indices, None))
+        except (OSError, ValueError) as e:
+            self.loaded.put((None, version, None, str(e)))
+
+    def poll(self):
+        """Handle worker messages and finished loads. Returns a status string or None."""
+        status = None
+        while self.messages is not None:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == "progress":
+                self.progress = message[1:]
+                status = f"Training model v{self.version}: {message[1]}/{message[2]} samples"
+            elif kind == "done":
+                threading.Thread(target=self._load, args=(message[1], self.version, message[2]), daemon=True).start()
+                status = f"Training model v{self.version}: loading"
+                self._finish_process()
+            elif kind == "empty":
+                status = "No face data to train the recognizer!"
+                self._finish_process()
+            elif kind == "error":
+                status = f"Training failed, still using model v{self.trainer.model_version}"
+                self._finish_process()
+
+        # A worker that died without reporting (killed, crashed in native code) leaves the old model in place
+        if self.process is not None and not self.process.is_alive() and self.messages.empty():
+            status = f"Training crashed, still using model v{self.trainer.model_version}"
+            self._finish_process()
+
+        while True:
+            try:
+                face_recognizer, version, indices, error = self.loaded.get_nowait()
+            except queue.Empty:
+                break
+            if face_recognizer is None:
+                status = f"Could not load model v{version} ({error}), still using v{self.trainer.model_version}"
+                continue
+            self.trainer.install_model(face_recognizer, version, indices)
+            self.pipeline.swap_recognizer(face_recognizer)
+            if not self.running():
+                self.trainer.compact_store()
+            status = f"Model v{version} active"
+        return status
+
+    def _finish_process(self):
+        if self.process is not None:
+            self.process.join(timeout=1)
+        self.process = None
+        self.messages = None
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self._finish_process()
+
+
+if __name__ == "__main__":
+    # Export the active model as cv2 YAML: python face_trainer.py [data_dir] [output.yml]
+    import sys
+
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "Data"
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir, "face_recognizer_export.yml")
+    trainer = IncrementalTrainer(LBPHModel(), SampleStore(data_dir, readonly=True).open(),
+                                 checkpoint_every=10 ** 12, auto_compact=False)
+    if not trainer.load():
+        sys.exit("No trained model")
+    trainer.export_yaml(output)
+    print(f"model v{trainer.model_version}: {trainer.face_recognizer.size} samples -> {output}")
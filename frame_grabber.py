@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+import numpy as np
+
+# A captured frame together with the time it was read from the source and its sequence number
+Frame = namedtuple("Frame", ["image", "timestamp", "seq"])
+
+
+class SyntheticSource:
+    """Generates moving test frames so the capture path can be exercised without a webcam."""
+
+    def __init__(self, width=640, height=480, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_index = 0
+        self.next_frame_time = time.perf_counter()
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+
+        # Pace the output like a real camera would
+        if self.fps:
+            delay = self.next_frame_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_frame_time = max(self.next_frame_time + 1.0 / self.fps, time.perf_counter())
+
+        frame = np.full((self.height, self.width, 3), 40, dtype=np.uint8)
+        x = (self.frame_index * 4) % max(self.width - 120, 1)
+        cv2.rectangle(frame, (x, self.height // 3), (x + 120, self.height // 3 + 150), (200, 200, 200), -1)
+        cv2.putText(frame, str(self.frame_index), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        self.frame_index += 1
+        return True, frame
+
+    def release(self):
+        self.opened = False
+
+
+def open_source(source, realtime=True):
+    """Open a camera index, a video file / stream URL, or the "synthetic" test source."""
+    if source == "synthetic":
+        return SyntheticSource(fps=30 if realtime else 0)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+class FrameGrabber:
+    """Reads frames on a dedicated thread into a small bounded queue, dropping the oldest frames."""
+
+    def __init__(self, source=0, max_queue=2, realtime=True, loop=False):
+        self.source = source
+        self.realtime = realtime  # Pace file sources at their native fps instead of reading flat out
+        self.loop = loop  # Rewind file sources when they run out (useful for load testing)
+
+        self.frames = deque(maxlen=max_queue)
+        self.latest = None
+        self.condition = threading.Condition()
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_failures = 0
+
+        self.cap = None
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return self
+        self.cap = open_source(self.source, self.realtime)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        is_file = isinstance(self.source, str) and self.source != "synthetic" and not self.source.isdigit()
+        frame_interval = 0
+        if is_file and self.realtime:
+            fps = self.cap.get(cv2.CAP_PROP_FPS)
+            frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        next_frame_time = time.perf_counter()
+        seq = 0
+
+        while self.running:
+            ret, image = self.cap.read()
+            if not ret:
+                self.read_failures += 1
+                if is_file and self.loop:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if is_file:
+                    # End of the recording
+                    break
+                time.sleep(0.01)
+                continue
+
+            seq += 1
+            frame = Frame(image, time.time(), seq)
+            with self.condition:
+                if len(self.frames) == self.frames.maxlen:
+                    self.frames_dropped += 1
+                self.frames.append(frame)
+                self.latest = frame
+                self.frames_captured += 1
+                self.condition.notify_all()
+
+            if frame_interval:
+                next_frame_time += frame_interval
+                delay = next_frame_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame_time = time.perf_counter()
+
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+
+    def read_latest(self):
+        """Return the most recent Frame without blocking, or None if nothing has been captured yet."""
+        return self.latest
+
+    def get(self, timeout=None):
+        """Pop the oldest queued Frame, waiting up to `timeout` seconds. Returns None on timeout."""
+        with self.condition:
+            if not self.frames:
+                self.condition.wait_for(lambda: self.frames or not self.running, timeout)
+            if self.frames:
+                return self.frames.popleft()
+        return None
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """Block until a frame newer than `after_seq` is available and return it (None on timeout)."""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: (self.latest is not None and self.latest.seq > after_seq) or not self.running, timeout
+            )
+            if self.latest is not None and self.latest.seq > after_seq:
+                return self.latest
+        return None
+
+    def queue_depth(self):
+        return len(self.frames)
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+if __name__ == "__main__":
+    # Load test: drain a source as fast as possible and report throughput and drops
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    grabber = FrameGrabber(source, realtime=False).start()
+    consumed = 0
+    total_latency = 0.0
+    started = time.time()
+    while time.time() - started < seconds:
+        frame = grabber.get(timeout=1.0)
+        if frame is None:
+            if not grabber.running:
+                break
+            continue
+        consumed += 1
+        total_latency += time.time() - frame.timestamp
+    elapsed = time.time() - started
+    grabber.stop()
+    print(f"captured={grabber.frames_captured} consumed={consumed} dropped={grabber.frames_dropped} "
+          f"fps={consumed / elapsed:.1f} avg_queue_latency_ms={1000 * total_latency / max(consumed, 1):.2f}")
@@ -0,0 +1,258 @@
+import threading
+
+import numpy as np
+
+from sample_store import normalize_face
+
+# Neighbour offsets for 8-point, radius-1 LBP, in bit order
+LBP_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
+
+
+def _uniform_lookup():
+    # Map the 256 LBP codes to 59 bins: one per "uniform" pattern (<= 2 bit transitions) plus one shared bin
+    lookup = np.full(256, 58, dtype=np.uint8)
+    next_bin = 0
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(8)]
+        transitions = sum(bits[i] != bits[(i + 1) % 8] for i in range(8))
+        if transitions <= 2:
+            lookup[code] = next_bin
+            next_bin += 1
+    return lookup
+
+
+UNIFORM_LOOKUP = _uniform_lookup()
+UNIFORM_BINS = 59
+
+
+def lbp_features(images, grid=5):
+    """Uniform-LBP grid histograms for a batch of equal-sized grayscale crops (N x H x W -> N x D float32).
+
+    Histograms are square-rooted and L2-normalized, so a dot product between two vectors is the Hellinger
+    (Bhattacharyya) similarity of their histograms and nearest-neighbour search becomes a matrix product.
+    """
+    images = np.asarray(images)
+    if images.ndim == 2:
+        images = images[None]
+    count, height, width = images.shape
+    center = images[:, 1:-1, 1:-1]
+    codes = np.zeros(center.shape, dtype=np.uint8)
+    for bit, (dy, dx) in enumerate(LBP_OFFSETS):
+        neighbour = images[:, 1 + dy:height - 1 + dy, 1 + dx:width - 1 + dx]
+        codes |= (neighbour >= center).astype(np.uint8) << bit
+    codes = UNIFORM_LOOKUP[codes]
+
+    # Crop to a multiple of the grid, then histogram every cell of every image with a single bincount
+    cell_h, cell_w = codes.shape[1] // grid, codes.shape[2] // grid
+    codes = codes[:, :cell_h * grid, :cell_w * grid]
+    cells = codes.reshape(count, grid, cell_h, grid, cell_w).transpose(0, 1, 3, 2, 4).reshape(count, grid * grid, -1)
+    dims = grid * grid * UNIFORM_BINS
+    offsets = (np.arange(count)[:, None, None] * dims + np.arange(grid * grid)[None, :, None] * UNIFORM_BINS)
+    hist = np.bincount((offsets + cells).ravel(), minlength=count * dims).reshape(count, dims).astype(np.float32)
+
+    np.sqrt(hist, out=hist)
+    hist /= np.linalg.norm(hist, axis=1, keepdims=True) + 1e-9
+    return hist
+
+
+class VectorIdentifier:
+    """Nearest-neighbour identification over a contiguous feature matrix, as an alternative to LBPH predict.
+
+    Every sample's LBP feature vector is computed once. A probe (or a batch of probes) is scored against
+    per-employee centroids with one matrix product; only the `shortlist` closest employees are then compared
+    sample by sample. Exposes `predict()` like cv2's recognizers so it can sit behind FaceRecognitionPipeline.
+
+    Distances are 100 * (1 - similarity), so 0 is identical; a pipeline threshold around 25-35 is typical.
+    """
+
+    def __init__(self, grid=5, use_centroids=True, shortlist=10, crop_size=(100, 100)):
+        self.grid = grid
+        self.use_centroids = use_centroids
+        self.shortlist = shortlist  # Employees compared sample-by-sample after the centroid stage
+        self.crop_size = crop_size
+        self.dims = grid * grid * UNIFORM_BINS
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.features = np.zeros((0, self.dims), dtype=np.float32)
+        self.labels = np.zeros(0, dtype=np.int32)
+        self.records = np.zeros(0, dtype=np.int64)  # Sample-store record of each row (-1 if added directly)
+        self.valid = np.zeros(0, dtype=bool)
+        self.size = 0  # Rows in use; the arrays grow by doubling
+        self.centroids = np.zeros((0, self.dims), dtype=np.float32)
+        self.centroid_labels = np.zeros(0, dtype=np.int32)
+        self.rows_by_label = {}
+
+    # ---- building ----
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.features):
+            return
+        capacity = max(needed, 2 * len(self.features), 256)
+        for name, fill in (("features", 0), ("labels", -1), ("records", -1), ("valid", False)):
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add(self, faces, labels, records=None, normalized=True):
+        """Add samples. `faces` are crops (normalized to the store format unless normalized=False)."""
+        if not len(faces):
+            return
+        if not normalized:
+            faces = [normalize_face(face, self.crop_size) for face in faces]
+        features = np.concatenate([lbp_features(np.asarray(faces[start:start + 2048]), self.grid)
+                                   for start in range(0, len(faces), 2048)])
+        labels = np.asarray(labels, dtype=np.int32)
+        records = np.full(len(labels), -1, dtype=np.int64) if records is None else np.asarray(records)
+        with self.lock:
+            self._reserve(len(labels))
+            rows = np.arange(self.size, self.size + len(labels))
+            self.features[rows] = features
+            self.labels[rows] = labels
+            self.records[rows] = records
+            self.valid[rows] = True
+            self.size += len(labels)
+            for label in np.unique(labels):
+                self.rows_by_label[int(label)] = np.concatenate(
+                    [self.rows_by_label.get(int(label), np.zeros(0, dtype=np.int64)), rows[labels == label]])
+            self._update_centroids(np.unique(labels))
+
+    def remove_label(self, label):
+        with self.lock:
+            rows = self.rows_by_label.pop(int(label), None)
+            if rows is None:
+                return 0
+            self.valid[rows] = False
+            self.features[rows] = 0  # A zero row can never be the nearest neighbour
+            self._update_centroids([label])
+            return len(rows)
+
+    def _update_centroids(self, labels):
+        index = {int(label): i for i, label in enumerate(self.centroid_labels)}
+        centroids, centroid_labels = list(self.centroids), list(self.centroid_labels)
+        for label in labels:
+            label = int(label)
+            rows = self.rows_by_label.get(label)
+            if rows is None or not len(rows):
+                if label in index:
+                    centroids[index[label]] = np.zeros(self.dims, dtype=np.float32)
+                continue
+            centroid = self.features[rows].mean(axis=0)
+            centroid /= np.linalg.norm(centroid) + 1e-9
+            if label in index:
+                centroids[index[label]] = centroid
+            else:
+                index[label] = len(centroid_labels)
+                centroids.append(centroid)
+                centroid_labels.append(label)
+        self.centroids = np.asarray(centroids, dtype=np.float32).reshape(-1, self.dims)
+        self.centroid_labels = np.asarray(centroid_labels, dtype=np.int32)
+
+    def load_store(self, store):
+        """(Re)build from every live sample of a SampleStore, reading crops straight from its memory map."""
+        with self.lock:
+            self.crop_size = store.size
+            self._reset()
+            indices = store.live_indices()
+            for start in range(0, len(indices), 4096):
+                chunk = indices[start:start + 4096]
+                self.add(store.images[chunk], store.labels(chunk), chunk)
+        return self
+
+    def add_from_store(self, store, employee_id):
+        """Add the store samples of one employee that aren't in the matrix yet. Returns how many were added."""
+        indices = np.setdiff1d(store.live_indices(employee_id), self.records[:self.size])
+        if len(indices):
+            self.add(store.images[indices], store.labels(indices), indices)
+        return len(indices)
+
+    def empty(self):
+        return not self.valid[:self.size].any()
+
+    # ---- searching ----
+
+    def predict_batch(self, faces, normalized=False):
+        """Identify several face crops at once. Returns a list of (label, distance); (-1, inf) if empty."""
+        if not len(faces):
+            return []
+        if not normalized:
+            faces = [normalize_face(face, self.crop_size) for face in faces]
+        probes = lbp_features(np.asarray(faces), self.grid)
+        with self.lock:
+            if self.empty():
+                return [(-1, float("inf"))] * len(probes)
+            if self.use_centroids and len(self.centroid_labels) > self.shortlist:
+                best_rows, best_scores = self._search_shortlist(probes)
+            else:
+                scores = probes @ self.features[:self.size].T
+                best_rows = scores.argmax(axis=1)
+                best_scores = scores[np.arange(len(probes)), best_rows]
+            labels = self.labels[best_rows]
+        return [(int(label), float(100.0 * (1.0 - score))) for label, score in zip(labels, best_scores)]
+
+    def _search_shortlist(self, probes):
+        # Stage 1: score every employee centroid, keep the closest `shortlist` per probe
+        centroid_scores = probes @ self.centroids.T
+        shortlist = np.argpartition(-centroid_scores, self.shortlist - 1, axis=1)[:, :self.shortlist]
+        best_rows = np.zeros(len(probes), dtype=np.int64)
+        best_scores = np.full(len(probes), -1.0, dtype=np.float32)
+        # Stage 2: exact comparison against the samples of the shortlisted employees only
+        for i, candidates in enumerate(shortlist):
+            rows = np.concatenate([self.rows_by_label.get(int(self.centroid_labels[c]), np.zeros(0, dtype=np.int64))
+                                   for c in candidates])
+            if not len(rows):
+                continue
+            scores = self.features[rows] @ probes[i]
+            best = scores.argmax()
+            best_rows[i], best_scores[i] = rows[best], scores[best]
+        return best_rows, best_scores
+
+    def predict(self, face_img):
+        """Same contract as cv2.face recognizers: returns (label, distance)."""
+        return self.predict_batch([face_img])[0]
+
+
+if __name__ == "__main__":
+    # Latency benchmark: python identification.py [samples_per_identity]
+    import sys
+    import time
+
+    samples_per_identity = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rng = np.random.default_rng(0)
+
+    def synthetic_faces(count, bases):
+        noise = rng.integers(-12, 12, (count, 100, 100), dtype=np.int16)
+        return np.clip(bases.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    for identities in (100, 1000, 10000):
+        identifier = VectorIdentifier()
+        started = time.perf_counter()
+        for start in range(0, identities, 500):
+            ids = np.arange(start, min(start + 500, identities))
+            bases = rng.integers(0, 256, (len(ids), 1, 100, 100), dtype=np.uint8)
+            faces = synthetic_faces(len(ids) * samples_per_identity,
+                                    np.repeat(bases, samples_per_identity, axis=0)[:, 0])
+            identifier.add(faces, np.repeat(ids, samples_per_identity))
+        build_s = time.perf_counter() - started
+
+        # Fresh noisy captures of identities from the last chunk, so accuracy can be checked too
+        probes = synthetic_faces(8, bases[:8, 0])
+        expected = ids[:8]
+
+        for mode, use_centroids in (("centroids", True), ("brute", False)):
+            identifier.use_centroids = use_centroids
+            correct = sum(label == want for (label, _), want in
+                          zip(identifier.predict_batch(probes, normalized=True), expected))
+            started = time.perf_counter()
+            for _ in range(20):
+                identifier.predict_batch(probes[:1], normalized=True)
+            single_ms = (time.perf_counter() - started) * 1000.0 / 20
+            started = time.perf_counter()
+            for _ in range(5):
+                identifier.predict_batch(probes, normalized=True)
+            batch_ms = (time.perf_counter() - started) * 1000.0 / 5
+            print(f"identities={identities} samples={identifier.size} mode={mode} build_s={build_s:.1f} "
+                  f"single_ms={single_ms:.2f} batch8_ms={batch_ms:.2f} correct={correct}/8")
@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+
+class ImageWriter:
+    """Encodes and writes images on worker threads so slow or network disks never stall the caller.
+
+    `submit()` queues a frame and never blocks, since it is called from the Tk thread. The bounded queue
+    absorbs bursts while the workers drain it at disk speed; an image submitted while it is full is dropped,
+    counted in `dropped` and reported by submit() returning False. OpenCV releases the GIL while encoding, so
+    several workers really run in parallel. With `crop_faces=True` only the face boxes passed to submit() are
+    stored, one file per face.
+    """
+
+    def __init__(self, workers=2, max_queue=32, image_format="jpg", jpeg_quality=90, png_compression=3,
+                 crop_faces=False):
+        self.image_format = image_format  # "jpg" or "png"
+        if image_format == "png":
+            self.params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+        else:
+            self.params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.crop_faces = crop_faces
+        self.pending = queue.Queue(maxsize=max_queue)
+        self.condition = threading.Condition()
+        self.unfinished = 0
+
+        # Metrics
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self.last_write_ms = 0.0
+        self.average_write_ms = 0.0
+        self.max_write_ms = 0.0
+
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, path, image, boxes=None):
+        """Queue an image (not copied, so don't modify it afterwards). Returns False if it had to be dropped."""
+        path = f"{os.path.splitext(path)[0]}.{self.image_format}"
+        if self.crop_faces:
+            if not boxes:
+                return True  # Nothing to keep
+            jobs = [(f"{os.path.splitext(path)[0]}_face{i}.{self.image_format}", image[y:y + h, x:x + w])
+                    for i, (x, y, w, h) in enumerate(boxes)]
+        else:
+            jobs = [(path, image)]
+
+        accepted = True
+        for job_path, job_image in jobs:
+            with self.condition:
+                self.unfinished += 1
+                self.submitted += 1
+            try:
+                self.pending.put_nowait((job_path, job_image, time.perf_counter()))
+            except queue.Full:
+                with self.condition:
+                    self.unfinished -= 1
+                    self.dropped += 1
+                    self.condition.notify_all()
+                accepted = False
+        return accepted
+
+    def _worker(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            path, image, queued_at = job
+            try:
+                ok, encoded = cv2.imencode(f".{self.image_format}", image, self.params)
+                if not ok:
+                    raise ValueError(f"Could not encode {path}")
+                with open(path, "wb") as f:
+                    f.write(encoded.tobytes())
+                latency_ms = (time.perf_counter() - queued_at) * 1000.0
+                with self.condition:
+                    self.written += 1
+                    self.bytes_written += len(encoded)
+                    self.last_write_ms = latency_ms
+                    self.average_write_ms += (latency_ms - self.average_write_ms) * 0.1
+                    self.max_write_ms = max(self.max_write_ms, latency_ms)
+            except (OSError, ValueError, cv2.error):
+                with self.condition:
+                    self.errors += 1
+            finally:
+                with self.condition:
+                    self.unfinished -= 1
+                    self.condition.notify_all()
+
+    def queue_depth(self):
+        return self.pending.qsize()
+
+    def metrics(self):
+        return {"queue_depth": self.queue_depth(), "submitted": self.submitted, "written": self.written,
+                "dropped": self.dropped, "errors": self.errors, "bytes_written": self.bytes_written,
+                "last_write_ms": round(self.last_write_ms, 2), "average_write_ms": round(self.average_write_ms, 2),
+                "max_write_ms": round(self.max_write_ms, 2)}
+
+    def flush(self, timeout=10.0):
+        """Block until every queued image is written. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.unfinished > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        """Write everything still queued, then stop the workers."""
+        flushed = self.flush(timeout)
+        for _ in self.threads:
+            self.pending.put(None)
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        return flushed
+
+
+if __name__ == "__main__":
+    # Caller-side cost of a capture, inline imwrite vs the pool: python image_writer.py [frames] [directory]
+    import sys
+    import tempfile
+
+    import numpy as np
+
+    frame_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    directory = sys.argv[2] if len(sys.argv) > 2 else tempfile.mkdtemp()
+    frame = cv2.GaussianBlur(np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8), (5, 5), 0)
+
+    started = time.perf_counter()
+    for i in range(frame_count):
+        cv2.imwrite(os.path.join(directory, f"inline_{i}.jpg"), frame)
+    inline_ms = (time.perf_counter() - started) * 1000.0 / frame_count
+
+    writer = ImageWriter(workers=4, max_queue=frame_count)
+    started = time.perf_counter()
+    for i in range(frame_count):
+        writer.submit(os.path.join(directory, f"pooled_{i}.jpg"), frame)
+    submit_ms = (time.perf_counter() - started) * 1000.0 / frame_count
+    writer.close()
+    total_s = time.perf_counter() - started
+    print(f"inline_ms_per_capture={inline_ms:.2f} submit_ms_per_capture={submit_ms:.3f} "
+          f"pool_drain_s={total_s:.2f} {writer.metrics()}")
@@ -0,0 +1,326 @@
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+DBL_MAX = float(np.finfo(np.float64).max)
+
+
+def lbp_codes(images, radius=1, neighbors=8):
+    """Extended (circular) LBP codes for a batch of grayscale images, computed exactly like cv2.face's LBPH.
+
+    N x H x W uint8 -> N x (H - 2r) x (W - 2r) int32. Neighbours between pixels are bilinearly interpolated
+    in float32, in the same order of operations as OpenCV, so the histograms match its model bit for bit.
+    """
+    images = np.asarray(images)
+    if images.ndim == 2:
+        images = images[None]
+    count, height, width = images.shape
+    src = images.astype(np.float32)
+    center = src[:, radius:height - radius, radius:width - radius]
+    codes = np.zeros(center.shape, dtype=np.int32)
+
+    def at(dy, dx):
+        return src[:, radius + dy:height - radius + dy, radius + dx:width - radius + dx]
+
+    for n in range(neighbors):
+        x = np.float32(radius * math.cos(2.0 * math.pi * n / float(np.float32(neighbors))))
+        y = np.float32(-radius * math.sin(2.0 * math.pi * n / float(np.float32(neighbors))))
+        fx, fy, cx, cy = int(math.floor(x)), int(math.floor(y)), int(math.ceil(x)), int(math.ceil(y))
+        ty, tx = np.float32(y - np.float32(fy)), np.float32(x - np.float32(fx))
+        one = np.float32(1.0)
+        w1, w2, w3, w4 = (one - tx) * (one - ty), tx * (one - ty), (one - tx) * ty, tx * ty
+        t = w1 * at(fy, fx) + w2 * at(fy, cx) + w3 * at(cy, fx) + w4 * at(cy, cx)
+        eps = np.finfo(np.float32).eps
+        codes += ((t > center) | (np.abs(t - center) < eps)).astype(np.int32) << n
+    return codes
+
+
+def spatial_counts(codes, grid_x=8, grid_y=8, bins=256):
+    """Per-cell code histograms as raw counts (N x grid_y * grid_x * bins int32), row-major over the grid.
+
+    cv2 divides each cell's histogram by the cell's pixel count; keeping the counts lets a trained sample be
+    stored as 16 KB of uint8 instead of 64 KB of float32 (and several hundred KB of YAML text). Probes of
+    any size keep the int32 counts, since a cell of a large crop holds more than 255 pixels.
+    """
+    count, height, width = codes.shape
+    cell_h, cell_w = height // grid_y, width // grid_x
+    cells = codes[:, :cell_h * grid_y, :cell_w * grid_x]
+    cells = cells.reshape(count, grid_y, cell_h, grid_x, cell_w).transpose(0, 1, 3, 2, 4)
+    cells = cells.reshape(count, grid_y * grid_x, cell_h * cell_w)
+    dims = grid_y * grid_x * bins
+    offsets = np.arange(count)[:, None, None] * dims + np.arange(grid_y * grid_x)[None, :, None] * bins
+    counts = np.bincount((offsets + cells).ravel(), minlength=count * dims).reshape(count, dims)
+    return counts.astype(np.int32), cell_h * cell_w
+
+
+class LBPHModel:
+    """Drop-in replacement for cv2.face.LBPHFaceRecognizer whose model is a pair of NumPy arrays.
+
+    Histograms are kept as uint8 counts, one column per sample (`dims x samples`), and saved as a .npy that
+    is memory-mapped on load, so opening a model costs no parsing however large the workforce is. Predictions
+    use the same chi-square distance as cv2 (HISTCMP_CHISQR_ALT) but only visit the bins that are non-zero in
+    the probe, which is where the column layout pays off. `export_yaml()` writes the cv2 format for other
+    tools; `read()` also accepts such a YAML file.
+    """
+
+    def __init__(self, radius=1, neighbors=8, grid_x=8, grid_y=8, threshold=DBL_MAX):
+        self.lock = threading.RLock()
+        self._configure(radius, neighbors, grid_x, grid_y, threshold)
+
+    def _configure(self, radius, neighbors, grid_x, grid_y, threshold):
+        # Parameters plus an empty model; read() and import_yaml() call this with the lock held
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.threshold = threshold
+        self.bins = 2 ** neighbors
+        self.dims = grid_x * grid_y * self.bins
+        self.clear()
+
+    def clear(self):
+        self.counts = np.zeros((self.dims, 0), dtype=np.uint8)
+        self.labels = np.zeros(0, dtype=np.int32)
+        self.totals = np.zeros(0, dtype=np.float32)  # Pixels counted per sample (same for equal-sized crops)
+        self.cell_pixels = 0
+        self.size = 0  # Columns in use; the in-memory arrays grow by doubling
+
+    def empty(self):
+        return self.size == 0
+
+    # ---- training ----
+
+    def _histograms(self, faces):
+        faces = np.asarray(faces)
+        counts = []
+        for start in range(0, len(faces), 512):
+            chunk, self.cell_pixels = spatial_counts(lbp_codes(faces[start:start + 512], self.radius, self.neighbors),
+                                                     self.grid_x, self.grid_y, self.bins)
+            counts.append(chunk)
+        counts = np.concatenate(counts)
+        if counts.max(initial=0) > 255:
+            # Stored as uint8: a cell may hold at most 255 pixels (crops up to ~130 px; the store keeps 100 x 100)
+            raise ValueError("Training faces are too large for uint8 histograms; normalize them first")
+        return counts.astype(np.uint8)
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= self.counts.shape[1] and self.counts.flags.writeable:
+            return
+        capacity = max(needed, 2 * self.counts.shape[1], 256)
+        counts = np.zeros((self.dims, capacity), dtype=np.uint8)
+        counts[:, :self.size] = self.counts[:, :self.size]  # Also moves a memory-mapped model into RAM
+        labels = np.full(capacity, -1, dtype=np.int32)
+        labels[:self.size] = self.labels[:self.size]
+        totals = np.zeros(capacity, dtype=np.float32)
+        totals[:self.size] = self.totals[:self.size]
+        self.counts, self.labels, self.totals = counts, labels, totals
+
+    def update(self, faces, labels):
+        """Add samples to the model (cv2's update())."""
+        if not len(faces):
+            return
+        counts = self._histograms(faces)
+        with self.lock:
+            self._reserve(len(counts))
+            columns = slice(self.size, self.size + len(counts))
+            self.counts[:, columns] = counts.T
+            self.labels[columns] = np.asarray(labels, dtype=np.int32).ravel()
+            self.totals[columns] = counts.sum(axis=1, dtype=np.int64)
+            self.size += len(counts)
+
+    def train(self, faces, labels):
+        """Replace the model with these samples (cv2's train())."""
+        with self.lock:
+            self.clear()
+            self.update(faces, labels)
+
+    # ---- prediction ----
+
+    def distances(self, face_img):
+        """Chi-square distance from a probe to every sample, as cv2's LBPH computes it.
+
+        With a = sample counts and q = probe counts, sum((a - q)^2 / (a + q)) over all bins equals
+        sum(a) + sum(q * (q - 3a) / (a + q)) over the bins where q > 0, so the zero bins of the probe are skipped.
+        """
+        probe, probe_cell_pixels = spatial_counts(lbp_codes(face_img, self.radius, self.neighbors),
+                                                  self.grid_x, self.grid_y, self.bins)
+        nonzero = np.flatnonzero(probe[0])
+        with self.lock:
+            cell_pixels = self.cell_pixels or probe_cell_pixels
+            # Probes come in any size: scale their counts to the cell size the model was trained with
+            q = (probe[0, nonzero] * np.float32(cell_pixels / float(probe_cell_pixels))).astype(np.float32)[:, None]
+            size = self.size
+            out = np.empty(size, dtype=np.float32)
+            for start in range(0, size, 256):  # Column blocks small enough to stay in cache
+                a = self.counts[nonzero, start:min(start + 256, size)].astype(np.float32)
+                numerator = q - 3.0 * a
+                numerator *= q
+                a += q
+                numerator /= a
+                out[start:start + len(numerator[0])] = numerator.sum(axis=0)
+            out += self.totals[:size]
+            labels = self.labels[:size]
+        # Counts -> cv2's normalized histograms, times 2 for CHISQR_ALT
+        return out * (2.0 / cell_pixels), labels
+
+    def ranked(self, face_img):
+        """[(label, distance)] for every sample within the threshold, closest first."""
+        if self.empty():
+            return []
+        distances, labels = self.distances(face_img)
+        order = np.argsort(distances, kind="stable")
+        return [(int(labels[i]), float(distances[i])) for i in order if float(distances[i]) < self.threshold]
+
+    def predict(self, face_img):
+        """Same contract as cv2: (label, distance), or (-1, DBL_MAX) if nothing is within the threshold."""
+        if self.empty():
+            return -1, DBL_MAX
+        distances, labels = self.distances(face_img)
+        best = int(distances.argmin())
+        if float(distances[best]) >= self.threshold:
+            return -1, DBL_MAX
+        return int(labels[best]), float(distances[best])
+
+    # ---- persistence ----
+
+    @staticmethod
+    def histograms_path(path):
+        return os.path.splitext(path)[0] + ".hist.npy"
+
+    def save(self, path):
+        """Write `path` (.npz: labels and parameters) and its .hist.npy (the histogram columns).
+
+        Each file is written under a temporary name and moved into place; the histograms go first, so a
+        reader that finds the .npz always finds complete histograms next to it.
+        """
+        params = {"radius": self.radius, "neighbors": self.neighbors, "grid_x": self.grid_x,
+                  "grid_y": self.grid_y, "threshold": self.threshold, "cell_pixels": self.cell_pixels}
+        with self.lock:
+            counts = np.ascontiguousarray(self.counts[:, :self.size])
+            files = [(self.histograms_path(path), lambda f: np.save(f, counts)),
+                     (path, lambda f: np.savez(f, labels=self.labels[:self.size], totals=self.totals[:self.size],
+                                               params=np.frombuffer(json.dumps(params).encode(), dtype=np.uint8)))]
+            for final_path, write in files:
+                tmp_path = final_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    write(f)
+                os.replace(tmp_path, final_path)
+
+    def read(self, path):
+        """Load a model written by save() (memory-mapped, no parsing) or a cv2 LBPH YAML file."""
+        if path.endswith((".yml", ".yaml", ".xml")):
+            return self.import_yaml(path)
+        with np.load(path) as data:
+            params = json.loads(data["params"].tobytes().decode())
+            labels, totals = data["labels"], data["totals"]
+        counts = np.load(self.histograms_path(path), mmap_mode="r")
+        with self.lock:
+            self._configure(params["radius"], params["neighbors"], params["grid_x"], params["grid_y"],
+                            params["threshold"])
+            if counts.shape != (self.dims, len(labels)):
+                raise ValueError(f"{path}: histograms don't match the labels")
+            self.counts, self.labels, self.totals = counts, labels.astype(np.int32), totals.astype(np.float32)
+            self.cell_pixels = params["cell_pixels"]
+            self.size = len(labels)
+
+    def import_yaml(self, path):
+        """Convert a model saved by cv2.face.LBPHFaceRecognizer (slow: the YAML is text)."""
+        import cv2
+
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(path)
+        histograms = recognizer.getHistograms()
+        labels = recognizer.getLabels().ravel()
+        if len(histograms):
+            histograms = np.concatenate([h.reshape(1, -1) for h in histograms])
+            # The cell size isn't stored; the smallest non-zero bin is one pixel of a cell
+            cell_pixels = int(round(1.0 / histograms[histograms > 0].min()))
+            counts = np.rint(histograms * cell_pixels)
+            if np.abs(counts - histograms * cell_pixels).max() > 1e-3 or counts.max() > 255:
+                raise ValueError(f"{path}: histograms are not whole pixel counts")
+        with self.lock:
+            self._configure(recognizer.getRadius(), recognizer.getNeighbors(), recognizer.getGridX(),
+                            recognizer.getGridY(), recognizer.getThreshold())
+            if not len(histograms):
+                return
+            self.counts = np.ascontiguousarray(counts.T.astype(np.uint8))
+            self.labels = labels.astype(np.int32)
+            self.totals = counts.sum(axis=1).astype(np.float32)
+            self.cell_pixels = cell_pixels
+            self.size = len(labels)
+
+    def export_yaml(self, path):
+        """Write the model in cv2.face.LBPHFaceRecognizer's YAML format (readable by its read())."""
+        import cv2
+
+        fs = cv2.FileStorage(path, cv2.FILE_STORAGE_WRITE)
+        fs.startWriteStruct("opencv_lbphfaces", cv2.FileNode_MAP)
+        fs.write("threshold", self.threshold)
+        for name in ("radius", "neighbors", "grid_x", "grid_y"):
+            fs.write(name, getattr(self, name))
+        fs.startWriteStruct("histograms", cv2.FileNode_SEQ)
+        with self.lock:
+            for column in range(self.size):
+                fs.write("", (self.counts[:, column].astype(np.float32) / self.cell_pixels).reshape(1, -1))
+            fs.endWriteStruct()
+            fs.write("labels", self.labels[:self.size].reshape(-1, 1))
+        fs.startWriteStruct("labelsInfo", cv2.FileNode_SEQ)
+        fs.endWriteStruct()
+        fs.endWriteStruct()
+        fs.release()
+
+
+if __name__ == "__main__":
+    # Compare with cv2's LBPH: python lbph_model.py [samples]
+    import sys
+    import tempfile
+    import time
+
+    import cv2
+
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(0)
+    bases = rng.integers(0, 256, (samples // 10, 100, 100), dtype=np.uint8)
+    faces = np.clip(np.repeat(bases, 10, axis=0).astype(np.int16) +
+                    rng.integers(-12, 12, (samples, 100, 100), dtype=np.int16), 0, 255).astype(np.uint8)
+    labels = np.repeat(np.arange(samples // 10), 10).astype(np.int32)
+    # Fresh noisy captures of the first 20 identities
+    probes = np.clip(bases[:20].astype(np.int16) + rng.integers(-12, 12, (20, 100, 100), dtype=np.int16),
+                     0, 255).astype(np.uint8)
+
+    directory = tempfile.mkdtemp()
+    reference = cv2.face.LBPHFaceRecognizer_create()
+    started = time.perf_counter()
+    reference.train(list(faces), labels)
+    print(f"cv2   train_s={time.perf_counter() - started:.2f}", end=" ")
+    yaml_path = os.path.join(directory, "model.yml")
+    reference.save(yaml_path)
+    started = time.perf_counter()
+    cv2.face.LBPHFaceRecognizer_create().read(yaml_path)
+    print(f"load_s={time.perf_counter() - started:.2f} size_mb={os.path.getsize(yaml_path) / 1e6:.0f}", end=" ")
+    started = time.perf_counter()
+    expected = [reference.predict(p) for p in probes]
+    print(f"predict_ms={(time.perf_counter() - started) * 1000 / len(probes):.1f}")
+
+    model = LBPHModel()
+    started = time.perf_counter()
+    model.train(faces, labels)
+    print(f"numpy train_s={time.perf_counter() - started:.2f}", end=" ")
+    model_path = os.path.join(directory, "model.npz")
+    model.save(model_path)
+    started = time.perf_counter()
+    loaded = LBPHModel()
+    loaded.read(model_path)
+    size_mb = (os.path.getsize(model_path) + os.path.getsize(LBPHModel.histograms_path(model_path))) / 1e6
+    print(f"load_s={time.perf_counter() - started:.4f} size_mb={size_mb:.0f}", end=" ")
+    started = time.perf_counter()
+    predicted = [loaded.predict(p) for p in probes]
+    print(f"predict_ms={(time.perf_counter() - started) * 1000 / len(probes):.1f}")
+    same = sum(a[0] == b[0] and abs(a[1] - b[1]) < 1e-3 * max(a[1], 1) for a, b in zip(expected, predicted))
+    histograms_match = np.array_equal(np.rint(np.concatenate([h for h in reference.getHistograms()]) * 144),
+                                      loaded.counts.T)
+    print(f"identical_histograms={histograms_match} matching_predictions={same}/{len(probes)}")
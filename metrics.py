@@ -0,0 +1,306 @@
+import bisect
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Latency buckets in milliseconds, from sub-millisecond conversions up to multi-second retrains
+DEFAULT_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000, 60000)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+
+class Gauge:
+    """A value set by the caller, or read from `fn` at scrape time (e.g. a queue's current depth)."""
+
+    def __init__(self, name, help_text, fn=None):
+        self.name = name
+        self.help_text = help_text
+        self.fn = fn
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        if self.fn is not None:
+            try:
+                return float(self.fn())
+            except Exception:
+                return float("nan")  # The source isn't available (yet)
+        return self.value
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.get()}"]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (milliseconds), plus a short window of recent values for summaries."""
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS_MS, recent=256):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=recent)
+        self.lock = threading.Lock()
+
+    def observe(self, value_ms):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+            self.total += value_ms
+            self.count += 1
+            self.recent.append(value_ms)
+
+    def percentile(self, q):
+        """Percentile of the recent window, or None if nothing was observed."""
+        with self.lock:
+            values = sorted(self.recent)
+        if not values:
+            return None
+        return values[min(int(q / 100.0 * len(values)), len(values) - 1)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            cumulative = 0
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+            lines.append(f"{self.name}_sum {self.total}")
+            lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class RateMeter:
+    """Events per second (or minute) over a sliding window."""
+
+    def __init__(self, window_seconds=10.0):
+        self.window_seconds = window_seconds
+        self.times = deque()
+        self.lock = threading.Lock()
+
+    def mark(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.times.append(now)
+            self._trim(now)
+
+    def _trim(self, now):
+        while self.times and now - self.times[0] > self.window_seconds:
+            self.times.popleft()
+
+    def per_second(self):
+        now = time.monotonic()
+        with self.lock:
+            self._trim(now)
+            return len(self.times) / self.window_seconds
+
+
+class MetricsRegistry:
+    """Named counters, gauges and histograms for the hot paths, rendered in the Prometheus text format."""
+
+    def __init__(self, prefix="attendance_"):
+        self.prefix = prefix
+        self.metrics = {}
+        self.meters = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        name = self.prefix + name
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text="", fn=None):
+        return self._get(Gauge, name, help_text, fn)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS_MS):
+        return self._get(Histogram, name, help_text, buckets)
+
+    def rate(self, name, help_text="", window_seconds=10.0, per=1.0):
+        """A RateMeter exported as a gauge of events per `per` seconds (per=60 for events per minute)."""
+        with self.lock:
+            meter = self.meters.get(name)
+            if meter is None:
+                meter = self.meters[name] = RateMeter(window_seconds)
+        self.gauge(name, help_text, fn=lambda: meter.per_second() * per)
+        return meter
+
+    def value(self, name):
+        """Current value of a counter or gauge (without the prefix), or 0 if it doesn't exist yet."""
+        metric = self.metrics.get(self.prefix + name)
+        if metric is None:
+            return 0
+        return metric.get() if isinstance(metric, Gauge) else metric.value
+
+    def percentile(self, name, q=95):
+        metric = self.metrics.get(self.prefix + name)
+        return metric.percentile(q) if isinstance(metric, Histogram) else None
+
+    @contextmanager
+    def time(self, name, help_text=""):
+        """Time a block into the `name` histogram (milliseconds)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name, help_text).observe((time.perf_counter() - started) * 1000.0)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves GET /metrics on a local port from a daemon thread."""
+
+    def __init__(self, registry, port=9108, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only needed with the endpoint on
+
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Scrapes every few seconds would flood stderr
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WindowProfiler:
+    """cProfile for a fixed time window across several threads.
+
+    Each hot loop calls `check()` once per iteration. Up to Python 3.11 cProfile only sees the thread that
+    enabled it, so while a window is open every calling thread profiles itself and dumps its own
+    `<prefix>_<thread>.prof` when it closes. From 3.12 cProfile runs on sys.monitoring, which covers every
+    thread but allows one active profiler per process: the first thread to call `check()` owns it and dumps
+    `<prefix>_all.prof`. Open either with `python -m pstats` or snakeviz.
+
+    Profiling must never take the caller down: if the profiler can't be enabled (another one, or a debugger,
+    is active) or the dump fails, the window is closed and the reason kept in `error`.
+    """
+
+    def __init__(self, directory="Data/profiles"):
+        self.directory = directory
+        self.until = 0.0
+        self.prefix = None
+        self.per_thread = sys.version_info < (3, 12)
+        self.profiles = {}  # thread name (or "all") -> (cProfile.Profile, name of the thread that enabled it)
+        self.lock = threading.Lock()
+        self.dumped = []
+        self.error = None
+
+    def start(self, seconds=30.0):
+        os.makedirs(self.directory, exist_ok=True)
+        self.prefix = os.path.join(self.directory, time.strftime("profile_%Y-%m-%d_%H-%M-%S"))
+        self.error = None
+        self.until = time.monotonic() + seconds
+        return self.prefix
+
+    @property
+    def active(self):
+        return time.monotonic() < self.until
+
+    def check(self):
+        """Call from a hot loop: starts or stops profiling of the calling thread as the window opens/closes."""
+        if self.prefix is None:
+            return
+        name = threading.current_thread().name
+        key = name if self.per_thread else "all"
+        with self.lock:
+            entry = self.profiles.get(key)
+            if entry is None:
+                if self.active:
+                    profile = cProfile.Profile()
+                    try:
+                        profile.enable()
+                    except ValueError as e:  # "Another profiling tool is already active"
+                        self.error, self.until = str(e), 0.0
+                        return
+                    self.profiles[key] = (profile, name)
+                return
+            if self.active or entry[1] != name:
+                return  # Still open, or another thread owns the process-wide profiler
+            del self.profiles[key]
+        profile = entry[0]
+        profile.disable()
+        path = f"{self.prefix}_{key}.prof"
+        try:
+            profile.dump_stats(path)
+        except OSError as e:
+            self.error = str(e)
+            return
+        with self.lock:
+            self.dumped.append(path)
+
+
+if __name__ == "__main__":
+    # Overhead check and a sample scrape: python metrics.py
+    import urllib.request
+
+    registry = MetricsRegistry()
+    fps = registry.rate("frames_per_second", "Frames processed per second")
+    latency = registry.histogram("detect_ms", "Face detection latency")
+    frames = registry.counter("frames_total", "Frames processed")
+    count = 200000
+    started = time.perf_counter()
+    for i in range(count):
+        frames.inc()
+        latency.observe(i % 50 / 10.0)
+        fps.mark()
+    print(f"update_us={(time.perf_counter() - started) * 1e6 / count:.2f} (counter + histogram + rate)")
+
+    server = MetricsServer(registry, port=0).start()
+    port = server.server.server_address[1]
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+    server.stop()
+    print(body[:400])
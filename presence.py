@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire `ttl` seconds after their last update (least recently updated first)."""
+
+    def __init__(self, max_size=1024, ttl=5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (value, updated_at), oldest update first
+        self.evictions = 0
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None or now - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def set(self, key, value, now):
+        self.entries[key] = (value, now)
+        self.entries.move_to_end(key)
+        self.evict(now)
+
+    def evict(self, now):
+        # Expired entries sit at the front, so this stops at the first live one
+        while self.entries:
+            key, (_, updated_at) = next(iter(self.entries.items()))
+            if now - updated_at <= self.ttl and len(self.entries) <= self.max_size:
+                break
+            del self.entries[key]
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Sighting:
+    __slots__ = ("status", "count", "committed")
+
+    def __init__(self, status):
+        self.status = status
+        self.count = 0
+        self.committed = False
+
+
+class PresenceTracker:
+    """Per-employee IN/OUT state machine that turns a stream of recognitions into real transitions.
+
+    A recognition only counts once the same employee has been seen `confirmations` times in a row with the
+    same status (each sighting within `sighting_ttl` seconds of the previous one). A confirmed IN is accepted
+    only if the employee is currently OUT, or if `min_gap_seconds` have passed since their last event; the
+    same holds for OUT. Someone standing in front of the camera therefore produces one event, not one per frame.
+    """
+
+    def __init__(self, logged_in=None, confirmations=3, min_gap_seconds=300.0, sighting_ttl=2.0,
+                 max_sightings=1024):
+        self.logged_in = logged_in if logged_in is not None else {}  # employee_id -> time of their IN event
+        self.last_event = {}  # employee_id -> (status, timestamp) of the last accepted event
+        self.confirmations = confirmations
+        self.min_gap_seconds = min_gap_seconds
+        self.sightings = TTLCache(max_sightings, sighting_ttl)
+        self.lock = threading.Lock()
+
+        # Counters
+        self.observations = 0
+        self.accepted = 0
+        self.suppressed = 0
+
+    def observe(self, employee_id, status, timestamp=None):
+        """Feed one recognition. Returns True exactly when it completes an accepted IN/OUT transition."""
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            self.observations += 1
+            sighting = self.sightings.get(employee_id, timestamp)
+            if sighting is None or sighting.status != status:
+                sighting = Sighting(status)
+            sighting.count += 1
+            self.sightings.set(employee_id, sighting, timestamp)
+            if sighting.committed or sighting.count < self.confirmations:
+                return False
+            # Confirmed: decide once per sighting, however long the person stays in view
+            sighting.committed = True
+            return self._transition(employee_id, status, timestamp)
+
+    def commit(self, employee_id, status, timestamp=None):
+        """Apply an explicit IN/OUT (e.g. a button press) without the confirmation count. Returns accepted."""
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            return self._transition(employee_id, status, timestamp)
+
+    def _transition(self, employee_id, status, timestamp):
+        last = self.last_event.get(employee_id)
+        if last is not None and last[0] == status and timestamp - last[1] < self.min_gap_seconds:
+            self.suppressed += 1
+            return False
+        self.last_event[employee_id] = (status, timestamp)
+        if status == "IN":
+            self.logged_in[employee_id] = timestamp
+        else:
+            self.logged_in.pop(employee_id, None)
+        self.accepted += 1
+        return True
+
+    def is_in(self, employee_id):
+        return employee_id in self.logged_in
+
+    def restore(self, records):
+        """Rebuild the state from replayed attendance_log entries (oldest first)."""
+        with self.lock:
+            for record in records:
+                if record["Employee ID"] == "Unknown":
+                    continue
+                status = "IN" if record["Status"] == "Logged IN" else "OUT"
+                timestamp = record.get("Timestamp", 0.0)
+                self.last_event[record["Employee ID"]] = (status, timestamp)
+                if status == "IN":
+                    self.logged_in[record["Employee ID"]] = timestamp
+                else:
+                    self.logged_in.pop(record["Employee ID"], None)
+
+
+if __name__ == "__main__":
+    # Event-flood check: one person in view for 5 s at 30 fps, then leaving and coming back 10 minutes later
+    tracker = PresenceTracker()
+    events = 0
+    for frame in range(150):
+        events += tracker.observe("Emp001", "IN", 1000.0 + frame / 30.0)
+    for frame in range(150):
+        events += tracker.observe("Emp001", "IN", 1600.0 + frame / 30.0)
+    for frame in range(150):
+        events += tracker.observe("Emp001", "OUT", 2000.0 + frame / 30.0)
+    print(f"observations={tracker.observations} events={events} suppressed={tracker.suppressed} "
+          f"cached_sightings={len(tracker.sightings)}")
@@ -0,0 +1,462 @@
+"""Local HTTP/JSON query service for presence and hours, independent of the GUI.
+
+Run with `python query_service.py [--journal Data/attendance] [--port 8088]`. It replays the attendance journal
+once, then tails it (whichever process writes it: the GUI or attendance_service.py), keeping indexes in memory:
+
+    GET /presence                              who is IN right now, with the time of their IN
+    GET /employees/<id>/sessions?from=&to=     IN/OUT sessions of one employee (dates are YYYY-MM-DD, inclusive)
+    GET /employees/<id>/events?from=&to=       raw IN/OUT events of one employee
+    GET /totals?from=&to=[&employee=<id>]      hours and sessions per employee over a date range
+    GET /health, GET /metrics                  index size and cache counters; Prometheus metrics
+
+List responses are paginated with `offset` and `limit` ({"total", "offset", "limit", "items"}).
+`python query_service.py bench [events]` measures query latency on a synthetic journal.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from attendance_journal import AttendanceJournal, decode_records
+from metrics import MetricsRegistry
+from presence import TTLCache
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class QueryError(Exception):
+    """A bad request; reported to the client with `status`."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def local_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def parse_range(start_date, end_date):
+    """Inclusive YYYY-MM-DD dates -> [start, end) timestamps at local midnight; missing ends are open."""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").timestamp() if start_date else float("-inf")
+        end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).timestamp() if end_date \
+            else float("inf")
+    except ValueError:
+        raise QueryError("Dates must be YYYY-MM-DD")
+    return start, end
+
+
+class EmployeeHistory:
+    """One employee's events and closed sessions as parallel arrays in time order.
+
+    `session_hours` is a running total, so the hours of any range of sessions is one subtraction.
+    """
+
+    __slots__ = ("name", "times", "codes", "session_starts", "session_ends", "session_hours", "open_in")
+
+    def __init__(self, name):
+        self.name = name
+        self.times = array("d")
+        self.codes = bytearray()  # 1 = IN, 0 = OUT
+        self.session_starts = array("d")
+        self.session_ends = array("d")
+        self.session_hours = array("d", [0.0])
+        self.open_in = None  # (timestamp, date) of an IN without an OUT yet
+
+
+class AttendanceIndex:
+    """Per-employee event and session indexes plus the current presence set, built from journal records.
+
+    Sessions are paired the way ReportEngine pairs them (an IN left open from an earlier day is replaced by
+    the next day's IN; an OUT closes the open IN, crediting the day it started on), so the API and the report
+    window agree. Range lookups are bisections on the time-ordered arrays: the (employee, date) index.
+    `expire()` drops INs from earlier days that were never closed (a forgotten clock-out), as the report does.
+    """
+
+    def __init__(self):
+        self.employees = {}  # employee_id -> EmployeeHistory
+        self.present = {}  # employee_id -> (timestamp, date) of their IN, for everyone currently IN
+        self.events = 0
+        self.last_timestamp = 0.0
+        self.version = 0  # Bumped on every batch of new events; cached responses from older versions are stale
+        self.lock = threading.RLock()
+
+    def add(self, timestamp, code, employee_id, name, date):
+        if employee_id == "Unknown":
+            return
+        history = self.employees.get(employee_id)
+        if history is None:
+            history = self.employees[employee_id] = EmployeeHistory(name)
+        history.name = name
+        history.times.append(timestamp)
+        history.codes.append(code)
+        if code == 1:
+            self.present[employee_id] = (timestamp, date)
+            if history.open_in is None or history.open_in[1] != date:
+                history.open_in = (timestamp, date)
+        else:
+            self.present.pop(employee_id, None)
+            if history.open_in is not None:
+                history.session_starts.append(history.open_in[0])
+                history.session_ends.append(timestamp)
+                history.session_hours.append(history.session_hours[-1] +
+                                             max(timestamp - history.open_in[0], 0.0) / 3600.0)
+                history.open_in = None
+        self.events += 1
+        self.last_timestamp = max(self.last_timestamp, timestamp)
+
+    def add_many(self, records, date):
+        with self.lock:
+            for timestamp, code, employee_id, name in records:
+                self.add(timestamp, code, employee_id, name, date)
+            self.version += 1
+
+    def expire(self, today):
+        """Forget INs dated before `today` that have no OUT: nobody is still present from yesterday, and the
+        report never credits such a session. Returns the number of employees no longer present."""
+        with self.lock:
+            stale = [employee_id for employee_id, (_, date) in self.present.items() if date < today]
+            for employee_id in stale:
+                del self.present[employee_id]
+            expired = 0
+            for history in self.employees.values():
+                if history.open_in is not None and history.open_in[1] < today:
+                    history.open_in = None
+                    expired += 1
+            if stale or expired:
+                self.version += 1  # Cached /presence and /sessions responses still list them
+        return len(stale)
+
+    def _history(self, employee_id):
+        history = self.employees.get(employee_id)
+        if history is None:
+            raise QueryError(f"Unknown employee {employee_id!r}", 404)
+        return history
+
+    # ---- queries; each returns (total, items) for the requested page ----
+
+    def presence(self, offset, limit):
+        with self.lock:
+            present = sorted(self.present.items())
+            items = [{"employee_id": employee_id, "name": self.employees[employee_id].name, "since": local_time(since)}
+                     for employee_id, (since, _) in present[offset:offset + limit]]
+        return len(present), items
+
+    def sessions(self, employee_id, start, end, offset, limit):
+        with self.lock:
+            history = self._history(employee_id)
+            first, last = bisect_left(history.session_starts, start), bisect_left(history.session_starts, end)
+            items = [{"in": local_time(history.session_starts[i]), "out": local_time(history.session_ends[i]),
+                      "hours": round(history.session_hours[i + 1] - history.session_hours[i], 2)}
+                     for i in range(first + offset, min(last, first + offset + limit))]
+            total = last - first
+            if history.open_in is not None and start <= history.open_in[0] < end:
+                # Still IN: listed last, without an OUT or hours
+                if offset <= total < offset + limit:
+                    items.append({"in": local_time(history.open_in[0]), "out": None, "hours": None})
+                total += 1
+        return total, items
+
+    def events_of(self, employee_id, start, end, offset, limit):
+        with self.lock:
+            history = self._history(employee_id)
+            first, last = bisect_left(history.times, start), bisect_left(history.times, end)
+            items = [{"time": local_time(history.times[i]), "status": "IN" if history.codes[i] else "OUT"}
+                     for i in range(first + offset, min(last, first + offset + limit))]
+        return last - first, items
+
+    def totals(self, start, end, offset, limit, employee_id=None):
+        with self.lock:
+            if employee_id is not None:
+                self._history(employee_id)  # 404 for an unknown ID
+                ids = [employee_id]
+            else:
+                ids = sorted(self.employees)
+            rows = []
+            for eid in ids:
+                history = self.employees[eid]
+                first, last = bisect_left(history.session_starts, start), bisect_left(history.session_starts, end)
+                if last > first or employee_id is not None:
+                    rows.append((eid, history.name, history.session_hours[last] - history.session_hours[first],
+                                 last - first))
+        items = [{"employee_id": eid, "name": name, "hours": round(hours, 2), "sessions": sessions}
+                 for eid, name, hours, sessions in rows[offset:offset + limit]]
+        return len(rows), items
+
+
+class JournalTail:
+    """Feeds an AttendanceIndex from the journal's segment files: everything at start, then whatever was appended.
+
+    Reads continue from the end of the last complete record, so a record that is half-written during a poll
+    is picked up whole on the next one.
+    """
+
+    def __init__(self, index, directory="Data/attendance", interval=1.0):
+        self.index = index
+        self.journal = AttendanceJournal(directory)
+        self.interval = interval
+        self.offsets = {}  # date -> bytes consumed
+        self.running = False
+        self.thread = None
+
+    def poll(self):
+        """Index new records from every segment that is new or has grown. Returns the number indexed."""
+        added = 0
+        for date, path in self.journal.segments():
+            offset = self.offsets.get(date, 0)
+            if os.path.getsize(path) <= offset:
+                continue
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            records = list(decode_records(data))
+            if records:
+                self.index.add_many((record[:4] for record in records), date)
+                self.offsets[date] = offset + records[-1][-1]
+                added += len(records)
+        return added
+
+    def start(self):
+        self.poll()
+        self.index.expire(time.strftime("%Y-%m-%d"))
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="JournalTail", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except OSError:
+                pass  # A segment being compacted or removed; read again on the next poll
+            self.index.expire(time.strftime("%Y-%m-%d"))  # Also runs across midnight with no new events
+
+    def stop(self):
+        self.running = False
+
+
+class QueryService:
+    """Routes GET requests to AttendanceIndex queries and caches the JSON bodies of repeated ones.
+
+    Cache entries are keyed by the request and the index version, so new events invalidate them; between
+    journal polls (and for dashboards asking the same question every few seconds) a hot query costs one lookup.
+    """
+
+    def __init__(self, index, cache_size=1024, cache_ttl=30.0, metrics=None):
+        self.index = index
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.cache_lock = threading.Lock()
+        self.metrics = metrics or MetricsRegistry(prefix="attendance_query_")
+        self.requests = self.metrics.counter("requests_total", "Query requests")
+        self.cache_hits = self.metrics.counter("cache_hits_total", "Query responses served from the cache")
+        self.metrics.gauge("indexed_events", "Events in the index", lambda: self.index.events)
+        self.metrics.gauge("present", "Employees currently IN", lambda: len(self.index.present))
+
+    def handle(self, target):
+        """(status, JSON body bytes) for a request target such as "/totals?from=2026-03-01"."""
+        self.requests.inc()
+        key = (target, self.index.version)
+        now = time.monotonic()
+        with self.cache_lock:
+            body = self.cache.get(key, now)
+        if body is not None:
+            self.cache_hits.inc()
+            return 200, body
+        with self.metrics.time("query_ms", "Query time without cache hits (ms)"):
+            try:
+                status, body = 200, json.dumps(self.route(target)).encode()
+            except QueryError as e:
+                return e.status, json.dumps({"error": str(e)}).encode()
+        with self.cache_lock:
+            self.cache.set(key, body, now)
+        return status, body
+
+    def route(self, target):
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        try:
+            offset = max(int(params.get("offset", 0)), 0)
+            limit = min(max(int(params.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            raise QueryError("offset and limit must be integers")
+        start, end = parse_range(params.get("from"), params.get("to"))
+
+        if parts == ["presence"]:
+            total, items = self.index.presence(offset, limit)
+        elif len(parts) == 3 and parts[0] == "employees" and parts[2] == "sessions":
+            total, items = self.index.sessions(parts[1], start, end, offset, limit)
+        elif len(parts) == 3 and parts[0] == "employees" and parts[2] == "events":
+            total, items = self.index.events_of(parts[1], start, end, offset, limit)
+        elif parts == ["totals"]:
+            total, items = self.index.totals(start, end, offset, limit, params.get("employee"))
+        elif parts == ["health"]:
+            return {"events": self.index.events, "employees": len(self.index.employees),
+                    "present": len(self.index.present), "version": self.index.version,
+                    "last_event": local_time(self.index.last_timestamp) if self.index.events else None,
+                    "requests": self.requests.value, "cache_hits": self.cache_hits.value}
+        else:
+            raise QueryError(f"No such endpoint: {url.path}", 404)
+        return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+class QueryServer:
+    """Serves a QueryService (and its /metrics) over HTTP from a daemon thread, like metrics.MetricsServer."""
+
+    def __init__(self, service, port=8088, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        service_ref = service
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, so polling clients don't reconnect for every request
+            disable_nagle_algorithm = True  # Headers and body are separate writes; don't wait for a delayed ACK
+
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics":
+                    status, body, content_type = 200, service_ref.metrics.render().encode(), "text/plain"
+                else:
+                    status, body = service_ref.handle(self.path)
+                    content_type = "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="QueryServer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_bench(event_count):
+    """Synthetic journal (IN, OUT, IN, OUT per employee per day) -> index build time and query latencies."""
+    import http.client
+    import random
+    import tempfile
+
+    from attendance_journal import encode_record
+
+    employees = 2000
+    days = max(event_count // (employees * 4), 1)
+    directory = tempfile.mkdtemp()
+    journal = AttendanceJournal(directory)
+    base = time.mktime(time.strptime("2026-01-01 08:30:00", "%Y-%m-%d %H:%M:%S"))
+    for day in range(days):
+        start = base + day * 86400
+        date = time.strftime("%Y-%m-%d", time.localtime(start))
+        with open(journal.segment_path(date), "wb") as f:
+            f.write(b"".join(encode_record(start + slot * 4 * 3600 + e * 1.5, 1 - slot % 2, f"Emp{e:04d}",
+                                           f"Employee {e}") for slot in range(4) for e in range(employees)))
+    # Half of the staff is still IN on the last day
+    last = time.strftime("%Y-%m-%d", time.localtime(base + (days - 1) * 86400))
+    with open(journal.segment_path(last), "ab") as f:
+        f.write(b"".join(encode_record(base + days * 86400 + e, 1, f"Emp{e:04d}", f"Employee {e}")
+                         for e in range(0, employees, 2)))
+
+    index = AttendanceIndex()
+    started = time.perf_counter()
+    JournalTail(index, directory).poll()
+    print(f"events={index.events} employees={len(index.employees)} days={days} "
+          f"build_s={time.perf_counter() - started:.1f}")
+
+    months = sorted({time.strftime("%Y-%m", time.localtime(base + day * 86400)) for day in range(days)})
+    random.seed(0)
+
+    def target():
+        kind = random.random()
+        employee = f"Emp{random.randrange(employees):04d}"
+        month = random.choice(months)
+        if kind < 0.3:
+            return f"/presence?offset={random.randrange(0, 1000, 100)}"
+        if kind < 0.6:
+            return f"/employees/{employee}/sessions?from={month}-01&to={month}-28"
+        if kind < 0.8:
+            return f"/totals?from={month}-01&to={month}-28&employee={employee}"
+        if kind < 0.9:
+            return f"/employees/{employee}/events?from={month}-01&to={month}-07"
+        return f"/totals?from={month}-01&to={month}-28&offset={random.randrange(0, 2000, 100)}"
+
+    def percentiles(label, timings):
+        timings.sort()
+        print(f"{label}: p50_ms={timings[len(timings) // 2]:.3f} p99_ms={timings[int(len(timings) * 0.99)]:.3f} "
+              f"max_ms={timings[-1]:.3f}")
+
+    queries = [target() for _ in range(5000)]
+    service = QueryService(index, cache_size=0)  # Every query computed
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        status, _ = service.handle(query)
+        timings.append((time.perf_counter() - started) * 1000.0)
+        assert status == 200, query
+    percentiles("uncached", timings)
+
+    service = QueryService(index)
+    hot = queries[:200]
+    timings = []
+    for i in range(5000):
+        started = time.perf_counter()
+        service.handle(hot[i % len(hot)])
+        timings.append((time.perf_counter() - started) * 1000.0)
+    percentiles(f"hot (cache_hits={service.cache_hits.value})", timings)
+
+    server = QueryServer(service, port=0).start()
+    connection = http.client.HTTPConnection("127.0.0.1", server.server.server_address[1])
+    timings = []
+    for query in queries[:2000]:
+        started = time.perf_counter()
+        connection.request("GET", query)
+        connection.getresponse().read()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    server.stop()
+    percentiles("http", timings)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        run_bench(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description="HTTP/JSON queries over the attendance journal")
+    parser.add_argument("--journal", default="Data/attendance", help="Attendance journal directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between journal polls")
+    args = parser.parse_args()
+
+    index = AttendanceIndex()
+    started = time.perf_counter()
+    tail = JournalTail(index, args.journal, args.interval).start()
+    print(f"Indexed {index.events} events for {len(index.employees)} employees in "
+          f"{time.perf_counter() - started:.1f} s; serving on http://{args.host}:{args.port}/", flush=True)
+    server = QueryServer(QueryService(index), args.port, args.host).start()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    tail.stop()
+    server.stop()
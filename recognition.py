@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+# One face found in a frame: who it is (or "Unknown"), the LBPH distance and its box in frame coordinates
+Recognition = namedtuple("Recognition", ["employee_id", "name", "label", "confidence", "box"])
+
+
+def employee_label(employee_id):
+    """Map an employee ID like 'Emp001' to the integer label used by the LBPH recognizer."""
+    if employee_id and employee_id.startswith("Emp") and employee_id[3:].isdigit():
+        return int(employee_id[3:])
+    return None
+
+
+class FaceRecognitionPipeline:
+    """Detects every face in a frame and resolves each one to an employee with the trained LBPH model."""
+
+    def __init__(self, face_cascade, face_recognizer, employee_data, confidence_threshold=70.0,
+                 detection_width=320, min_face_size=30):
+        self.face_cascade = face_cascade
+        self.face_recognizer = face_recognizer
+        self.employee_data = employee_data  # Shared with the UI, so newly added employees resolve immediately
+        self.confidence_threshold = confidence_threshold  # LBPH distance; lower means a closer match
+        self.detection_width = detection_width  # Run the cascade on a copy downscaled to this width
+        self.min_face_size = min_face_size  # In full-resolution pixels
+        self.probe_size = (100, 100)  # Probes are normalized like the training crops (SampleStore.size)
+        self.model_trained = False
+        self.excluded_labels = {}  # Tombstoned labels that must never be reported (see face_trainer)
+        self.lock = threading.Lock()  # Held around predict; hold it while training or reloading the model
+        self.label_map = None  # label -> employee ID (e.g. SampleStore.employee_by_label); None = 'EmpXXX' labels
+        self.registry = None  # Optional EmployeeRegistry whose employee_data this is; its version keys the index
+        self.label_index = {}
+        self.label_index_key = None
+
+        # Latency reporting
+        self.frames_processed = 0
+        self.last_latency_ms = 0.0
+        self.average_latency_ms = 0.0
+        self.metrics = None  # Optional metrics.MetricsRegistry: detect/predict latency histograms
+
+    def swap_recognizer(self, face_recognizer):
+        """Switch to a newly trained model; predictions already running finish on the old one."""
+        with self.lock:
+            self.face_recognizer = face_recognizer
+            self.model_trained = True
+
+    def employee_for_label(self, label):
+        employee_id = self.label_map.get(label) if self.label_map is not None else None
+        if employee_id is None:
+            # Rebuild the label index after any registry change (an add and a delete leave the count unchanged);
+            # without a registry, employee_data is keyed by its IDs
+            key = self.registry.version if self.registry is not None else frozenset(self.employee_data)
+            if key != self.label_index_key:
+                self.label_index = {employee_label(employee_id): employee_id for employee_id in self.employee_data}
+                self.label_index_key = key
+            employee_id = self.label_index.get(label)
+        if employee_id is None or employee_id not in self.employee_data:
+            return None, None
+        return employee_id, self.employee_data[employee_id]
+
+    def downscale(self, gray):
+        """Return the detection-sized copy of a grayscale frame and the factor back to full resolution."""
+        height, width = gray.shape[:2]
+        if self.detection_width and width > self.detection_width:
+            scale = width / float(self.detection_width)
+            small = cv2.resize(gray, (self.detection_width, int(round(height / scale))), interpolation=cv2.INTER_AREA)
+            return small, scale
+        return gray, 1.0
+
+    def detect(self, gray, small=None, scale=None):
+        """Run the Haar cascade on a downscaled copy and return boxes in full-resolution coordinates."""
+        if small is None:
+            small, scale = self.downscale(gray)
+
+        min_size = max(int(self.min_face_size / scale), 12)
+        started = time.perf_counter()
+        faces = self.face_cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size))
+        if self.metrics is not None:
+            self.metrics.histogram("detect_ms", "Face detection latency (ms)").observe(
+                (time.perf_counter() - started) * 1000.0)
+        return [(int(x * scale), int(y * scale), int(w * scale), int(h * scale)) for (x, y, w, h) in faces]
+
+    def _best_live_match(self, face_img):
+        # The nearest sample belongs to a deleted employee; take the nearest one that doesn't
+        if hasattr(self.face_recognizer, "ranked"):
+            results = self.face_recognizer.ranked(face_img)  # lbph_model.LBPHModel
+        else:
+            collector = cv2.face.StandardCollector_create()
+            self.face_recognizer.predict_collect(face_img, collector)
+            results = collector.getResults(True)
+        for label, distance in results:
+            if label not in self.excluded_labels:
+                return label, distance
+        return -1, float("inf")
+
+    def _predict_all(self, face_imgs):
+        from sample_store import normalize_face  # sample_store imports this module
+
+        # Engines with a batch API (identification.VectorIdentifier) score every face of a frame in one call
+        # and normalize the crops themselves
+        if hasattr(self.face_recognizer, "predict_batch"):
+            with self.lock:
+                return self.face_recognizer.predict_batch(face_imgs)
+        predictions = []
+        for face_img in face_imgs:
+            # Same size and histogram equalization as the stored samples the model was trained on
+            face_img = normalize_face(face_img, self.probe_size)
+            with self.lock:
+                label, confidence = self.face_recognizer.predict(face_img)
+                if label in self.excluded_labels:
+                    label, confidence = self._best_live_match(face_img)
+            predictions.append((label, confidence))
+        return predictions
+
+    def recognize_faces(self, gray, boxes):
+        """Predict an identity for every box of one frame in a single pass."""
+        boxes = [(x, y, w, h) for (x, y, w, h) in boxes if w > 0 and h > 0]
+        face_imgs = [gray[y:y + h, x:x + w] for (x, y, w, h) in boxes]
+        predictions = [(-1, float("inf"))] * len(boxes)
+        if self.model_trained and face_imgs:
+            started = time.perf_counter()
+            try:
+                predictions = self._predict_all(face_imgs)
+                if self.metrics is not None:
+                    self.metrics.histogram("predict_ms", "Recognition latency per frame (ms)").observe(
+                        (time.perf_counter() - started) * 1000.0)
+            except cv2.error:
+                # Model is empty or was cleared underneath us
+                self.model_trained = False
+
+        results = []
+        for box, (label, confidence) in zip(boxes, predictions):
+            employee_id, name = None, None
+            if confidence <= self.confidence_threshold:
+                employee_id, name = self.employee_for_label(label)
+            if employee_id is None:
+                employee_id, name = "Unknown", "Unknown"
+            results.append(Recognition(employee_id, name, label, confidence, box))
+        return results
+
+    def process(self, frame):
+        """Detect and recognize all faces in a BGR frame. Returns (recognitions, latency in ms)."""
+        started = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        results = self.recognize_faces(gray, self.detect(gray))
+        latency_ms = (time.perf_counter() - started) * 1000.0
+
+        self.frames_processed += 1
+        self.last_latency_ms = latency_ms
+        if self.frames_processed == 1:
+            self.average_latency_ms = latency_ms
+        else:
+            self.average_latency_ms = 0.9 * self.average_latency_ms + 0.1 * latency_ms
+        return results, latency_ms
+
+
+if __name__ == "__main__":
+    # Throughput check: python recognition.py [video file | camera index | synthetic] [frames]
+    import os
+    import sys
+
+    from face_trainer import IncrementalTrainer
+    from frame_grabber import FrameGrabber
+    from lbph_model import LBPHModel
+    from sample_store import SampleStore
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    frame_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    cv2.setNumThreads(1)  # The 30 fps target is for a single core
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    face_recognizer = LBPHModel()
+    pipeline = FaceRecognitionPipeline(face_cascade, face_recognizer, {})
+    if os.path.isdir("Data"):
+        # The active model checkpoint plus samples added since, as the app loads it
+        store = SampleStore("Data", readonly=True).open()
+        trainer = IncrementalTrainer(face_recognizer, store, checkpoint_every=10 ** 12, auto_compact=False)
+        pipeline.model_trained = trainer.load()
+        pipeline.label_map = store.employee_by_label
+
+    grabber = FrameGrabber(source, realtime=False).start()
+    latencies = []
+    while len(latencies) < frame_count:
+        frame = grabber.get(timeout=2.0)
+        if frame is None:
+            break
+        frame_image = cv2.resize(frame.image, (640, 480)) if frame.image.shape[:2] != (480, 640) else frame.image
+        latencies.append(pipeline.process(frame_image)[1])
+    grabber.stop()
+
+    if latencies:
+        latencies.sort()
+        mean = sum(latencies) / len(latencies)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(f"frames={len(latencies)} mean_ms={mean:.2f} p95_ms={p95:.2f} max_fps={1000.0 / mean:.1f}")
@@ -0,0 +1,349 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from recognition import employee_label
+
+# One index record per face sample; the pixels live at the same position in the image file
+INDEX_DTYPE = np.dtype([
+    ("employee_id", "S16"),
+    ("label", "<i4"),
+    ("capture_time", "<f8"),
+    ("quality", "<f4"),
+    ("deleted", "u1"),
+    ("reserved", "u1", (3,)),
+])
+MAX_ID_BYTES = INDEX_DTYPE["employee_id"].itemsize  # Longer IDs would be cut on disk and merge or go undeletable
+
+
+def normalize_face(face_img, size=(100, 100)):
+    """Grayscale, resize and histogram-equalize a face crop to the store's fixed format."""
+    if face_img.ndim == 3:
+        face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+    face_img = cv2.resize(face_img, size, interpolation=cv2.INTER_AREA)
+    return cv2.equalizeHist(face_img)
+
+
+def check_employee_id(employee_id):
+    """Raise ValueError for an ID the index can't store whole (empty, or over MAX_ID_BYTES in UTF-8)."""
+    if not employee_id or len(employee_id.encode()) > MAX_ID_BYTES:
+        raise ValueError(f"Employee ID {employee_id!r} must be 1 to {MAX_ID_BYTES} bytes long")
+
+
+def sharpness(face_img):
+    """Laplacian variance, used as the sample quality score."""
+    return float(cv2.Laplacian(face_img, cv2.CV_64F).var())
+
+
+class StoreLockedError(OSError):
+    """Another process has the sample store open for writing."""
+
+
+def _try_lock(f):
+    # Byte 0 is the lock on Windows (msvcrt locks byte ranges); the holder's JSON follows it so others can read it
+    f.seek(0)
+    if os.name == "nt":
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock(f):
+    f.seek(0)
+    if os.name == "nt":
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def store_writer(data_dir="Data"):
+    """{"owner", "pid"} of the process that has the store open for writing, or None if nobody does."""
+    path = os.path.join(data_dir, "samples.lock")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r+b") as f:
+        try:
+            _try_lock(f)
+        except OSError:
+            f.seek(1)
+            try:
+                return json.loads(f.read().decode())
+            except ValueError:
+                return {"owner": "another process", "pid": None}
+        _unlock(f)
+    return None
+
+
+class SampleStore:
+    """All face samples in two append-only files instead of one JPEG per sample.
+
+    * `samples.u8`  - fixed-size normalized grayscale crops, read through a memory map (zero copy)
+    * `samples.idx` - one INDEX_DTYPE record per crop: employee ID, label, capture time, quality, deleted flag
+
+    Deleting only sets the flag (tombstone); `compact()` rewrites the files without deleted records.
+    Only one process may write: a writable store holds an exclusive lock on `samples.lock` until `close()`
+    (or exit), and `open()` raises StoreLockedError while someone else holds it. Read-only opens never lock.
+    """
+
+    def __init__(self, data_dir="Data", size=(100, 100), readonly=False, owner=None):
+        self.data_dir = data_dir
+        self.size = size  # (width, height) of every stored crop
+        self.readonly = readonly
+        self.owner = owner or os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"
+        self.images_path = os.path.join(data_dir, "samples.u8")
+        self.index_path = os.path.join(data_dir, "samples.idx")
+        self.meta_path = os.path.join(data_dir, "samples.json")
+        self.lock_path = os.path.join(data_dir, "samples.lock")
+        self.lock_file = None
+        self.sample_bytes = size[0] * size[1]
+        self.lock = threading.RLock()
+
+        self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self.images = None  # np.memmap over the image file, remapped as it grows
+        self.label_by_employee = {}
+        self.employee_by_label = {}  # Shared with the recognition pipeline; updated in place
+
+    def open(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        if not self.readonly and self.lock_file is None:
+            self._lock()
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.size = tuple(meta["size"])
+            self.sample_bytes = self.size[0] * self.size[1]
+        elif not self.readonly:
+            with open(self.meta_path, "w") as f:
+                json.dump({"size": list(self.size), "format": 1}, f)
+
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE) if os.path.exists(self.index_path) \
+            else np.zeros(0, dtype=INDEX_DTYPE)
+        index_bytes = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        image_bytes = os.path.getsize(self.images_path) if os.path.exists(self.images_path) else 0
+        count = min(len(index), image_bytes // self.sample_bytes)
+        if not self.readonly and (count * INDEX_DTYPE.itemsize != index_bytes or
+                                  count * self.sample_bytes != image_bytes):
+            # An append was interrupted; drop the half-written tail, including a partial crop or record,
+            # so the next append starts on a record boundary
+            with open(self.index_path, "r+b" if os.path.exists(self.index_path) else "wb") as f:
+                f.truncate(count * INDEX_DTYPE.itemsize)
+            with open(self.images_path, "r+b" if os.path.exists(self.images_path) else "wb") as f:
+                f.truncate(count * self.sample_bytes)
+        self.index = index[:count].copy()
+        self._rebuild_labels()
+        self._remap()
+        return self
+
+    def _lock(self):
+        f = open(self.lock_path, "a+b")
+        try:
+            _try_lock(f)
+        except OSError:
+            f.close()
+            writer = store_writer(self.data_dir) or {"owner": "another process", "pid": None}
+            raise StoreLockedError(f"The sample store in {self.data_dir} is in use by {writer['owner']} "
+                                   f"(pid {writer['pid']})")
+        f.seek(1)
+        f.truncate()
+        f.write(json.dumps({"owner": self.owner, "pid": os.getpid()}).encode())
+        f.flush()
+        self.lock_file = f
+
+    def close(self):
+        """Release the write lock (the files themselves are never held open)."""
+        if self.lock_file is not None:
+            _unlock(self.lock_file)
+            self.lock_file.close()
+            self.lock_file = None
+
+    def _remap(self):
+        count = len(self.index)
+        self.images = None
+        if count:
+            self.images = np.memmap(self.images_path, dtype=np.uint8, mode="r",
+                                    shape=(count, self.size[1], self.size[0]))
+
+    def _rebuild_labels(self):
+        self.label_by_employee.clear()
+        self.employee_by_label.clear()
+        for employee_id, label in zip(self.index["employee_id"], self.index["label"]):
+            employee_id = employee_id.decode()
+            self.label_by_employee[employee_id] = int(label)
+            self.employee_by_label[int(label)] = employee_id
+
+    def __len__(self):
+        return len(self.index)
+
+    def label_for(self, employee_id):
+        """Stable integer label for an employee, assigned on first use ('EmpXXX' keeps XXX when free)."""
+        label = self.label_by_employee.get(employee_id)
+        if label is None:
+            label = employee_label(employee_id)
+            if label is None or label in self.employee_by_label:
+                label = max(self.employee_by_label, default=0) + 1
+            self.label_by_employee[employee_id] = label
+            self.employee_by_label[label] = employee_id
+        return label
+
+    def append(self, employee_id, face_img, quality=None, capture_time=None, normalized=False):
+        """Store one face crop; returns its record index."""
+        return self.append_many(employee_id, [face_img], [quality], capture_time, normalized)[0]
+
+    def append_many(self, employee_id, face_imgs, qualities=None, capture_time=None, normalized=False):
+        """Store several crops of one employee with a single write per file; returns their record indices."""
+        if self.readonly:
+            raise IOError("Sample store is open read-only")
+        check_employee_id(employee_id)
+        crops = [face_img if normalized else normalize_face(face_img, self.size) for face_img in face_imgs]
+        if not crops:
+            return []
+        qualities = qualities or [None] * len(crops)
+        with self.lock:
+            label = self.label_for(employee_id)
+            records = np.zeros(len(crops), dtype=INDEX_DTYPE)
+            records["employee_id"] = employee_id.encode()
+            records["label"] = label
+            records["capture_time"] = capture_time or time.time()
+            records["quality"] = [sharpness(crop) if q is None else q for crop, q in zip(crops, qualities)]
+
+            # Pixels first, then the index: a crash in between leaves an orphan tail that open() trims
+            with open(self.images_path, "ab") as f:
+                f.write(np.ascontiguousarray(np.stack(crops), dtype=np.uint8).tobytes())
+            with open(self.index_path, "ab") as f:
+                f.write(records.tobytes())
+
+            first = len(self.index)
+            self.index = np.concatenate([self.index, records])
+            self._remap()
+            return list(range(first, len(self.index)))
+
+    def delete_employee(self, employee_id):
+        """Tombstone every live sample of an employee; returns how many were deleted."""
+        with self.lock:
+            rows = np.flatnonzero((self.index["employee_id"] == employee_id.encode()) & (self.index["deleted"] == 0))
+            if len(rows) and not self.readonly:
+                self.index["deleted"][rows] = 1
+                offset = INDEX_DTYPE.fields["deleted"][1]
+                with open(self.index_path, "r+b") as f:
+                    for row in rows:
+                        f.seek(int(row) * INDEX_DTYPE.itemsize + offset)
+                        f.write(b"\x01")
+            return len(rows)
+
+    def live_indices(self, employee_id=None):
+        mask = self.index["deleted"] == 0
+        if employee_id is not None:
+            mask &= self.index["employee_id"] == employee_id.encode()
+        return np.flatnonzero(mask)
+
+    def count(self, employee_id):
+        return len(self.live_indices(employee_id))
+
+    def labels(self, indices):
+        return self.index["label"][indices].astype(np.int32)
+
+    def faces(self, indices):
+        """Views into the memory map for the given records (no pixel copies)."""
+        return [self.images[i] for i in indices]
+
+    def training_set(self, indices=None):
+        """(faces, labels, indices) for every live sample, ready for LBPHFaceRecognizer.train()."""
+        if indices is None:
+            indices = self.live_indices()
+        return self.faces(indices), self.labels(indices), indices
+
+    def compact(self):
+        """Rewrite both files without deleted records. Returns an old -> new index map (-1 for dropped)."""
+        with self.lock:
+            live = self.live_indices()
+            mapping = np.full(len(self.index), -1, dtype=np.int64)
+            mapping[live] = np.arange(len(live))
+
+            tmp_images, tmp_index = self.images_path + ".tmp", self.index_path + ".tmp"
+            with open(tmp_images, "wb") as f:
+                for start in range(0, len(live), 1024):
+                    f.write(np.ascontiguousarray(self.images[live[start:start + 1024]]).tobytes())
+            self.index[live].tofile(tmp_index)
+
+            self.images = None  # Release the map before replacing the file underneath it
+            os.replace(tmp_images, self.images_path)
+            os.replace(tmp_index, self.index_path)
+            self.index = self.index[live].copy()
+            self._rebuild_labels()
+            self._remap()
+            return mapping
+
+
+def migrate(data_dir="Data", employee_data_dir="employee_data", store=None):
+    """Import the loose JPEG samples into the packed store. Returns (imported, skipped)."""
+    store = store or SampleStore(data_dir).open()
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    imported, skipped = 0, 0
+
+    def largest_face(gray):
+        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return gray[y:y + h, x:x + w]
+
+    # Data/<EmpID>_<n>.jpg are already face crops
+    if os.path.isdir(data_dir):
+        for file in sorted(os.listdir(data_dir)):
+            if not file.endswith(".jpg") or employee_label(file.split("_")[0]) is None:
+                continue
+            path = os.path.join(data_dir, file)
+            img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                skipped += 1
+                continue
+            store.append(file.split("_")[0], img, capture_time=os.path.getmtime(path))
+            imported += 1
+
+    # employee_data/<EmpID>/<EmpID>_<n>.jpg are full frames and need a face crop first
+    if os.path.isdir(employee_data_dir):
+        for employee_id in sorted(os.listdir(employee_data_dir)):
+            folder = os.path.join(employee_data_dir, employee_id)
+            if not os.path.isdir(folder):
+                continue
+            for file in sorted(os.listdir(folder)):
+                path = os.path.join(folder, file)
+                img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+                face_img = largest_face(img) if img is not None else None
+                if face_img is None:
+                    skipped += 1
+                    continue
+                store.append(employee_id, face_img, capture_time=os.path.getmtime(path))
+                imported += 1
+    return imported, skipped
+
+
+if __name__ == "__main__":
+    # python sample_store.py migrate [Data] [employee_data]   - import the loose JPEG samples
+    # python sample_store.py stats [Data]                     - show what the store contains
+    # python sample_store.py compact [Data]                   - drop deleted samples from the files
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else "Data"
+    if command == "migrate":
+        employee_data_dir = sys.argv[3] if len(sys.argv) > 3 else "employee_data"
+        imported, skipped = migrate(data_dir, employee_data_dir)
+        print(f"Imported {imported} samples, skipped {skipped} unreadable or faceless images")
+    elif command == "compact":
+        store = SampleStore(data_dir).open()
+        mapping = store.compact()
+        print(f"Kept {len(store)} of {len(mapping)} samples")
+    else:
+        store = SampleStore(data_dir, readonly=True).open()
+        live = store.live_indices()
+        print(f"{len(store)} samples ({len(live)} live) for {len(set(store.index['employee_id'][live]))} employees")
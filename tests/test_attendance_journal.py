@@ -0,0 +1,93 @@
+import os
+import time
+
+import pytest
+
+from attendance_journal import AttendanceJournal, decode_records, encode_record
+
+MORNING = time.mktime((2026, 3, 2, 9, 0, 0, 0, 0, -1))
+DATE = "2026-03-02"
+
+
+def write_segment(journal, records):
+    os.makedirs(journal.directory, exist_ok=True)
+    with open(journal.segment_path(DATE), "wb") as f:
+        f.write(b"".join(encode_record(*record) for record in records))
+
+
+def test_append_flush_replay(tmp_path):
+    journal = AttendanceJournal(str(tmp_path)).start()
+    entry = journal.append("Emp001", "Ada", "IN", MORNING)
+    journal.append("Emp001", "Ada", "OUT", MORNING + 3600)
+    assert journal.close()
+
+    assert entry == {"Employee ID": "Emp001", "Name": "Ada", "Date": DATE, "Time": "09:00:00",
+                     "Status": "Logged IN", "Timestamp": MORNING}
+    events = list(AttendanceJournal(str(tmp_path)).replay())
+    assert [(e["Employee ID"], e["Status"], e["Time"]) for e in events] == \
+        [("Emp001", "Logged IN", "09:00:00"), ("Emp001", "Logged OUT", "10:00:00")]
+    assert list(AttendanceJournal(str(tmp_path)).replay(start_date="2026-03-03")) == []
+
+
+def test_decode_stops_at_corrupt_record():
+    data = bytearray(encode_record(MORNING, 1, "Emp001", "Ada") + encode_record(MORNING + 1, 1, "Emp002", "Bob"))
+    data[-1] ^= 0xFF
+    assert [record[2] for record in decode_records(bytes(data))] == ["Emp001"]
+
+
+def test_torn_tail_is_ignored_and_trimmed_on_append(tmp_path):
+    journal = AttendanceJournal(str(tmp_path))
+    write_segment(journal, [(MORNING, 1, "Emp001", "Ada")])
+    with open(journal.segment_path(DATE), "ab") as f:
+        f.write(encode_record(MORNING + 1, 1, "Emp002", "Bob")[:-3])
+    assert [record[2] for record in journal.read_segment(DATE)] == ["Emp001"]
+
+    journal.start()
+    journal.append("Emp003", "Cy", "IN", MORNING + 2)
+    assert journal.close()
+    assert [record[2] for record in journal.read_segment(DATE)] == ["Emp001", "Emp003"]
+
+
+def test_long_fields_are_cut_on_a_character_boundary():
+    name = "é" * 200  # 400 bytes of two-byte characters
+    record = next(decode_records(encode_record(MORNING, 1, "Emp001", name)))
+    assert record[3] == "é" * 127
+    assert "\ufffd" not in record[3]
+
+
+def test_compact_drops_only_exact_duplicates(tmp_path):
+    journal = AttendanceJournal(str(tmp_path))
+    write_segment(journal, [
+        (MORNING, 1, "Emp001", "Ada"),
+        (MORNING, 1, "Emp001", "Ada"),  # The same batch written twice
+        (MORNING + 600, 1, "Emp001", "Ada"),  # A real second IN
+        (MORNING + 5, 1, "Unknown", "Unknown"),
+        (MORNING + 5, 1, "Unknown", "Unknown"),  # Two unrecognized faces in one frame
+        (MORNING + 3600, 0, "Emp001", "Ada"),
+    ])
+    with open(journal.segment_path(DATE), "ab") as f:
+        f.write(b"\x00\x01")  # Torn tail
+
+    assert journal.compact(DATE) == 1
+    records = journal.read_segment(DATE)
+    assert [(r[0] - MORNING, r[1], r[2]) for r in records] == [
+        (0, 1, "Emp001"), (600, 1, "Emp001"), (5, 1, "Unknown"), (5, 1, "Unknown"), (3600, 0, "Emp001")]
+    with open(journal.segment_path(DATE), "rb") as f:
+        assert list(decode_records(f.read()))[-1][-1] == os.path.getsize(journal.segment_path(DATE))
+
+
+def test_compact_leaves_a_clean_segment_alone(tmp_path):
+    journal = AttendanceJournal(str(tmp_path))
+    write_segment(journal, [(MORNING, 1, "Emp001", "Ada"), (MORNING + 60, 0, "Emp001", "Ada")])
+    before = os.stat(journal.segment_path(DATE))
+    assert journal.compact(DATE) == 0
+    assert os.stat(journal.segment_path(DATE)).st_ino == before.st_ino
+
+
+def test_compact_refuses_the_open_segment(tmp_path):
+    journal = AttendanceJournal(str(tmp_path)).start()
+    journal.append("Emp001", "Ada", "IN", MORNING)
+    journal.flush()
+    with pytest.raises(ValueError):
+        journal.compact(DATE)
+    journal.close()
@@ -0,0 +1,63 @@
+import time
+
+from attendance_journal import event_dict
+from attendance_report import ReportEngine
+
+
+def at(day, hour, minute=0, month=3):
+    return time.mktime((2026, month, day, hour, minute, 0, 0, 0, -1))
+
+
+def feed(engine, *events):
+    for employee_id, status, timestamp in events:
+        engine.add(event_dict(timestamp, 1 if status == "IN" else 0, employee_id, employee_id.lower()))
+
+
+def test_session_pairs_in_and_out():
+    engine = ReportEngine(late_after="09:15:00")
+    feed(engine, ("Emp001", "IN", at(2, 9)), ("Emp001", "OUT", at(2, 17)),
+         ("Emp002", "IN", at(2, 9, 30)), ("Emp002", "OUT", at(2, 12)))
+    assert engine.monthly_rows("2026-03") == [("Emp001", "emp001", 1, "8.00", 1, 0),
+                                              ("Emp002", "emp002", 1, "2.50", 1, 1)]
+    assert engine.daily_rows("2026-03")[1] == ("Emp002", "emp002", "2026-03-02", "09:30:00", "12:00:00", "2.50",
+                                               "Late")
+    assert engine.session_count == 2
+
+
+def test_second_in_keeps_the_original_start():
+    engine = ReportEngine()
+    feed(engine, ("Emp001", "IN", at(2, 9)), ("Emp001", "IN", at(2, 10)), ("Emp001", "OUT", at(2, 11)))
+    assert engine.monthly_rows("2026-03")[0][3] == "2.00"
+
+
+def test_session_left_open_overnight_is_dropped():
+    engine = ReportEngine()
+    feed(engine, ("Emp001", "IN", at(2, 9)), ("Emp001", "IN", at(3, 9)), ("Emp001", "OUT", at(3, 10)))
+    rows = engine.daily_rows("2026-03")
+    assert [(row[2], row[5]) for row in rows] == [("2026-03-02", "0.00"), ("2026-03-03", "1.00")]
+
+
+def test_session_is_credited_to_the_day_it_started():
+    engine = ReportEngine()
+    feed(engine, ("Emp001", "IN", at(2, 22)), ("Emp001", "OUT", at(3, 2)))
+    rows = engine.daily_rows("2026-03")
+    assert [(row[2], row[3], row[4], row[5]) for row in rows] == [("2026-03-02", "22:00:00", "", "4.00"),
+                                                                  ("2026-03-03", "", "02:00:00", "0.00")]
+
+
+def test_out_without_in_credits_nothing():
+    engine = ReportEngine()
+    feed(engine, ("Emp001", "OUT", at(2, 17)), ("Unknown", "IN", at(2, 9)))
+    assert engine.daily_rows("2026-03") == [("Emp001", "emp001", "2026-03-02", "", "17:00:00", "0.00", "")]
+    assert engine.session_count == 0
+    assert [row[0] for row in engine.event_rows("2026-03")] == ["Emp001", "Unknown"]
+
+
+def test_old_months_are_pruned():
+    engine = ReportEngine(keep_months=2, event_months=1)
+    for month in (1, 2, 3):
+        feed(engine, ("Emp001", "IN", at(2, 9, month=month)), ("Emp001", "OUT", at(2, 10, month=month)))
+    assert engine.months() == ["2026-03", "2026-02"]
+    assert engine.event_rows("2026-02") == []
+    assert len(engine.event_rows("2026-03")) == 2
+    assert engine.daily_rows("2026-01") == []
@@ -0,0 +1,83 @@
+import pytest
+
+from employee_registry import EmployeeRegistry, get_registry, read_records
+
+
+def employee(employee_id, name, cnic="", **fields):
+    return dict(employee_id=employee_id, name=name, cnic=cnic, **fields)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = EmployeeRegistry(str(tmp_path / "employees.db"))
+    yield registry
+    registry.close()
+
+
+def test_add_get_and_reload(registry):
+    changes = []
+    registry.listeners.append(lambda action, record: changes.append((action, record["employee_id"])))
+    assert registry.add(employee("Emp001", "Ada", "12345", department="R&D"))
+    assert not registry.add(employee("Emp001", "Someone else"))
+    assert registry.get("Emp001")["department"] == "R&D"
+    assert registry.names == {"Emp001": "Ada"}
+    assert registry.find_by_cnic("12345") == "Emp001"
+    assert changes == [("add", "Emp001")]
+
+    reopened = EmployeeRegistry(registry.db_path)
+    assert reopened.get("Emp001") == registry.get("Emp001")
+    reopened.close()
+
+
+def test_replace_moves_the_cnic(registry):
+    registry.add(employee("Emp001", "Ada", "12345"))
+    version = registry.version
+    assert registry.add(employee("Emp001", "Ada L.", "67890"), replace=True)
+    assert registry.find_by_cnic("12345") is None
+    assert registry.find_by_cnic("67890") == "Emp001"
+    assert registry.names["Emp001"] == "Ada L."
+    assert registry.version > version
+
+
+def test_add_many_upserts(registry):
+    registry.add(employee("Emp001", "Ada", "12345"))
+    written = registry.add_many([employee("Emp001", "Ada L.", "67890"), employee("Emp002", "Bob", "22222"),
+                                 employee("", "No ID"), employee("Emp003", "")])
+    assert written == 2
+    assert len(registry) == 2
+    assert registry.find_by_cnic("12345") is None
+    assert registry.find_by_cnic("67890") == "Emp001"
+
+    assert registry.add_many([employee("Emp002", "Robert", "33333")], replace=False) == 1
+    assert registry.get("Emp002")["name"] == "Bob"
+    assert registry.find_by_cnic("22222") == "Emp002"
+    reopened = EmployeeRegistry(registry.db_path)
+    assert reopened.get("Emp002")["name"] == "Bob"
+    reopened.close()
+
+
+def test_delete(registry):
+    registry.add(employee("Emp001", "Ada", "12345"))
+    assert registry.delete("Emp001")
+    assert not registry.delete("Emp001")
+    assert not registry.exists("Emp001")
+    assert registry.find_by_cnic("12345") is None
+    assert "Emp001" not in registry.names
+
+
+def test_get_registry_is_shared(tmp_path):
+    path = str(tmp_path / "shared.db")
+    registry = get_registry(path, legacy_excel=None)
+    assert get_registry(path, legacy_excel=None) is registry
+    registry.close()
+
+
+def test_read_records_csv(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text("Name,Employee ID,Phone No,Shoe size\nAda , Emp001,555,42\n,,,\nBob,Emp002,,\n",
+                    encoding="utf-8")
+    assert read_records(str(path)) == [{"name": "Ada", "employee_id": "Emp001", "phone": "555"},
+                                       {"name": "Bob", "employee_id": "Emp002", "phone": ""}]
+    path.write_text("Name\nAda\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_records(str(path))
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+import pytest
+
+from face_tracker import FaceTracker, box_iou
+from lbph_model import LBPHModel
+from recognition import FaceRecognitionPipeline
+from sample_store import normalize_face
+
+BOX = (200, 150, 100, 100)
+
+
+class FixedCascade:
+    """Stands in for the Haar cascade: reports whatever boxes the test put in front of the camera."""
+
+    def __init__(self):
+        self.boxes = []
+
+    def detectMultiScale(self, image, **kwargs):
+        return list(self.boxes)
+
+
+@pytest.fixture(scope="module")
+def people():
+    """Three smooth random textures as faces; the model is trained on noisy variants of each."""
+    rng = np.random.default_rng(0)
+    faces = [cv2.GaussianBlur(rng.integers(0, 256, (100, 100), dtype=np.uint8), (7, 7), 0) for _ in range(3)]
+    crops, labels = [], []
+    for label, face in enumerate(faces, start=1):
+        for _ in range(5):
+            noisy = np.clip(face.astype(np.int16) + rng.integers(-5, 5, face.shape), 0, 255).astype(np.uint8)
+            crops.append(normalize_face(noisy))
+            labels.append(label)
+    model = LBPHModel()
+    model.train(crops, np.asarray(labels, dtype=np.int32))
+    return faces, model
+
+
+def make_pipeline(model, cascade):
+    employees = {"Emp001": "Ada", "Emp002": "Bob", "Emp003": "Cy"}
+    pipeline = FaceRecognitionPipeline(cascade, model, employees, detection_width=None)
+    pipeline.model_trained = True
+    return pipeline
+
+
+def frame_with(*placed):
+    background = np.random.default_rng(1).integers(0, 256, (480, 640), dtype=np.uint8)
+    frame = cv2.GaussianBlur(background, (5, 5), 0)
+    for face, (x, y, w, h) in placed:
+        frame[y:y + h, x:x + w] = face
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def test_tracker_predicts_once_per_face(people):
+    faces, model = people
+    cascade = FixedCascade()
+    tracker = FaceTracker(make_pipeline(model, cascade), reverify_interval=1000)
+    cascade.boxes = [BOX]
+    frame = frame_with((faces[0], BOX))
+    for _ in range(30):
+        results, _ = tracker.process(frame)
+        assert [r.employee_id for r in results] == ["Emp001"]
+        assert box_iou(results[0].box, BOX) > 0.9
+    assert tracker.predictions_run == 1
+    assert tracker.detections_run == 6
+
+
+def test_tracker_relabels_when_someone_else_takes_the_spot(people):
+    faces, model = people
+    cascade = FixedCascade()
+    tracker = FaceTracker(make_pipeline(model, cascade), reverify_interval=1000)
+    cascade.boxes = [BOX]
+    for _ in range(10):
+        tracker.process(frame_with((faces[0], BOX)))
+    seen = [[r.employee_id for r in tracker.process(frame_with((faces[1], BOX)))[0]] for _ in range(10)]
+    assert ["Emp001"] not in seen[tracker.detect_interval:]
+    assert seen[-1] == ["Emp002"]
+    assert tracker.identity_changes == 1
+
+
+def test_tracker_reverifies_stale_identities(people):
+    faces, model = people
+    cascade = FixedCascade()
+    tracker = FaceTracker(make_pipeline(model, cascade), detect_interval=5, reverify_interval=10)
+    cascade.boxes = [BOX]
+    frame = frame_with((faces[0], BOX))
+    for _ in range(31):
+        tracker.process(frame)
+    assert tracker.predictions_run == 4  # Frames 1, 11, 21 and 31
+    assert tracker.identity_changes == 0
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+
+from face_trainer import IncrementalTrainer, records_path
+from lbph_model import LBPHModel
+from sample_store import SampleStore
+
+
+def identity(seed, count=5):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (100, 100), dtype=np.int16)
+    return [np.clip(base + rng.integers(-12, 12, (100, 100)), 0, 255).astype(np.uint8) for _ in range(count + 1)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SampleStore(str(tmp_path), owner="tests").open()
+    yield store
+    store.close()
+
+
+def enroll(store, trainer, label, seed):
+    faces = identity(seed)
+    store.append_many(f"Emp{label:03d}", faces[:-1], normalized=True)
+    trainer.add_employee(f"Emp{label:03d}")
+    return faces[-1]  # Held-out probe
+
+
+def test_add_employee_trains_incrementally(store):
+    trainer = IncrementalTrainer(LBPHModel(), store, checkpoint_every=10 ** 6)
+    probes = [enroll(store, trainer, label, seed=label) for label in (1, 2, 3)]
+    assert trainer.trained
+    assert len(trainer.model_records) == 15
+    assert [trainer.face_recognizer.predict(probe)[0] for probe in probes] == [1, 2, 3]
+    assert trainer.add_employee("Emp001") == 0  # Nothing new to add
+
+
+def test_load_replays_samples_added_after_the_checkpoint(store):
+    trainer = IncrementalTrainer(LBPHModel(), store, checkpoint_every=10)
+    enroll(store, trainer, 1, seed=1)
+    enroll(store, trainer, 2, seed=2)  # Reaches checkpoint_every
+    assert trainer.model_version == 1
+    assert os.path.exists(records_path(trainer.model_path(1)))
+    late = enroll(store, trainer, 3, seed=3)
+
+    reloaded = IncrementalTrainer(LBPHModel(), store)
+    assert reloaded.load()
+    assert reloaded.model_version == 1
+    assert len(reloaded.model_records) == 15
+    assert not reloaded.needs_retrain
+    assert reloaded.face_recognizer.predict(late)[0] == 3
+
+
+def test_remove_tombstones_then_compacts(store):
+    trainer = IncrementalTrainer(LBPHModel(), store, checkpoint_every=10 ** 6, compaction_ratio=0.5)
+    for label in range(1, 5):
+        enroll(store, trainer, label, seed=label)
+    trainer.remove_employee("Emp001")
+    assert trainer.tombstones == {1: 5}
+    assert trainer.employee_tombstoned("Emp001")
+    assert trainer.face_recognizer.size == 20
+
+    trainer.remove_employee("Emp002")  # Half the model is dead now
+    assert trainer.tombstones == {}
+    assert trainer.face_recognizer.size == 10
+    assert sorted(set(trainer.face_recognizer.labels[:10])) == [3, 4]
+
+
+def test_re_adding_a_tombstoned_employee_compacts_first(store):
+    trainer = IncrementalTrainer(LBPHModel(), store, checkpoint_every=10 ** 6, compaction_ratio=0.5)
+    for label in range(1, 6):
+        enroll(store, trainer, label, seed=label)
+    trainer.remove_employee("Emp001")
+    assert trainer.tombstones == {1: 5}
+
+    probe = enroll(store, trainer, 1, seed=100)
+    assert trainer.tombstones == {}
+    assert trainer.face_recognizer.size == 25
+    assert trainer.face_recognizer.predict(probe)[0] == 1
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from identification import VectorIdentifier, lbp_features
+from sample_store import SampleStore
+
+
+def gallery(identities, samples=5, seed=0):
+    """(faces, labels, probes): noisy samples of random textures plus a fresh capture of each identity."""
+    rng = np.random.default_rng(seed)
+    bases = rng.integers(0, 256, (identities, 100, 100), dtype=np.int16)
+
+    def noisy(images):
+        return np.clip(images + rng.integers(-12, 12, images.shape), 0, 255).astype(np.uint8)
+
+    return noisy(np.repeat(bases, samples, axis=0)), np.repeat(np.arange(identities), samples), noisy(bases)
+
+
+def test_features_are_unit_vectors():
+    faces, _, _ = gallery(3)
+    features = lbp_features(faces)
+    assert features.shape == (15, 25 * 59)
+    assert np.allclose(np.linalg.norm(features, axis=1), 1.0, atol=1e-4)
+
+
+def test_shortlist_agrees_with_full_search():
+    faces, labels, probes = gallery(40)
+    shortlisted, exhaustive = VectorIdentifier(shortlist=5), VectorIdentifier(use_centroids=False)
+    for identifier in (shortlisted, exhaustive):
+        identifier.add(faces[:100], labels[:100])
+        identifier.add(faces[100:], labels[100:])
+    results = shortlisted.predict_batch(probes, normalized=True)
+    assert [label for label, _ in results] == list(range(40))
+    expected = exhaustive.predict_batch(probes, normalized=True)
+    assert [label for label, _ in expected] == list(range(40))
+    assert [distance for _, distance in results] == pytest.approx([distance for _, distance in expected], abs=1e-3)
+
+
+def test_remove_label():
+    faces, labels, probes = gallery(3)
+    identifier = VectorIdentifier()
+    identifier.add(faces, labels)
+    assert identifier.remove_label(1) == 5
+    assert identifier.remove_label(1) == 0
+    assert identifier.predict_batch(probes, normalized=True)[1][0] != 1
+    identifier.remove_label(0)
+    identifier.remove_label(2)
+    assert identifier.empty()
+    assert identifier.predict(probes[0]) == (-1, float("inf"))
+
+
+def test_load_store_and_add_from_store(tmp_path):
+    faces, labels, probes = gallery(3)
+    store = SampleStore(str(tmp_path), owner="tests").open()
+    store.append_many("Emp001", faces[:5], normalized=True)
+    store.append_many("Emp002", faces[5:10], normalized=True)
+    identifier = VectorIdentifier().load_store(store)
+    assert identifier.size == 10
+    assert list(identifier.records[:10]) == list(range(10))
+
+    store.append_many("Emp003", faces[10:], normalized=True)
+    assert identifier.add_from_store(store, "Emp003") == 5
+    assert identifier.add_from_store(store, "Emp003") == 0
+    assert [label for label, _ in identifier.predict_batch(probes, normalized=True)] == [1, 2, 3]
+    store.close()
@@ -0,0 +1,101 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from lbph_model import DBL_MAX, LBPHModel
+
+
+@pytest.fixture(scope="module")
+def data():
+    """(faces, labels, probes): 10 noisy samples of 8 identities plus a fresh capture of each."""
+    rng = np.random.default_rng(0)
+    bases = rng.integers(0, 256, (8, 100, 100), dtype=np.uint8)
+
+    def noisy(images):
+        return np.clip(images.astype(np.int16) + rng.integers(-12, 12, images.shape, dtype=np.int16),
+                       0, 255).astype(np.uint8)
+
+    return noisy(np.repeat(bases, 10, axis=0)), np.repeat(np.arange(8), 10).astype(np.int32), noisy(bases)
+
+
+@pytest.fixture(scope="module")
+def reference(data):
+    faces, labels, _ = data
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(list(faces), labels)
+    return recognizer
+
+
+def assert_same_predictions(model, reference, probes):
+    for probe in probes:
+        label, distance = model.predict(probe)
+        expected_label, expected_distance = reference.predict(probe)
+        assert label == expected_label
+        assert distance == pytest.approx(expected_distance, rel=1e-4)
+
+
+def test_matches_cv2(data, reference):
+    faces, labels, probes = data
+    model = LBPHModel()
+    model.train(faces, labels)
+    histograms = np.concatenate([h.reshape(1, -1) for h in reference.getHistograms()])
+    assert np.allclose(model.counts[:, :model.size].T / float(model.cell_pixels), histograms, atol=1e-6)
+    assert_same_predictions(model, reference, probes)
+    assert [model.predict(probe)[0] for probe in probes] == list(range(8))
+
+
+def test_update_equals_train(data):
+    faces, labels, probes = data
+    whole, incremental = LBPHModel(), LBPHModel()
+    whole.train(faces, labels)
+    incremental.train(faces[:30], labels[:30])
+    incremental.update(faces[30:], labels[30:])
+    assert np.array_equal(whole.counts[:, :whole.size], incremental.counts[:, :incremental.size])
+    assert [whole.predict(probe) for probe in probes] == [incremental.predict(probe) for probe in probes]
+
+
+def test_empty_and_threshold(data):
+    faces, labels, probes = data
+    assert LBPHModel().predict(probes[0]) == (-1, DBL_MAX)
+    model = LBPHModel(threshold=1.0)
+    model.train(faces, labels)
+    assert model.predict(probes[0]) == (-1, DBL_MAX)
+    assert model.ranked(probes[0]) == []
+
+
+def test_save_and_read(tmp_path, data):
+    faces, labels, probes = data
+    model = LBPHModel(grid_x=4, grid_y=4)
+    model.train(faces, labels)
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    assert os.path.exists(LBPHModel.histograms_path(path))
+
+    loaded = LBPHModel()
+    lock = loaded.lock
+    loaded.read(path)
+    assert loaded.lock is lock
+    assert (loaded.grid_x, loaded.grid_y, loaded.size) == (4, 4, len(labels))
+    assert isinstance(loaded.counts, np.memmap)
+    assert [loaded.predict(probe) for probe in probes] == [model.predict(probe) for probe in probes]
+    loaded.update(faces[:1], labels[:1])  # Grows past the read-only map
+    assert loaded.size == len(labels) + 1
+
+
+def test_yaml_round_trip(tmp_path, data, reference):
+    faces, labels, probes = data
+    path = str(tmp_path / "cv2.yml")
+    reference.write(path)
+    model = LBPHModel()
+    lock = model.lock
+    model.read(path)
+    assert model.lock is lock
+    assert_same_predictions(model, reference, probes)
+
+    exported = str(tmp_path / "exported.yml")
+    model.export_yaml(exported)
+    again = cv2.face.LBPHFaceRecognizer_create()
+    again.read(exported)
+    assert_same_predictions(model, again, probes)
@@ -0,0 +1,69 @@
+from presence import PresenceTracker, TTLCache
+
+
+def observe_frames(tracker, employee_id, status, start, frames=30, fps=30.0):
+    return sum(tracker.observe(employee_id, status, start + frame / fps) for frame in range(frames))
+
+
+def test_ttl_cache_expires_and_bounds():
+    cache = TTLCache(max_size=2, ttl=5.0)
+    cache.set("a", 1, 0.0)
+    cache.set("b", 2, 1.0)
+    assert cache.get("a", 5.0) == 1
+    assert cache.get("a", 5.5) is None
+    cache.set("c", 3, 2.0)  # Over max_size: the least recently updated entry goes
+    assert cache.get("a", 2.0) is None
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_one_event_while_in_view():
+    tracker = PresenceTracker()
+    assert observe_frames(tracker, "Emp001", "IN", 1000.0, frames=150) == 1
+    assert tracker.is_in("Emp001")
+    assert tracker.observations == 150
+
+
+def test_needs_consecutive_confirmations():
+    tracker = PresenceTracker(confirmations=3)
+    assert not tracker.observe("Emp001", "IN", 0.0)
+    assert not tracker.observe("Emp001", "OUT", 0.1)  # Status flip restarts the count
+    assert not tracker.observe("Emp001", "IN", 0.2)
+    assert not tracker.observe("Emp001", "IN", 0.3)
+    assert tracker.observe("Emp001", "IN", 0.4)
+
+
+def test_sighting_expires_between_gaps():
+    tracker = PresenceTracker(confirmations=2, sighting_ttl=2.0)
+    assert not tracker.observe("Emp001", "IN", 0.0)
+    assert not tracker.observe("Emp001", "IN", 5.0)  # Previous sighting expired
+    assert tracker.observe("Emp001", "IN", 6.0)
+
+
+def test_repeated_status_needs_min_gap():
+    tracker = PresenceTracker(min_gap_seconds=300.0)
+    assert observe_frames(tracker, "Emp001", "IN", 1000.0) == 1
+    assert observe_frames(tracker, "Emp001", "IN", 1100.0) == 0
+    assert tracker.suppressed == 1
+    assert observe_frames(tracker, "Emp001", "IN", 1600.0) == 1
+    assert observe_frames(tracker, "Emp001", "OUT", 1610.0) == 1
+    assert not tracker.is_in("Emp001")
+
+
+def test_commit_skips_confirmation():
+    tracker = PresenceTracker()
+    assert tracker.commit("Emp001", "IN", 0.0)
+    assert not tracker.commit("Emp001", "IN", 10.0)
+    assert tracker.commit("Emp001", "OUT", 20.0)
+
+
+def test_restore_from_replayed_entries():
+    tracker = PresenceTracker()
+    tracker.restore([
+        {"Employee ID": "Emp001", "Status": "Logged IN", "Timestamp": 100.0},
+        {"Employee ID": "Emp002", "Status": "Logged IN", "Timestamp": 110.0},
+        {"Employee ID": "Emp002", "Status": "Logged OUT", "Timestamp": 200.0},
+        {"Employee ID": "Unknown", "Status": "Logged IN", "Timestamp": 210.0},
+    ])
+    assert tracker.logged_in == {"Emp001": 100.0}
+    assert not tracker.commit("Emp001", "IN", 150.0)  # Within min_gap of the restored IN
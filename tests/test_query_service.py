@@ -0,0 +1,86 @@
+import json
+import time
+
+import pytest
+
+from attendance_journal import AttendanceJournal
+from query_service import AttendanceIndex, JournalTail, QueryError, QueryService, parse_range
+
+
+def at(day, hour, minute=0):
+    return time.mktime((2026, 3, day, hour, minute, 0, 0, 0, -1))
+
+
+def date(day):
+    return f"2026-03-{day:02d}"
+
+
+@pytest.fixture
+def index():
+    index = AttendanceIndex()
+    index.add_many([(at(2, 9), 1, "Emp001", "Ada"), (at(2, 9, 30), 1, "Emp002", "Bob"),
+                    (at(2, 12), 0, "Emp001", "Ada"), (at(2, 13), 1, "Emp001", "Ada"),
+                    (at(2, 17), 0, "Emp001", "Ada"), (at(2, 18), 1, "Unknown", "Unknown")], date(2))
+    index.add_many([(at(3, 9), 1, "Emp001", "Ada")], date(3))
+    return index
+
+
+def get(service, target):
+    status, body = service.handle(target)
+    return status, json.loads(body)
+
+
+def test_sessions_and_totals(index):
+    total, items = index.sessions("Emp001", *parse_range(date(2), date(3)), 0, 10)
+    assert total == 3
+    assert [item["hours"] for item in items] == [3.0, 4.0, None]
+    assert index.totals(*parse_range(date(2), date(2)), 0, 10) == \
+        (1, [{"employee_id": "Emp001", "name": "Ada", "hours": 7.0, "sessions": 2}])
+    assert index.sessions("Emp001", *parse_range(date(2), date(3)), 2, 1) == \
+        (3, [{"in": "2026-03-03 09:00:00", "out": None, "hours": None}])
+    with pytest.raises(QueryError):
+        index.sessions("Emp999", *parse_range(None, None), 0, 10)
+
+
+def test_expire_forgets_ins_from_earlier_days(index):
+    assert sorted(index.present) == ["Emp001", "Emp002"]
+    version = index.version
+    assert index.expire(date(3)) == 1  # Bob never logged out on the 2nd
+    assert sorted(index.present) == ["Emp001"]
+    assert index.employees["Emp002"].open_in is None
+    assert index.version > version
+    assert index.expire(date(3)) == 0
+
+
+def test_service_routes_and_caches(index):
+    service = QueryService(index)
+    status, body = get(service, "/presence?limit=1")
+    assert status == 200
+    assert (body["total"], body["limit"], body["items"][0]["employee_id"]) == (2, 1, "Emp001")
+    assert get(service, "/employees/Emp001/events?from=2026-03-03")[1]["items"] == \
+        [{"time": "2026-03-03 09:00:00", "status": "IN"}]
+    assert get(service, "/totals?employee=Emp002")[1]["items"][0]["sessions"] == 0
+
+    get(service, "/presence?limit=1")
+    assert service.cache_hits.value == 1
+    index.expire(date(3))  # New version: the cached response is stale
+    assert get(service, "/presence?limit=1")[1]["total"] == 1
+
+    assert get(service, "/nowhere")[0] == 404
+    assert get(service, "/employees/Emp999/sessions")[0] == 404
+    assert get(service, "/totals?from=March")[0] == 400
+    assert get(service, "/presence?limit=x")[0] == 400
+
+
+def test_journal_tail_picks_up_new_records(tmp_path):
+    journal = AttendanceJournal(str(tmp_path)).start()
+    journal.append("Emp001", "Ada", "IN", at(2, 9))
+    journal.flush()
+    index = AttendanceIndex()
+    tail = JournalTail(index, str(tmp_path))
+    assert tail.poll() == 1
+    assert tail.poll() == 0
+    journal.append("Emp001", "Ada", "OUT", at(2, 17))
+    journal.close()
+    assert tail.poll() == 1
+    assert index.totals(*parse_range(None, None), 0, 10)[1][0]["hours"] == 8.0
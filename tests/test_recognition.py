@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+import pytest
+
+from lbph_model import LBPHModel
+from recognition import FaceRecognitionPipeline, employee_label
+from sample_store import normalize_face
+
+BOX = (200, 150, 100, 100)
+
+
+class FixedCascade:
+    """Stands in for the Haar cascade: reports whatever boxes the test put in front of the camera."""
+
+    def __init__(self):
+        self.boxes = []
+
+    def detectMultiScale(self, image, **kwargs):
+        return list(self.boxes)
+
+
+@pytest.fixture(scope="module")
+def people():
+    """Three smooth random textures as faces; the model is trained on noisy variants of each."""
+    rng = np.random.default_rng(0)
+    faces = [cv2.GaussianBlur(rng.integers(0, 256, (100, 100), dtype=np.uint8), (7, 7), 0) for _ in range(3)]
+    crops, labels = [], []
+    for label, face in enumerate(faces, start=1):
+        for _ in range(5):
+            noisy = np.clip(face.astype(np.int16) + rng.integers(-5, 5, face.shape), 0, 255).astype(np.uint8)
+            crops.append(normalize_face(noisy))
+            labels.append(label)
+    model = LBPHModel()
+    model.train(crops, np.asarray(labels, dtype=np.int32))
+    return faces, model
+
+
+def make_pipeline(model, cascade):
+    employees = {"Emp001": "Ada", "Emp002": "Bob", "Emp003": "Cy"}
+    pipeline = FaceRecognitionPipeline(cascade, model, employees, detection_width=None)
+    pipeline.model_trained = True
+    return pipeline
+
+
+def frame_with(*placed):
+    background = np.random.default_rng(1).integers(0, 256, (480, 640), dtype=np.uint8)
+    frame = cv2.GaussianBlur(background, (5, 5), 0)
+    for face, (x, y, w, h) in placed:
+        frame[y:y + h, x:x + w] = face
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def test_employee_label():
+    assert employee_label("Emp042") == 42
+    assert employee_label("guest") is None
+    assert employee_label("Emp4x") is None
+
+
+def test_recognizes_every_face_in_a_frame(people):
+    faces, model = people
+    cascade = FixedCascade()
+    pipeline = make_pipeline(model, cascade)
+    cascade.boxes = [BOX, (400, 150, 100, 100)]
+    results, _ = pipeline.process(frame_with((faces[0], BOX), (faces[2], (400, 150, 100, 100))))
+    assert [(r.employee_id, r.name, r.box) for r in results] == [("Emp001", "Ada", BOX),
+                                                                 ("Emp003", "Cy", (400, 150, 100, 100))]
+
+
+def test_unknown_faces_and_untrained_model(people):
+    faces, model = people
+    cascade = FixedCascade()
+    pipeline = make_pipeline(model, cascade)
+    cascade.boxes = [BOX]
+    stranger = np.random.default_rng(7).integers(0, 256, (100, 100), dtype=np.uint8)
+    assert pipeline.process(frame_with((stranger, BOX)))[0][0].employee_id == "Unknown"
+
+    pipeline.model_trained = False
+    assert pipeline.process(frame_with((faces[0], BOX)))[0][0].employee_id == "Unknown"
+
+
+def test_label_map_and_excluded_labels(people):
+    faces, model = people
+    cascade = FixedCascade()
+    pipeline = make_pipeline(model, cascade)
+    cascade.boxes = [BOX]
+    pipeline.employee_data["guest-7"] = "Guest"
+    pipeline.label_map = {1: "guest-7"}
+    assert pipeline.process(frame_with((faces[0], BOX)))[0][0].employee_id == "guest-7"
+
+    pipeline.excluded_labels[1] = 5  # Deleted, still inside the model
+    assert pipeline.process(frame_with((faces[0], BOX)))[0][0].employee_id != "guest-7"
@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pytest
+
+from sample_store import INDEX_DTYPE, MAX_ID_BYTES, SampleStore, StoreLockedError, check_employee_id, store_writer
+
+
+def crops(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (100, 100), dtype=np.uint8) for _ in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SampleStore(str(tmp_path), owner="tests").open()
+    yield store
+    store.close()
+
+
+def test_append_and_reopen(store):
+    first = crops(3)
+    assert store.append_many("Emp007", first, normalized=True) == [0, 1, 2]
+    store.append_many("guest", crops(2, seed=1), normalized=True)
+    assert store.label_for("Emp007") == 7
+    assert store.label_for("guest") == 8
+
+    reopened = SampleStore(store.data_dir, readonly=True).open()
+    assert len(reopened) == 5
+    assert reopened.employee_by_label == {7: "Emp007", 8: "guest"}
+    faces, labels, indices = reopened.training_set()
+    assert list(labels) == [7, 7, 7, 8, 8]
+    assert np.array_equal(faces[1], first[1])
+
+
+def test_delete_and_compact(store):
+    store.append_many("Emp001", crops(2), normalized=True)
+    kept = crops(2, seed=1)
+    store.append_many("Emp002", kept, normalized=True)
+    assert store.delete_employee("Emp001") == 2
+    assert store.count("Emp001") == 0
+    assert list(store.live_indices()) == [2, 3]
+    assert SampleStore(store.data_dir, readonly=True).open().count("Emp001") == 0
+
+    mapping = store.compact()
+    assert list(mapping) == [-1, -1, 0, 1]
+    assert len(store) == 2
+    assert np.array_equal(store.images[1], kept[1])
+    assert "Emp001" not in store.label_by_employee
+
+
+def test_open_trims_an_interrupted_append(store):
+    store.append_many("Emp001", crops(2), normalized=True)
+    with open(store.images_path, "ab") as f:
+        f.write(b"\x00" * 500)  # Part of a crop written, its index record never made it
+    with open(store.index_path, "ab") as f:
+        f.write(b"\x00" * 7)
+    store.close()
+    store.open()
+    assert len(store) == 2
+    assert os.path.getsize(store.images_path) == 2 * store.sample_bytes
+    assert os.path.getsize(store.index_path) == 2 * INDEX_DTYPE.itemsize
+    added = crops(1, seed=1)[0]
+    store.append("Emp002", added, normalized=True)
+    assert np.array_equal(store.images[2], added)
+
+
+def test_single_writer(store):
+    with pytest.raises(StoreLockedError):
+        SampleStore(store.data_dir).open()
+    assert store_writer(store.data_dir)["owner"] == "tests"
+    readonly = SampleStore(store.data_dir, readonly=True).open()
+    with pytest.raises(IOError):
+        readonly.append("Emp001", crops(1)[0], normalized=True)
+
+    store.close()
+    assert store_writer(store.data_dir) is None
+    SampleStore(store.data_dir).open().close()
+
+
+def test_long_employee_id_is_rejected(store):
+    check_employee_id("E" * MAX_ID_BYTES)
+    with pytest.raises(ValueError):
+        check_employee_id("E" * (MAX_ID_BYTES + 1))
+    with pytest.raises(ValueError):
+        check_employee_id("é" * (MAX_ID_BYTES // 2 + 1))
+    with pytest.raises(ValueError):
+        store.append_many("E" * (MAX_ID_BYTES + 1), crops(1), normalized=True)
+    assert len(store) == 0